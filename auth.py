@@ -1,18 +1,63 @@
+from fastapi import Depends, Header, HTTPException
+from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from bson import ObjectId
+from bson.errors import InvalidId
+from database import user_collection
+from utils.bounded_pool import BoundedPool, PoolSaturated
+from utils.cache import ResponseCache, create_cache_backend
+import hashlib
+import hmac
+import os
+import time
 
 SECRET_KEY = "your-secret-key"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost factor; hashes made at any other cost are rehashed on next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
 
-def hash_password(password):
-    return pwd_context.hash(password)
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS, bcrypt__min_rounds=BCRYPT_ROUNDS, bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+# bcrypt releases the GIL, so hashing on threads keeps the event loop free
+# while the pool size caps how many cores logins can take
+password_pool = BoundedPool("bcrypt", PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE)
+
+# Shared secret for the internal admin endpoints; unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/login")
+# For routes that also serve anonymous visitors
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/login", auto_error=False)
+
+# Verified token -> user record, so protected routes skip the signature check
+# and the users lookup on repeat requests. Entries never outlive their token.
+auth_cache = ResponseCache("auth", create_cache_backend(), ttl=int(os.getenv("AUTH_CACHE_TTL", "60")))
+
+async def _run_hasher(fn, *args):
+    try:
+        return await password_pool.run(fn, *args)
+    except PoolSaturated:
+        raise HTTPException(status_code=503, detail="Server busy, try again", headers={"Retry-After": "1"})
+
+async def hash_password(password):
+    return await _run_hasher(pwd_context.hash, password)
+
+async def verify_password(plain_password, hashed_password):
+    return await _run_hasher(pwd_context.verify, plain_password, hashed_password)
+
+# Returns (valid, new_hash); new_hash is set when the stored hash was made at
+# a different cost and should replace it
+async def verify_and_update(plain_password, hashed_password):
+    return await _run_hasher(pwd_context.verify_and_update, plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
@@ -25,4 +70,53 @@ def decode_access_token(token: str):
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload if "sub" in payload else None
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+
+def _token_cache_key(token: str):
+    # The subject is read without verification only to group entries per user;
+    # a hit still requires the exact token string that was verified before
+    try:
+        user_id = jwt.get_unverified_claims(token).get("sub")
+    except JWTError:
+        return None
+    if not user_id:
+        return None
+    return f"{auth_cache.namespace}:{user_id}:{hashlib.sha256(token.encode()).hexdigest()}"
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
+    key = _token_cache_key(token)
+    if key is not None:
+        cached = await auth_cache.get(key)
+        if cached is not None:
+            return cached
+
+    payload = decode_access_token(token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    try:
+        user = await user_collection.find_one({"_id": ObjectId(payload["sub"])}, {"password": 0})
+    except InvalidId:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    user["_id"] = str(user["_id"])
+    ttl = min(auth_cache.ttl, int(payload.get("exp", time.time() + auth_cache.ttl) - time.time()))
+    if ttl > 0:
+        await auth_cache.set(key, user, ttl=ttl)
+    return user
+
+async def get_optional_user(token: str = Depends(optional_oauth2_scheme)):
+    if not token:
+        return None
+    try:
+        return await get_current_user(token)
+    except HTTPException:
+        return None
+
+def require_admin(x_admin_token: str = Header(None)):
+    if not ADMIN_TOKEN or not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+async def invalidate_user(user_id: str):
+    await auth_cache.invalidate(f"{user_id}:")
@@ -0,0 +1,255 @@
+# Load test of the API hot paths, run in-process through an ASGI transport:
+#   python -m benchmarks.bench_api --properties 10000 --concurrency 16 --output baseline.json
+# --compare baseline.json reports regressions; --mongodb-uri for larger catalogs
+from datetime import datetime, timedelta
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+SCENARIOS = ("listing", "filtered", "offices", "land", "user_properties", "login", "create")
+BENCH_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "bench-password"
+SEED_BATCH = 5000
+
+RESIDENTIAL_SAMPLE = ["Flat", "Apartment", "Villa", "Independent House", "Builder Floor"]
+LAND_SAMPLE = ["Residential Land", "Commercial Land", "Agriculture Land", "Residential Plot"]
+OFFICE_SAMPLE = ["Office"]
+CITY_SAMPLE = [("Pune", "Baner"), ("Pune", "Wakad"), ("Mumbai", "Andheri"), ("Mumbai", "Powai"),
+               ("Bengaluru", "Whitefield"), ("Hyderabad", "Gachibowli"), ("Chennai", "Adyar"), ("Nagpur", "")]
+FILTER_SAMPLE = [
+    {"propertyType": "Flat"},
+    {"propertyType": "Villa", "priceMax": "2 cr"},
+    {"bhk": "2", "location": "pune"},
+    {"parking": "Yes", "lift": "Yes"},
+    {"priceMin": "50 lakh", "priceMax": "1 cr"},
+    {"search": "sea view"},
+    {"propertyType": "Office", "location": "mumbai"},
+]
+WORDS = ["spacious", "sea", "view", "garden", "corner", "park", "metro", "school", "quiet", "modern", "lake", "hill"]
+
+def synthetic_property(rng: random.Random, index: int, owners: list, start: datetime) -> dict:
+    category = rng.choices(("residential", "land", "office"), weights=(70, 20, 10))[0]
+    property_type = rng.choice({"residential": RESIDENTIAL_SAMPLE, "land": LAND_SAMPLE, "office": OFFICE_SAMPLE}[category])
+    city, locality = rng.choice(CITY_SAMPLE)
+    words = rng.sample(WORDS, 4)
+    return {
+        "title": f"{' '.join(words[:2]).title()} {property_type} {index}",
+        "propertyType": property_type,
+        "price": f"{rng.randint(10, 990)} lakh" if rng.random() < 0.7 else str(rng.randint(10, 500) * 100000),
+        "location": {"city": city, "locality": locality, "state": ""},
+        "bhk": str(rng.randint(1, 5)) if category == "residential" else None,
+        "description": " ".join(rng.choice(WORDS) for _ in range(30)),
+        "images": {"exterior_view": [f"https://example.com/{index}.jpg"]},
+        "videos": [],
+        "createdAt": start + timedelta(seconds=index),
+        "negotiable": rng.choice(["Yes", "No"]),
+        "amenities": {"parking": rng.choice(["Yes", "No"]), "lift": rng.choice(["Yes", "No"])},
+        "listedBy": rng.choice(owners),
+        "propertyFeatures": {"floorNo": str(rng.randint(0, 20))} if category != "land" else {"plotFacing": "East"},
+    }
+
+async def seed(count: int, seed_value: int) -> str:
+    from auth import hash_password
+    from database import property_collection, user_collection
+    from utils.normalize import prepare_for_storage
+
+    result = await user_collection.insert_one({
+        "name": "Bench", "email": BENCH_EMAIL, "password": await hash_password(BENCH_PASSWORD)
+    })
+    bench_user = str(result.inserted_id)
+    owners = [bench_user] + [f"{i:024x}" for i in range(1, 50)]
+    rng = random.Random(seed_value)
+    start = datetime(2024, 1, 1)
+    started = time.perf_counter()
+    for offset in range(0, count, SEED_BATCH):
+        batch = [
+            prepare_for_storage(synthetic_property(rng, index, owners, start))
+            for index in range(offset, min(offset + SEED_BATCH, count))
+        ]
+        await property_collection.insert_many(batch, ordered=False)
+    print(f"seeded {count} properties in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return bench_user
+
+def tiny_jpeg() -> bytes:
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), (120, 160, 200)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+def request_factories(token: str, rng: random.Random) -> dict:
+    headers = {"Authorization": f"Bearer {token}"}
+    image = tiny_jpeg()
+
+    def create(client):
+        form = {"formData": json.dumps({
+            "title": "Bench listing", "propertyType": "Flat", "price": "75 lakh",
+            "locationDetails": {"city": "Pune", "locality": "Baner"}, "bhk": "2",
+        })}
+        # Unique bytes so every upload is a new object, not a dedupe hit
+        files = {"exterior_view": ("bench.jpg", image + os.urandom(16), "image/jpeg")}
+        return client.post("/api/properties", data=form, files=files, headers=headers)
+
+    return {
+        "listing": lambda client: client.get("/api/properties", params={"limit": 24}),
+        "filtered": lambda client: client.get("/api/properties/filtered", params=rng.choice(FILTER_SAMPLE)),
+        "offices": lambda client: client.get("/api/properties/offices"),
+        "land": lambda client: client.get("/api/properties/land"),
+        "user_properties": lambda client: client.get("/api/user/properties", headers=headers),
+        "login": lambda client: client.post("/api/login", json={"email": BENCH_EMAIL, "password": BENCH_PASSWORD}),
+        "create": create,
+    }
+
+def percentile(sorted_values: list, pct: float) -> float:
+    # Nearest-rank percentile
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+async def run_scenario(client, make_request, requests: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await make_request(client)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+async def benchmark(args) -> dict:
+    import httpx
+    from database import ensure_indexes, property_collection, user_collection
+    from main import app
+
+    await ensure_indexes()
+    if args.reuse:
+        user = await user_collection.find_one({"email": BENCH_EMAIL})
+        if user is None:
+            raise SystemExit("--reuse needs a database seeded by an earlier run")
+    else:
+        if await property_collection.estimated_document_count():
+            raise SystemExit("The target database already has properties; use a fresh one or --reuse")
+        await seed(args.properties, args.seed)
+
+    scenarios = [name for name in args.scenarios if name != "create" or os.getenv("S3_ENDPOINT_URL")]
+    if "create" in args.scenarios and "create" not in scenarios:
+        print("skipping create: set S3_ENDPOINT_URL to an S3 stand-in to include it", file=sys.stderr)
+
+    rng = random.Random(args.seed)
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        login = await client.post("/api/login", json={"email": BENCH_EMAIL, "password": BENCH_PASSWORD})
+        factories = request_factories(login.json()["access_token"], rng)
+        for name in scenarios:
+            # A short warm-up so first-call costs (index builds, pools) don't skew p99
+            await run_scenario(client, factories[name], min(args.concurrency, args.requests), args.concurrency)
+            results[name] = await run_scenario(client, factories[name], args.requests, args.concurrency)
+            print(format_row(name, results[name]), file=sys.stderr)
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "backend": os.getenv("MONGODB_BACKEND"),
+            "properties": args.properties,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "cache": not args.no_cache,
+        },
+        "scenarios": results,
+    }
+
+def format_row(name: str, result: dict) -> str:
+    return (f"{name:16} {result['throughput']:9.1f} req/s  p50 {result['p50_ms']:8.2f}  "
+            f"p95 {result['p95_ms']:8.2f}  p99 {result['p99_ms']:8.2f} ms  errors {result['errors']}")
+
+# Prints per-scenario changes against a saved baseline; returns the scenarios
+# whose p95 or throughput got worse by more than threshold percent
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    regressions = []
+    for name, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            print(f"{name:16} (not in baseline)")
+            continue
+        changes = {}
+        for metric in ("throughput", "p50_ms", "p95_ms", "p99_ms"):
+            changes[metric] = (result[metric] - before[metric]) / before[metric] * 100 if before[metric] else 0.0
+        print(f"{name:16} " + "  ".join(f"{metric} {change:+6.1f}%" for metric, change in changes.items()))
+        if changes["p95_ms"] > threshold or changes["throughput"] < -threshold:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the DreamHome API at a fixed concurrency")
+    parser.add_argument("--properties", type=int, default=10000, help="Synthetic listings to seed")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mongodb-uri", help="Run against this (disposable) server instead of mongomock")
+    parser.add_argument("--reuse", action="store_true", help="Skip seeding and use the data already in --mongodb-uri")
+    parser.add_argument("--no-cache", action="store_true", help="Measure with the listing cache disabled")
+    parser.add_argument("--output", help="Write the results as JSON, e.g. a new baseline")
+    parser.add_argument("--compare", help="Baseline JSON to diff against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent change treated as a regression")
+    args = parser.parse_args()
+
+    # The app reads its configuration at import time
+    if args.mongodb_uri:
+        os.environ["MONGODB_BACKEND"] = "motor"
+        os.environ["MONGODB_URI"] = args.mongodb_uri
+    else:
+        os.environ["MONGODB_BACKEND"] = "memory"
+    # Every scenario comes from one client and would trip the per-IP budgets
+    os.environ["RATE_LIMIT_ENABLED"] = "0"
+    if args.no_cache:
+        os.environ["LISTING_CACHE_TTL"] = "0"
+
+    result = asyncio.run(benchmark(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"results written to {args.output}", file=sys.stderr)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), result, args.threshold)
+        if regressions:
+            print(f"regressions beyond {args.threshold:g}%: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
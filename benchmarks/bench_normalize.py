@@ -0,0 +1,140 @@
+# Per-document normalization cost, old per-route loop vs normalize_many:
+#   python -m benchmarks.bench_normalize --docs 20000 --repeat 5
+from bson import ObjectId
+from datetime import datetime, timedelta
+from utils.file_utils import normalize_images_field
+from utils.normalize import normalize_many, prepare_for_storage
+import argparse
+import random
+import time
+
+SAMPLE_TYPES = ["Flat", "Apartment", "Villa", "Office", "Residential Land", "Residential Plot", "Agriculture Land"]
+
+def make_docs(count: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    docs = []
+    for i in range(count):
+        docs.append({
+            "_id": ObjectId(),
+            "title": f"Listing {i}",
+            "propertyType": rng.choice(SAMPLE_TYPES),
+            "price": str(rng.randint(10, 500) * 100000),
+            "location": rng.choice(["Pune", {"city": "Mumbai", "state": "MH"}]),
+            "images": {"exterior_view": [f"https://example.com/{i}.jpg"]},
+            "videos": [],
+            "createdAt": start + timedelta(minutes=i),
+            "amenities": {"parking": "Yes"},
+            "propertyFeatures": {"floorNo": "3"},
+            "listedBy": "64b7f0c2a1b2c3d4e5f60718",
+        })
+    return docs
+
+# The loop each listing endpoint carried before utils.normalize existed
+def legacy_normalize(properties: list) -> list:
+    result = []
+    residential_types = ["Flat", "Apartment", "Villa", "House", "Farm House"]
+    land_types = ["Residential Land", "Commercial Land", "Agriculture Land"]
+    for prop in properties:
+        prop["id"] = str(prop["_id"])
+        prop["createdAt"] = prop["createdAt"].isoformat()
+        if isinstance(prop.get("location"), str):
+            prop["location"] = {"city": prop["location"], "state": ""}
+        prop["description"] = prop.get("description", "")
+        prop["images"] = normalize_images_field(prop.get("images", []))
+        prop["negotiable"] = prop.get("negotiable", "No")
+
+        if prop.get("propertyType") in residential_types:
+            prop["availabilityStatus"] = prop.get("availabilityStatus", "Ready to Move")
+            prop["propertyStatus"] = prop.get("propertyStatus", "New Project")
+            prop["bhk"] = prop.get("bhk", "N/A")
+            features = prop.get("propertyFeatures", {})
+            prop["amenities"] = {
+                **{
+                    "parking": "No", "lift": "No", "security": "No", "powerBackup": "No",
+                    "waterSupply": "No", "boundaryWall": "No", "gatedCommunity": "No", "bathrooms": "1"
+                },
+                **prop.get("amenities", {}),
+                **{
+                    "totalFloors": features.get("totalFloors", "N/A"),
+                    "floorNo": features.get("floorNo", "N/A"),
+                    "furnishing": features.get("furnishing", "N/A"),
+                    "builtupArea": features.get("builtupArea", "N/A"),
+                    "carpetArea": features.get("carpetArea", "N/A")
+                }
+            }
+        elif prop.get("propertyType") in land_types:
+            prop["availabilityStatus"] = prop.get("availabilityStatus", "N/A")
+            prop["propertyStatus"] = prop.get("propertyStatus", "N/A")
+            prop["bhk"] = prop.get("bhk", "N/A")
+            features = prop.get("propertyFeatures", {})
+            prop["amenities"] = {
+                **{
+                    "parking": "No", "security": "No", "powerBackup": "No",
+                    "waterSupply": "No", "boundaryWall": "No", "gatedCommunity": "No"
+                },
+                **prop.get("amenities", {}),
+            }
+            prop["propertyFeatures"] = {
+                **{
+                    "areaUnit": "N/A", "areaValue": "N/A", "anyConstructionDone": "No",
+                    "plotFacing": "N/A", "transactionType": "N/A", "roadAccessType": "N/A"
+                },
+                **features
+            }
+        else:  # Office
+            prop["availabilityStatus"] = prop.get("availabilityStatus", "N/A")
+            prop["propertyStatus"] = prop.get("propertyStatus", "N/A")
+            prop["bhk"] = prop.get("bhk", "N/A")
+            features = prop.get("propertyFeatures", {})
+            prop["amenities"] = {
+                **{
+                    "parking": "No", "security": "No", "powerBackup": "No",
+                    "waterSupply": "No", "boundaryWall": "No", "gatedCommunity": "No",
+                    "lift": "No", "internet": "No", "publicTransport": "No",
+                    "pantry": "Not Available", "washroom": "Not Available"
+                },
+                **prop.get("amenities", {}),
+            }
+            prop["propertyFeatures"] = {
+                **{
+                    "carpetArea": "N/A", "floorNo": "N/A", "furnishing": "N/A",
+                    "cabins": "N/A", "workstations": "N/A", "roadAccessType": "N/A"
+                },
+                **features
+            }
+
+        prop["listedBy"] = prop.get("listedBy", "Unknown")
+        result.append(prop)
+    return result
+
+def make_stored_docs(count: int) -> list:
+    return [prepare_for_storage(doc) for doc in make_docs(count)]
+
+def best_per_doc(fn, count: int, repeat: int, factory=make_docs) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        # Normalization mutates its input, so every round gets fresh documents
+        docs = factory(count)
+        start = time.perf_counter()
+        fn(docs)
+        best = min(best, time.perf_counter() - start)
+    return best / count
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark property normalization")
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    before = best_per_doc(legacy_normalize, args.docs, args.repeat)
+    after = best_per_doc(normalize_many, args.docs, args.repeat)
+    stored = best_per_doc(normalize_many, args.docs, args.repeat, factory=make_stored_docs)
+    print(f"documents per run: {args.docs}, best of {args.repeat}")
+    print(f"legacy loop     : {before * 1e6:8.2f} us/doc")
+    print(f"normalize_many  : {after * 1e6:8.2f} us/doc")
+    print(f"stored shape    : {stored * 1e6:8.2f} us/doc")
+    print(f"speedup         : {before / after:8.2f}x ({before / stored:.2f}x on stored documents)")
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,86 @@
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE, IndexModel
+from pymongo.errors import OperationFailure
 from dotenv import load_dotenv
+from utils.metrics import MongoCommandMetrics
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 # Load environment variables
 load_dotenv()
 
 # MongoDB connection
 MONGODB_URI = os.getenv("MONGODB_URI")
-client = MongoClient(MONGODB_URI)
+# "motor" talks to a real server; "memory" uses mongomock for local load tests
+MONGODB_BACKEND = os.getenv("MONGODB_BACKEND", "motor")
+
+def create_client():
+    if MONGODB_BACKEND == "memory":
+        from mongomock_motor import AsyncMongoMockClient
+        return AsyncMongoMockClient()
+    return AsyncIOMotorClient(
+        MONGODB_URI,
+        maxPoolSize=int(os.getenv("MONGODB_MAX_POOL_SIZE", "100")),
+        minPoolSize=int(os.getenv("MONGODB_MIN_POOL_SIZE", "0")),
+        serverSelectionTimeoutMS=int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+        connectTimeoutMS=int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "5000")),
+        socketTimeoutMS=int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "10000")),
+        readPreference=os.getenv("MONGODB_READ_PREFERENCE", "primary"),
+        event_listeners=[MongoCommandMetrics()],
+    )
+
+client = create_client()
 db = client["dreamhome"]
 user_collection = db["users"]
 property_collection = db["properties"]
 user_activities_collection = db["user_activities"]
-user_query_collection = db["User Query"]
\ No newline at end of file
+user_query_collection = db["User Query"]
+# One document per stored media object: {_id: object key, refs: count}
+media_refs_collection = db["media_refs"]
+# Denormalized counters per listing owner, see utils.owner_stats
+owner_stats_collection = db["owner_stats"]
+
+# One entry per query shape the routes issue; utils.query_audit checks that
+# each shape is served by one of these
+INDEXES = {
+    property_collection: [
+        # GET /properties keyset pages and the default sort of every listing
+        IndexModel([("createdAt", DESCENDING), ("_id", DESCENDING)], name="createdAt_id"),
+        # GET /user/properties
+        IndexModel([("listedBy", ASCENDING), ("createdAt", DESCENDING)], name="listedBy_createdAt"),
+        # Homepage offices/land rows
+        IndexModel([("propertyType", ASCENDING), ("createdAt", DESCENDING)], name="propertyType_createdAt"),
+        # priceMin/priceMax range filters
+        IndexModel([("priceValue", ASCENDING)], name="priceValue"),
+        # search= and location= term lookups (multikey, one per field)
+        IndexModel([("searchTerms.title", ASCENDING)], name="searchTerms_title"),
+        IndexModel([("searchTerms.place", ASCENDING)], name="searchTerms_place"),
+        IndexModel([("searchTerms.body", ASCENDING)], name="searchTerms_body"),
+        # /properties/nearby and /properties/within
+        IndexModel([("geo", GEOSPHERE), ("createdAt", DESCENDING), ("_id", DESCENDING)], name="geo_createdAt"),
+    ],
+    user_query_collection: [
+        # Owner enquiry inbox, newest first, all or unread only
+        IndexModel([("ownerId", ASCENDING), ("createdAt", DESCENDING), ("_id", DESCENDING)], name="ownerId_createdAt"),
+        IndexModel(
+            [("ownerId", ASCENDING), ("read", ASCENDING), ("createdAt", DESCENDING), ("_id", DESCENDING)],
+            name="ownerId_read_createdAt"
+        ),
+        # Recounting a listing's enquiries when a write-behind batch is retried
+        IndexModel([("property_id", ASCENDING)], name="property_id"),
+    ],
+    user_collection: [
+        # /login, /register and the email uniqueness check on profile update
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+}
+
+async def ensure_indexes():
+    for collection, indexes in INDEXES.items():
+        try:
+            await collection.create_indexes(indexes)
+        except OperationFailure as e:
+            # e.g. duplicate emails already stored; keep serving and report it
+            logger.error(f"Failed to create indexes on {collection.name}: {str(e)}")
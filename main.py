@@ -1,14 +1,24 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from routes.auth import router as auth_router
 from routes.user import router as user_router
 from routes.property import router as property_router
 from routes.contact import router as contact_router
+from routes.admin import router as admin_router
+from routes.activity import router as activity_router
+from auth import password_pool
+from database import client, ensure_indexes
+from utils.media_files import MediaFiles
+from utils.metrics import MetricsMiddleware, metrics_response
+from utils.rate_limit import RateLimitMiddleware
+from utils.media_pipeline import shutdown_process_pool
+from utils.write_behind import write_behind
 import os
 
 app = FastAPI(title="DreamHome API")
 
+# Inside CORS, so 429/503 responses still carry the CORS headers
+app.add_middleware(RateLimitMiddleware)
 # CORS Setup
 app.add_middleware(
     CORSMiddleware,
@@ -16,20 +26,44 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+# Outermost, so recorded latency covers every other middleware
+app.add_middleware(MetricsMiddleware)
 
 # Create uploads directory if it doesn't exist
 os.makedirs("uploads/images", exist_ok=True)
 os.makedirs("uploads/videos", exist_ok=True)
 
 # Mount the uploads directory to serve images and videos
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.mount("/uploads", MediaFiles(directory="uploads"), name="uploads")
 
 # Include routers
 app.include_router(auth_router, prefix="/api")
 app.include_router(user_router, prefix="/api")
 app.include_router(property_router, prefix="/api")
 app.include_router(contact_router, prefix="/api")
+app.include_router(admin_router, prefix="/api")
+app.include_router(activity_router, prefix="/api")
+
+@app.on_event("startup")
+async def create_indexes():
+    await ensure_indexes()
+    # Replays events a previous process left in the spill directory
+    await write_behind.start()
+
+@app.on_event("shutdown")
+async def release_resources():
+    # Before the client closes, so the last batch can still be written
+    await write_behind.stop()
+    client.close()
+    shutdown_process_pool()
+    password_pool.shutdown()
+
+# Prometheus scrape target
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return metrics_response()
 
 # Root endpoint
 @app.get("/")
@@ -0,0 +1,167 @@
+from database import property_collection, media_refs_collection, ensure_indexes
+from fastapi import UploadFile
+from utils.bulk import load_manifest, parse_rows, import_properties, export_properties
+from utils.file_utils import object_url
+from utils.media_dedupe import (
+    dedupe_directory, dedupe_bucket, rewrite_media_urls, rebuild_media_refs, remove_local_originals, remove_bucket_originals
+)
+from utils.media_store import save_media, release_media
+from utils.normalize import backfill_stored_shape
+from utils.owner_stats import rebuild_owner_stats
+from utils.query_audit import audit_queries
+import argparse
+import asyncio
+import os
+import sys
+
+async def backfill_properties(args):
+    updated = await backfill_stored_shape(property_collection, batch_size=args.batch_size)
+    print(f"Rewrote {updated} properties in the stored response shape")
+
+async def backfill_owner_stats(args):
+    owners = await rebuild_owner_stats(batch_size=args.batch_size)
+    print(f"Recomputed listing and enquiry counters for {owners} owners")
+
+async def create_indexes(args):
+    await ensure_indexes()
+    print("Indexes are in place")
+
+async def explain_queries(args):
+    report = await audit_queries()
+    for entry in report:
+        flag = "COLLSCAN" if entry["collscan"] else "ok"
+        print(f"{flag:8} {entry['name']:36} {' <- '.join(s for s in entry['stages'] if s)}")
+    scans = [entry["name"] for entry in report if entry["collscan"]]
+    if scans:
+        print(f"{len(scans)} query shape(s) fall back to a collection scan")
+        sys.exit(1)
+
+async def dedupe_media(args):
+    mapping, local, remote = {}, {}, {}
+    if args.uploads_dir:
+        local = dedupe_directory(args.uploads_dir, dry_run=args.dry_run)
+        print(f"{args.uploads_dir}: {len(local)} files -> {len(set(local.values()))} unique")
+        mapping.update(local)
+    if args.bucket:
+        remote = dedupe_bucket(args.bucket, dry_run=args.dry_run)
+        print(f"s3://{args.bucket}: {len(remote)} objects -> {len(set(remote.values()))} unique")
+        mapping.update(remote)
+    rewritten = await rewrite_media_urls(property_collection, mapping, dry_run=args.dry_run)
+    print(f"{'Would rewrite' if args.dry_run else 'Rewrote'} media URLs on {rewritten} properties")
+    if not args.dry_run:
+        keys = await rebuild_media_refs(property_collection, media_refs_collection)
+        print(f"Reference counts rebuilt for {keys} objects")
+        # Only now that nothing points at the old names
+        if local:
+            remove_local_originals(args.uploads_dir, local)
+        if remote:
+            remove_bucket_originals(args.bucket, remote)
+        print(f"Removed {len(local) + len(remote)} original files")
+
+async def upload_manifest_media(manifest: dict, media_dir: str, bucket_name: str, dry_run: bool = False) -> list:
+    # Manifest entries naming local files are uploaded like create_property
+    # does and replaced by their URLs; returns the stored keys
+    local = {name: path for name, path in manifest.items() if not path.startswith(("http://", "https://", "/"))}
+    if not local:
+        return []
+    if dry_run:
+        for name, path in local.items():
+            if not os.path.isfile(os.path.join(media_dir, path)):
+                raise SystemExit(f"Media file {path} for {name} not found in {media_dir}")
+            manifest[name] = object_url(bucket_name, path)
+        return []
+    files = [open(os.path.join(media_dir, path), "rb") for path in local.values()]
+    try:
+        uploads = [
+            (UploadFile(f, filename=path), "videos" if path.lower().endswith((".mp4", ".mov", ".webm")) else "images")
+            for f, path in zip(files, local.values())
+        ]
+        keys = await save_media(uploads, bucket_name)
+    finally:
+        for f in files:
+            f.close()
+    for name, key in zip(local, keys):
+        manifest[name] = object_url(bucket_name, key)
+    print(f"Uploaded {len(keys)} media files from {media_dir}")
+    return keys
+
+async def import_listings(args):
+    manifest = {}
+    if args.manifest:
+        with open(args.manifest, encoding="utf-8") as f:
+            manifest = load_manifest(f.read())
+    uploaded = []
+    if args.media_dir:
+        uploaded = await upload_manifest_media(manifest, args.media_dir, args.bucket, dry_run=args.dry_run)
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    with open(args.path, encoding="utf-8", newline="") as f:
+        report = await import_properties(
+            property_collection, parse_rows(f, fmt), args.listed_by, manifest=manifest,
+            bucket_url=object_url(args.bucket, ""), batch_size=args.batch_size, dry_run=args.dry_run
+        )
+    # Listings took their own references; drop the upload's so unused files go away
+    await release_media(args.bucket, uploaded)
+    for error in report["errors"]:
+        print(f"row {error['row']}: {error['error']}")
+    print(f"{'Would insert' if args.dry_run else 'Inserted'} {report['inserted']} properties, {report['failed']} rows rejected")
+    if report["failed"]:
+        sys.exit(1)
+
+async def export_listings(args):
+    query = {"listedBy": args.listed_by} if args.listed_by else {}
+    count = 0
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        async for line in export_properties(property_collection, query):
+            out.write(line)
+            count += 1
+    finally:
+        if args.output:
+            out.close()
+    print(f"Exported {count} properties", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description="DreamHome maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser("backfill-properties", help="Rewrite stored properties in the current normalized shape")
+    backfill.add_argument("--batch-size", type=int, default=500)
+    backfill.set_defaults(handler=backfill_properties)
+
+    owner_stats = commands.add_parser("backfill-owner-stats", help="Recompute owner counters and link old enquiries to their owners")
+    owner_stats.add_argument("--batch-size", type=int, default=500)
+    owner_stats.set_defaults(handler=backfill_owner_stats)
+
+    indexes = commands.add_parser("ensure-indexes", help="Create the indexes declared in database.INDEXES")
+    indexes.set_defaults(handler=create_indexes)
+
+    audit = commands.add_parser("audit-queries", help="explain() every route query shape and fail on COLLSCANs")
+    audit.set_defaults(handler=explain_queries)
+
+    dedupe = commands.add_parser("dedupe-media", help="Store existing media under content hashes and rewrite property URLs")
+    dedupe.add_argument("--uploads-dir", help="Local uploads directory, e.g. uploads")
+    dedupe.add_argument("--bucket", help="S3 bucket to dedupe in place")
+    dedupe.add_argument("--dry-run", action="store_true")
+    dedupe.set_defaults(handler=dedupe_media)
+
+    importer = commands.add_parser("import-properties", help="Bulk insert listings from an NDJSON or CSV file")
+    importer.add_argument("path")
+    importer.add_argument("--listed-by", required=True, help="User id the listings belong to")
+    importer.add_argument("--format", choices=("ndjson", "csv"), help="Defaults to the file extension")
+    importer.add_argument("--manifest", help="JSON or name,url CSV mapping media names in rows to URLs or files")
+    importer.add_argument("--media-dir", help="Directory holding manifest files that still need uploading")
+    importer.add_argument("--bucket", default=os.getenv("S3_BUCKET_NAME", "dreamhome-uploads-2025"))
+    importer.add_argument("--batch-size", type=int, default=500)
+    importer.add_argument("--dry-run", action="store_true")
+    importer.set_defaults(handler=import_listings)
+
+    exporter = commands.add_parser("export-properties", help="Stream listings out as NDJSON")
+    exporter.add_argument("--listed-by", help="Only this user's listings")
+    exporter.add_argument("--output", help="File to write; defaults to stdout")
+    exporter.set_defaults(handler=export_listings)
+
+    args = parser.parse_args()
+    asyncio.run(args.handler(args))
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,14 @@
-from pydantic import BaseModel
-from typing import Optional, Dict, List
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, List, Union
+from datetime import datetime
 
 class Property(BaseModel):
     title: str
-    location: str
+    location: Union[Dict, str]
     price: str
     bhk: Optional[str] = None
-    property_type: str
+    property_type: str = Field(..., alias="propertyType")
+    description: Optional[str] = None
     transactionType: Optional[str] = None
     anyConstructionDone: Optional[str] = None
     plotFacing: Optional[str] = None
@@ -19,4 +21,12 @@ class Property(BaseModel):
     amenities: Optional[Dict] = None
     propertyFeatures: Optional[Dict] = None
     images: Optional[Dict[str, List[str]]] = None
-    negotiable: Optional[str] = None
\ No newline at end of file
+    videos: Optional[List[str]] = None
+    negotiable: Optional[str] = None
+    availabilityStatus: Optional[str] = None
+    propertyStatus: Optional[str] = None
+    createdAt: Optional[datetime] = None
+
+    class Config:
+        # Accepts both property_type and the stored propertyType spelling
+        allow_population_by_field_name = True
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, Request
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+from auth import get_optional_user
+from utils.events import track_activity
+from datetime import datetime
+
+router = APIRouter(tags=["activity"])
+
+# Most events one request may carry; clients batch views and clicks
+MAX_ACTIVITY_EVENTS = 100
+
+class ActivityEvent(BaseModel):
+    type: str = Field(..., regex="^(view|search|share|shortlist|contact_click|call_click)$")
+    propertyId: Optional[str] = None
+    sessionId: Optional[str] = None
+    meta: Dict[str, str] = {}
+
+class ActivityBatch(BaseModel):
+    events: List[ActivityEvent] = Field(..., max_items=MAX_ACTIVITY_EVENTS)
+
+# Fire-and-forget tracking: events are queued for the next write-behind batch
+# and the request returns without waiting on Mongo
+@router.post("/activity", status_code=202)
+async def record_activity(batch: ActivityBatch, request: Request, user: Optional[dict] = Depends(get_optional_user)):
+    now = datetime.utcnow()
+    for event in batch.events:
+        await track_activity({
+            **event.dict(),
+            "userId": user["_id"] if user else None,
+            "ip": request.client.host if request.client else None,
+            "createdAt": now,
+        })
+    return {"accepted": len(batch.events)}
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends
+from auth import auth_cache, password_pool, require_admin
+from routes.contact import listing_owner_cache
+from utils.cache import listing_cache
+from utils.media_files import hot_file_cache
+from utils.rate_limit import admission, rate_limiter
+from utils.write_behind import write_behind
+
+router = APIRouter(tags=["admin"])
+
+@router.get("/cache/stats", include_in_schema=False, dependencies=[Depends(require_admin)])
+async def cache_stats():
+    return {
+        "listings": await listing_cache.stats(),
+        "auth": await auth_cache.stats(),
+        "contact": await listing_owner_cache.stats(),
+        "media": hot_file_cache.stats(),
+    }
+
+@router.get("/pools/stats", include_in_schema=False, dependencies=[Depends(require_admin)])
+async def pool_stats():
+    return {
+        "passwordHashing": password_pool.stats(),
+        "admission": admission.stats(),
+        "rateLimit": await rate_limiter.stats(),
+        "writeBehind": write_behind.stats(),
+    }
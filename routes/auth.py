@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, EmailStr
+from pymongo.errors import DuplicateKeyError
 from database import user_collection
-from auth import hash_password, verify_password, create_access_token
+from auth import hash_password, verify_and_update, create_access_token
 from bson import ObjectId
 
 router = APIRouter(tags=["auth"])  # Remove prefix="/api"
@@ -16,21 +17,31 @@ class UserLogin(BaseModel):
     password: str
 
 @router.post("/register")
-def register(user: UserRegister):
-    if user_collection.find_one({"email": user.email}):
+async def register(user: UserRegister):
+    if await user_collection.find_one({"email": user.email}):
+        raise HTTPException(status_code=400, detail="User already exists")
+    hashed_password = await hash_password(user.password)
+    try:
+        await user_collection.insert_one({
+            "name": user.name,
+            "email": user.email,
+            "password": hashed_password
+        })
+    except DuplicateKeyError:
+        # Registered by a concurrent request since the check above
         raise HTTPException(status_code=400, detail="User already exists")
-    hashed_password = hash_password(user.password)
-    user_collection.insert_one({
-        "name": user.name,
-        "email": user.email,
-        "password": hashed_password
-    })
     return {"message": "User registered successfully"}
 
 @router.post("/login")
-def login(user: UserLogin):
-    db_user = user_collection.find_one({"email": user.email})
-    if not db_user or not verify_password(user.password, db_user["password"]):
+async def login(user: UserLogin):
+    db_user = await user_collection.find_one({"email": user.email})
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    valid, new_hash = await verify_and_update(user.password, db_user["password"])
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash:
+        # BCRYPT_ROUNDS changed since this hash was made
+        await user_collection.update_one({"_id": db_user["_id"]}, {"$set": {"password": new_hash}})
     token = create_access_token(data={"sub": str(db_user["_id"]), "email": db_user["email"]})
     return {"access_token": token, "token_type": "bearer"}
\ No newline at end of file
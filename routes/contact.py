@@ -1,23 +1,49 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from database import user_query_collection, property_collection
+from typing import List, Optional
+from auth import get_current_user
+from database import property_collection, user_query_collection
+from utils.cache import ResponseCache, create_cache_backend
+from utils.events import submit_enquiry
+from utils.owner_stats import owner_stats, record_read
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, KEYSET_SORT, apply_cursor, split_page
 from bson import ObjectId
+from bson.errors import InvalidId
 from datetime import datetime
+import os
 
 router = APIRouter(prefix="/api", tags=["contact"])
 
+# Most enquiries one mark-read call may name; use all=true for more
+MAX_MARK_READ_IDS = 500
+
+# Owner and title per listing for contact-owner. Neither changes once a
+# listing is created, so repeat enquiries skip the lookup
+listing_owner_cache = ResponseCache("contact", create_cache_backend(), ttl=int(os.getenv("CONTACT_CACHE_TTL", "300")))
+
 class ContactRequest(BaseModel):
     name: str
     contact_no: str | None = None
     message: str
     property_id: str
 
+class MarkReadRequest(BaseModel):
+    ids: List[str] = []
+    all: bool = False
+
 @router.post("/contact-owner")
 async def contact_owner(request: ContactRequest):
     try:
-        # Validate property_id
-        if not property_collection.find_one({"_id": ObjectId(request.property_id)}):
-            raise HTTPException(status_code=404, detail="Property not found")
+        key = f"{listing_owner_cache.namespace}:{request.property_id}"
+        prop = await listing_owner_cache.get(key)
+        if prop is None:
+            # Validate property_id
+            prop = await property_collection.find_one({"_id": ObjectId(request.property_id)}, {"_id": 0, "listedBy": 1, "title": 1})
+            if not prop:
+                raise HTTPException(status_code=404, detail="Property not found")
+            await listing_owner_cache.set(key, prop)
 
         # Store query in User Query collection
         query_data = {
@@ -25,9 +51,75 @@ async def contact_owner(request: ContactRequest):
             "contact_no": request.contact_no or "",
             "message": request.message,
             "property_id": request.property_id,
+            "propertyTitle": prop.get("title"),
+            "ownerId": prop.get("listedBy"),
+            "read": False,
             "createdAt": datetime.now(),
         }
-        result = user_query_collection.insert_one(query_data)
-        return {"message": "Query submitted successfully", "query_id": str(result.inserted_id)}
+        # Stored and counted against the owner with the next write-behind batch
+        query_id = await submit_enquiry(query_data)
+        return {"message": "Query submitted successfully", "query_id": str(query_id)}
+    except HTTPException:
+        raise
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid property id")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+def enquiry_item(query: dict) -> dict:
+    return {
+        "id": str(query["_id"]),
+        "propertyId": query.get("property_id"),
+        "propertyTitle": query.get("propertyTitle"),
+        "name": query.get("name"),
+        "contact_no": query.get("contact_no"),
+        "message": query.get("message"),
+        "read": query.get("read", False),
+        "createdAt": query.get("createdAt"),
+    }
+
+# The owner's inbox, newest first and keyset-paginated like GET /properties
+@router.get("/enquiries")
+async def get_enquiries(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    unread: bool = False,
+    propertyId: Optional[str] = None,
+    user: dict = Depends(get_current_user)
+):
+    query = {"ownerId": user["_id"]}
+    if unread:
+        query["read"] = False
+    if propertyId:
+        query["property_id"] = propertyId
+    try:
+        query = apply_cursor(query, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    docs = await user_query_collection.find(query).sort(KEYSET_SORT).to_list(length=limit + 1)
+    docs, next_token = split_page(docs, limit)
+    headers = {"X-Next-Cursor": next_token} if next_token else {}
+    return JSONResponse(content=jsonable_encoder([enquiry_item(doc) for doc in docs]), headers=headers)
+
+@router.get("/enquiries/unread-count")
+async def get_unread_count(user: dict = Depends(get_current_user)):
+    stats = await owner_stats(user["_id"])
+    return {"unread": max(stats["unread"], 0)}
+
+@router.post("/enquiries/mark-read")
+async def mark_enquiries_read(request: MarkReadRequest, user: dict = Depends(get_current_user)):
+    query = {"ownerId": user["_id"], "read": False}
+    if not request.all:
+        if not request.ids:
+            raise HTTPException(status_code=400, detail="Give ids or set all")
+        if len(request.ids) > MAX_MARK_READ_IDS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_MARK_READ_IDS} ids per call")
+        try:
+            query["_id"] = {"$in": [ObjectId(enquiry_id) for enquiry_id in request.ids]}
+        except InvalidId:
+            raise HTTPException(status_code=400, detail="Invalid enquiry id")
+    # Only unread enquiries match, so modified_count is exactly what the
+    # unread counter has to drop by
+    result = await user_query_collection.update_many(query, {"$set": {"read": True, "readAt": datetime.now()}})
+    await record_read(user["_id"], result.modified_count)
+    return {"marked": result.modified_count}
@@ -1,12 +1,31 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
-from fastapi.security import OAuth2PasswordBearer
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, UploadFile, File, Form, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Union
-from database import property_collection, user_collection
-from auth import decode_access_token
-from utils.file_utils import secure_filename, save_file_to_s3, normalize_images_field
+from database import property_collection
+from auth import get_current_user
+from utils.bulk import load_manifest, parse_rows, import_properties, export_properties
+from utils.cache import listing_cache
+from utils.geo import MAX_BOX_DEGREES, MAX_RADIUS_KM, near, within_box
+from utils.file_utils import (
+    UploadError, IMAGE_CATEGORIES, MAX_IMAGE_SIZE, MAX_VIDEO_SIZE, S3_PRESIGN_EXPIRES, object_url, normalize_images_field
+)
+from utils.media_store import save_media, release_media, presign_uploads, complete_upload, commit_uploads
+from utils.media_pipeline import process_property_media
+from utils.owner_stats import owner_stats, record_listings
+from utils.normalize import LAND_TYPES, LISTING_EXCLUDED_FIELDS, listing_projection, normalize_many, normalize_property, prepare_for_storage
+from utils.property_query import PropertyFilters, build_filter_query, facet_pipeline, facet_counts
+from utils.search import query_terms, relevance_stages
+from utils.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, KEYSET_SORT, apply_cursor, decode_cursor, encode_cursor, split_page,
+    through_filter
+)
+from utils.streaming import STREAM_BATCH_SIZE, streaming_listing
 from datetime import datetime
 from bson import ObjectId
+from botocore.exceptions import ClientError
+import io
 import logging
 import json
 import os
@@ -17,8 +36,6 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["properties"])
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/login")
-
 class PropertyResponse(BaseModel):
     id: str
     title: str
@@ -29,20 +46,119 @@ class PropertyResponse(BaseModel):
     description: Optional[str] = None
     images: Dict[str, List[str]]
     videos: List[str]
-    createdAt: str
+    createdAt: datetime
     negotiable: Optional[str] = None
     availabilityStatus: Optional[str] = None
     propertyStatus: Optional[str] = None
     amenities: Optional[Dict] = None
     listedBy: Optional[str] = None
     propertyFeatures: Optional[Dict] = None
+    imageVariants: Optional[Dict[str, List[Optional[Dict]]]] = None
+    geo: Optional[Dict] = None
+    geoPrecision: Optional[str] = None
+    distanceKm: Optional[float] = None
 
     class Config:
         arbitrary_types_allowed = True
         json_encoders = {ObjectId: str}
 
+RESPONSE_FIELDS = tuple(PropertyResponse.__fields__)
+# Fields a client may request through ?fields= on the listing endpoint
+PROJECTABLE_FIELDS = frozenset(RESPONSE_FIELDS) - {"id"}
+# Accepted in ?fields= but always returned
+ID_FIELDS = ("id", "_id")
+
+def serialize_listing(properties: list) -> list:
+    return [jsonable_encoder(PropertyResponse(**prop)) for prop in properties]
+
+# Serves a read-only listing from listing_cache; load() returns the JSON-ready
+# items and any response headers, and only runs on a miss
+async def cached_listing(key: str, load):
+    cached = await listing_cache.get(key)
+    if cached is None:
+        items, headers = await load()
+        cached = {"items": items, "headers": headers}
+        await listing_cache.set(key, cached)
+    return JSONResponse(content=cached["items"], headers=cached["headers"])
+
+class UploadFileInfo(BaseModel):
+    category: str
+    filename: str
+    contentType: str
+    size: int
+
+class UploadRequest(BaseModel):
+    files: List[UploadFileInfo]
+
+class UploadedPart(BaseModel):
+    partNumber: int
+    etag: str
+
+class CompleteUploadRequest(BaseModel):
+    key: str
+    uploadId: str
+    parts: List[UploadedPart]
+
+class CommitPropertyRequest(BaseModel):
+    formData: Dict
+    images: Dict[str, List[str]] = {}
+    videos: List[str] = []
+
+def media_bucket() -> str:
+    return os.getenv("S3_BUCKET_NAME", "dreamhome-uploads-2025")
+
+# Saves a listing whose media is already stored under file_paths; the
+# references on that media are released again if the insert fails
+async def store_property(
+    background_tasks: BackgroundTasks, data: dict, user_id: str, bucket_name: str,
+    image_paths: dict, video_paths: list
+):
+    property_data = {
+        "title": data.get("title"),
+        "propertyType": data.get("propertyType"),
+        "price": data.get("price"),
+        "location": data.get("locationDetails", {}),
+        "bhk": data.get("bhk"),
+        "description": data.get("description"),
+        "images": normalize_images_field({
+            category: [object_url(bucket_name, file_path) for file_path in file_paths]
+            for category, file_paths in image_paths.items()
+        }),
+        "videos": [object_url(bucket_name, file_path) for file_path in video_paths],
+        "createdAt": datetime.utcnow(),
+        "negotiable": data.get("negotiable"),
+        "availabilityStatus": data.get("availabilityStatus"),
+        "propertyStatus": data.get("propertyStatus"),
+        "amenities": data.get("amenities", {}),
+        "listedBy": str(user_id),  # Convert ObjectId to string
+        "propertyFeatures": data.get("propertyFeatures", {})
+    }
+
+    prepare_for_storage(property_data)
+    try:
+        result = await property_collection.insert_one(property_data)
+    except Exception:
+        # Don't leave orphaned media behind for a listing that was never saved
+        stored = [file_path for file_paths in image_paths.values() for file_path in file_paths] + video_paths
+        await release_media(bucket_name, stored)
+        raise
+    await record_listings(property_data["listedBy"])
+    await listing_cache.invalidate()
+    if image_paths:
+        # Renditions are produced after the response is sent, in a process pool
+        background_tasks.add_task(
+            process_property_media, property_collection, result.inserted_id, bucket_name,
+            image_paths, on_complete=listing_cache.invalidate
+        )
+    property_data["id"] = str(result.inserted_id)
+    property_data["_id"] = str(property_data["id"])  # Ensure _id is string if present
+    for field in LISTING_EXCLUDED_FIELDS:
+        property_data.pop(field, None)
+    return property_data
+
 @router.post("/properties")
 async def create_property(
+    background_tasks: BackgroundTasks,
     formData: str = Form(...),
     exterior_view: List[UploadFile] = File(default=[]),
     living_room: List[UploadFile] = File(default=[]),
@@ -54,642 +170,403 @@ async def create_property(
     location_map: List[UploadFile] = File(default=[]),
     others: List[UploadFile] = File(default=[]),
     videos: List[UploadFile] = File(default=[]),
-    token: str = Depends(oauth2_scheme)
+    user: dict = Depends(get_current_user)
 ):
     try:
-        payload = decode_access_token(token)
-        if not payload:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        user_id = payload.get("sub")
-        user = user_collection.find_one({"_id": ObjectId(user_id)})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-
+        user_id = user["_id"]
         data = json.loads(formData)
-        bucket_name = os.getenv("S3_BUCKET_NAME", "dreamhome-uploads-2025")
+        bucket_name = media_bucket()
 
-        image_urls = {
-            "exterior_view": [], "living_room": [], "bedrooms": [], "bathrooms": [],
-            "kitchen": [], "floor_plan": [], "master_plan": [], "location_map": [], "others": []
-        }
-        video_urls = []
-
-        # Handle image uploads to S3
+        # Validate every file before anything is uploaded
+        image_uploads = []
         for category, files in [
             ("exterior_view", exterior_view), ("living_room", living_room), ("bedrooms", bedrooms),
             ("bathrooms", bathrooms), ("kitchen", kitchen), ("floor_plan", floor_plan),
             ("master_plan", master_plan), ("location_map", location_map), ("others", others)
         ]:
             for img in files:
-                if img.size > 10 * 1024 * 1024:
+                if img.size > MAX_IMAGE_SIZE:
                     raise HTTPException(status_code=400, detail=f"Image {img.filename} exceeds 10MB limit")
-                safe_name = secure_filename(img.filename)
-                file_path = f"images/{safe_name}"
-                url = await save_file_to_s3(img, bucket_name, file_path)
-                if url:
-                    image_urls[category].append(url)
-                else:
-                    logger.warning(f"Skipping image {img.filename} due to upload failure")
-                    raise HTTPException(status_code=500, detail=f"Failed to upload image {img.filename} to S3")
-
-        # Handle video uploads to S3
+                image_uploads.append((category, img))
+
         for video in videos:
-            if video.size > 50 * 1024 * 1024:
+            if video.size > MAX_VIDEO_SIZE:
                 raise HTTPException(status_code=400, detail=f"Video {video.filename} exceeds 50MB limit")
-            safe_name = secure_filename(video.filename)
-            file_path = f"videos/{safe_name}"
-            url = await save_file_to_s3(video, bucket_name, file_path)
-            if url:
-                video_urls.append(url)
-            else:
-                logger.warning(f"Skipping video {video.filename} due to upload failure")
-                raise HTTPException(status_code=500, detail=f"Failed to upload video {video.filename} to S3")
-
-        property_data = {
-            "title": data.get("title"),
-            "propertyType": data.get("propertyType"),
-            "price": data.get("price"),
-            "location": data.get("locationDetails", {}),
-            "bhk": data.get("bhk"),
-            "description": data.get("description"),
-            "images": image_urls,
-            "videos": video_urls,
-            "createdAt": datetime.utcnow().isoformat(),
-            "negotiable": data.get("negotiable"),
-            "availabilityStatus": data.get("availabilityStatus"),
-            "propertyStatus": data.get("propertyStatus"),
-            "amenities": data.get("amenities", {}),
-            "listedBy": str(user_id),  # Convert ObjectId to string
-            "propertyFeatures": data.get("propertyFeatures", {})
-        }
-
-        result = property_collection.insert_one(property_data)
-        property_data["id"] = str(result.inserted_id)
-        property_data["_id"] = str(property_data["id"])  # Ensure _id is string if present
-        return property_data
+
+        # Images and videos are stored concurrently under their content hash
+        uploads = [(img, "images") for _, img in image_uploads] + [(video, "videos") for video in videos]
+        try:
+            uploaded_paths = await save_media(uploads, bucket_name)
+        except UploadError as e:
+            logger.warning(f"Rolled back uploads for new property: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
+
+        image_paths = {}
+        for (category, _), file_path in zip(image_uploads, uploaded_paths):
+            image_paths.setdefault(category, []).append(file_path)
+        video_paths = uploaded_paths[len(image_uploads):]
+        return await store_property(background_tasks, data, user_id, bucket_name, image_paths, video_paths)
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid form data")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in create_property: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/properties")
-async def get_properties():
+# Two-phase alternative to POST /properties that keeps media bytes off the API:
+# the client asks for upload targets, sends files straight to S3, then commits
+# the property with the returned keys
+@router.post("/properties/uploads")
+async def request_uploads(request: UploadRequest, user: dict = Depends(get_current_user)):
+    user_id = user["_id"]
     try:
-        properties = []
-        residential_types = ["Apartment", "Independent House", "Villa", "Builder Floor", "Studio"]
-        land_types = ["Residential Plot", "Commercial Plot", "Agricultural Land", "Industrial Land"]
-
-        for prop in property_collection.find({}, {"_id": 0}):
-            prop["id"] = str(prop.get("_id"))
-            if prop.get("propertyType") in residential_types:
-                prop["availabilityStatus"] = prop.get("availabilityStatus", "N/A")
-                prop["propertyStatus"] = prop.get("propertyStatus", "N/A")
-                prop["bhk"] = prop.get("bhk", "N/A")
-                features = prop.get("propertyFeatures", {})
-                prop["amenities"] = {
-                    **{
-                        "parking": "No", "lift": "No", "security": "No", "powerBackup": "No",
-                        "waterSupply": "No", "boundaryWall": "No", "gatedCommunity": "No", "bathrooms": "1"
-                    },
-                    **prop.get("amenities", {}),
-                    **{
-                        "totalFloors": features.get("totalFloors", "N/A"),
-                        "floorNo": features.get("floorNo", "N/A"),
-                        "furnishing": features.get("furnishing", "N/A"),
-                        "builtupArea": features.get("builtupArea", "N/A"),
-                        "carpetArea": features.get("carpetArea", "N/A")
-                    }
-                }
-            elif prop.get("propertyType") in land_types:
-                prop["availabilityStatus"] = prop.get("availabilityStatus", "N/A")
-                prop["propertyStatus"] = prop.get("propertyStatus", "N/A")
-                prop["bhk"] = prop.get("bhk", "N/A")
-                features = prop.get("propertyFeatures", {})
-                prop["amenities"] = {
-                    **{
-                        "parking": "No", "security": "No", "powerBackup": "No",
-                        "waterSupply": "No", "boundaryWall": "No", "gatedCommunity": "No"
-                    },
-                    **prop.get("amenities", {}),
-                }
-                prop["propertyFeatures"] = {
-                    **{
-                        "areaUnit": "N/A",
-                        "areaValue": "N/A",
-                        "anyConstructionDone": "No",
-                        "plotFacing": "N/A",
-                        "transactionType": "N/A",
-                        "roadAccessType": "N/A"
-                    },
-                    **features
-                }
-            else:  # Office
-                prop["availabilityStatus"] = prop.get("availabilityStatus", "N/A")
-                prop["propertyStatus"] = prop.get("propertyStatus", "N/A")
-                prop["bhk"] = prop.get("bhk", "N/A")
-                features = prop.get("propertyFeatures", {})
-                prop["amenities"] = {
-                    **{
-                        "parking": "No", "security": "No", "powerBackup": "No",
-                        "waterSupply": "No", "boundaryWall": "No", "gatedCommunity": "No",
-                        "lift": "No", "internet": "No", "publicTransport": "No",
-                        "pantry": "Not Available", "washroom": "Not Available"
-                    },
-                    **prop.get("amenities", {}),
-                }
-                prop["propertyFeatures"] = {
-                    **{
-                        "carpetArea": "N/A", "floorNo": "N/A", "furnishing": "N/A",
-                        "cabins": "N/A", "workstations": "N/A", "roadAccessType": "N/A"
-                    },
-                    **features
-                }
-                
-            prop["listedBy"] = prop.get("listedBy", "Unknown")
-            properties.append(prop)
-        return properties
+        targets = await presign_uploads(user_id, [file.dict() for file in request.files], media_bucket())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ClientError as e:
+        logger.error(f"Error presigning uploads: {str(e)}")
+        raise HTTPException(status_code=502, detail="Could not prepare uploads")
+    return {"uploads": targets, "expiresIn": S3_PRESIGN_EXPIRES}
+
+@router.post("/properties/uploads/complete")
+async def finish_multipart_upload(request: CompleteUploadRequest, user: dict = Depends(get_current_user)):
+    user_id = user["_id"]
+    parts = [part.dict() for part in request.parts]
+    try:
+        await complete_upload(user_id, request.key, request.uploadId, parts, media_bucket())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ClientError as e:
+        logger.warning(f"Could not complete upload {request.key}: {str(e)}")
+        raise HTTPException(status_code=400, detail="Could not complete upload")
+    return {"key": request.key}
+
+@router.post("/properties/commit")
+async def commit_property(
+    background_tasks: BackgroundTasks,
+    request: CommitPropertyRequest,
+    user: dict = Depends(get_current_user)
+):
+    user_id = user["_id"]
+    bucket_name = media_bucket()
+    try:
+        image_paths, video_paths = await commit_uploads(
+            user_id, {"images": request.images, "videos": request.videos}, bucket_name
+        )
+        return await store_property(background_tasks, request.formData, user_id, bucket_name, image_paths, video_paths)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
+        logger.error(f"Error in commit_property: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/user/properties", response_model=List[PropertyResponse])
-async def get_user_properties(token: str = Depends(oauth2_scheme)):
-    payload = decode_access_token(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    user_id = payload.get("sub")
-    properties = list(property_collection.find({"listedBy": user_id}))
-    residential_types = ["Flat", "Apartment", "Villa", "House", "Farm House"]
-    land_types = ["Residential Land", "Commercial Land", "Agriculture Land"]
-    
-    for prop in properties:
-        prop["id"] = str(prop["_id"])
-        prop["createdAt"] = prop["createdAt"].isoformat()
-        prop["images"] = normalize_images_field(prop.get("images", []))
-        prop["negotiable"] = prop.get("negotiable", "No")
-        
-        if prop.get("propertyType") in residential_types:
-            prop["availabilityStatus"] = prop.get("availabilityStatus", "Ready to Move")
-            prop["propertyStatus"] = prop.get("propertyStatus", "New Project")
-            prop["bhk"] = prop.get("bhk", "N/A")
-            features = prop.get("propertyFeatures", {})
-            prop["amenities"] = {
-                **{
-                    "parking": "No", "lift": "No", "security": "No", "powerBackup": "No",
-                    "waterSupply": "No", "boundaryWall": "No", "gatedCommunity": "No", "bathrooms": "1"
-                },
-                **prop.get("amenities", {}),
-                **{
-                    "totalFloors": features.get("totalFloors", "N/A"),
-                    "floorNo": features.get("floorNo", "N/A"),
-                    "furnishing": features.get("furnishing", "N/A"),
-                    "builtupArea": features.get("builtupArea", "N/A"),
-                    "carpetArea": features.get("carpetArea", "N/A")
-                }
-            }
-        elif prop.get("propertyType") in land_types:
-            prop["availabilityStatus"] = prop.get("availabilityStatus", "N/A")
-            prop["propertyStatus"] = prop.get("propertyStatus", "N/A")
-            prop["bhk"] = prop.get("bhk", "N/A")
-            features = prop.get("propertyFeatures", {})
-            prop["amenities"] = {
-                **{
-                    "parking": "No", "security": "No", "powerBackup": "No",
-                    "waterSupply": "No", "boundaryWall": "No", "gatedCommunity": "No"
-                },
-                **prop.get("amenities", {}),
-            }
-            prop["propertyFeatures"] = {
-                **{
-                    "areaUnit": "N/A",
-                    "areaValue": "N/A",
-                    "anyConstructionDone": "No",
-                    "plotFacing": "N/A",
-                    "transactionType": "N/A",
-                    "roadAccessType": "N/A"
-                },
-                **features
-            }
-        else:  # Office
-            prop["availabilityStatus"] = prop.get("availabilityStatus", "N/A")
-            prop["propertyStatus"] = prop.get("propertyStatus", "N/A")
-            prop["bhk"] = prop.get("bhk", "N/A")
-            features = prop.get("propertyFeatures", {})
-            prop["amenities"] = {
-                **{
-                    "parking": "No", "security": "No", "powerBackup": "No",
-                    "waterSupply": "No", "boundaryWall": "No", "gatedCommunity": "No",
-                    "lift": "No", "internet": "No", "publicTransport": "No",
-                    "pantry": "Not Available", "washroom": "Not Available"
-                },
-                **prop.get("amenities", {}),
-            }
-            prop["propertyFeatures"] = {
-                **{
-                    "carpetArea": "N/A", "floorNo": "N/A", "furnishing": "N/A",
-                    "cabins": "N/A", "workstations": "N/A", "roadAccessType": "N/A"
-                },
-                **features
-            }
-        
-        prop["listedBy"] = prop.get("listedBy", "Unknown")
-    return properties
+async def get_user_properties(user: dict = Depends(get_current_user)):
+    properties = await property_collection.find({"listedBy": user["_id"]}, listing_projection()).sort("createdAt", -1).to_list(length=None)
+    return normalize_many(properties)
+
+# Only what a dashboard row shows; the counters are maintained by the write paths
+DASHBOARD_PROJECTION = {
+    "title": 1, "propertyType": 1, "price": 1, "location": 1, "images": 1, "createdAt": 1,
+    "availabilityStatus": 1, "propertyStatus": 1, "enquiryCount": 1, "lastEnquiryAt": 1,
+}
+
+def dashboard_item(prop: dict) -> dict:
+    images = normalize_images_field(prop.get("images"))
+    cover = next((images[category][0] for category in IMAGE_CATEGORIES if images.get(category)), None)
+    return {
+        "id": str(prop["_id"]),
+        "title": prop.get("title"),
+        "propertyType": prop.get("propertyType"),
+        "price": prop.get("price"),
+        "location": prop.get("location"),
+        "cover": cover,
+        "createdAt": prop.get("createdAt"),
+        "availabilityStatus": prop.get("availabilityStatus"),
+        "propertyStatus": prop.get("propertyStatus"),
+        "enquiryCount": prop.get("enquiryCount", 0),
+        "lastEnquiryAt": prop.get("lastEnquiryAt"),
+    }
+
+# Owner totals plus one keyset page of their listings with per-listing counters
+@router.get("/user/dashboard")
+async def get_user_dashboard(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    user: dict = Depends(get_current_user)
+):
+    try:
+        query = apply_cursor({"listedBy": user["_id"]}, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    docs = await property_collection.find(query, DASHBOARD_PROJECTION).sort(KEYSET_SORT).to_list(length=limit + 1)
+    docs, next_token = split_page(docs, limit)
+    headers = {"X-Next-Cursor": next_token} if next_token else {}
+    content = {"stats": await owner_stats(user["_id"]), "properties": [dashboard_item(prop) for prop in docs]}
+    return JSONResponse(content=jsonable_encoder(content), headers=headers)
+
+# Bulk onboarding: NDJSON or CSV rows validated against models.Property, with
+# an optional manifest mapping media names in the rows to hosted URLs
+@router.post("/user/properties/import")
+async def import_user_properties(
+    file: UploadFile = File(...),
+    manifest: Optional[UploadFile] = File(default=None),
+    format: Optional[str] = Form(default=None),
+    dryRun: bool = Form(default=False),
+    user: dict = Depends(get_current_user)
+):
+    fmt = format or ("csv" if (file.filename or "").lower().endswith(".csv") else "ndjson")
+    if fmt not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+    try:
+        media = load_manifest((await manifest.read()).decode("utf-8")) if manifest else {}
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid media manifest")
+
+    # The upload is spooled to disk by Starlette; rows are read from it lazily,
+    # off the event loop
+    lines = io.TextIOWrapper(file.file, encoding="utf-8", errors="replace", newline="")
+    report = await import_properties(
+        property_collection, parse_rows(lines, fmt), user["_id"], manifest=media,
+        bucket_url=object_url(media_bucket(), ""), dry_run=dryRun
+    )
+    if report["inserted"] and not dryRun:
+        await listing_cache.invalidate()
+    return report
+
+@router.get("/user/properties/export")
+async def export_user_properties(user: dict = Depends(get_current_user)):
+    return StreamingResponse(
+        export_properties(property_collection, {"listedBy": user["_id"]}),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="properties.ndjson"'},
+    )
+
+def listing_item(prop: dict) -> dict:
+    # PropertyResponse's fields without building the model, for streamed rows
+    prop = normalize_property(prop)
+    return {field: prop.get(field) for field in RESPONSE_FIELDS}
+
+def partial_item(prop: dict, selected: list) -> dict:
+    # Partial documents can't satisfy PropertyResponse, so skip the defaults
+    # and return the requested fields as-is
+    prop["id"] = str(prop.pop("_id"))
+    if isinstance(prop.get("location"), str):
+        prop["location"] = {"city": prop["location"], "state": ""}
+    if "images" in prop:
+        prop["images"] = normalize_images_field(prop["images"])
+    if "createdAt" not in selected:
+        prop.pop("createdAt", None)
+    return prop
 
 @router.get("/properties", response_model=List[PropertyResponse])
-async def get_properties():
+async def get_properties(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    stream: Optional[str] = Query(None, regex="^(ndjson|array)$")
+):
     try:
-        properties = []
-        residential_types = ["Flat", "Apartment", "Villa", "House", "Farm House"]
-        land_types = ["Residential Land", "Commercial Land", "Agriculture Land"]
-        for prop in property_collection.find():
-            prop["id"] = str(prop["_id"])
-            prop["createdAt"] = prop["createdAt"].isoformat()
-            if isinstance(prop.get("location"), str):
-                prop["location"] = {"city": prop["location"], "state": ""}
-            prop["description"] = prop.get("description", "")
-            prop["images"] = normalize_images_field(prop.get("images", []))
-            prop["negotiable"] = prop.get("negotiable", "No")
-            
-            if prop.get("propertyType") in residential_types:
-                prop["availabilityStatus"] = prop.get("availabilityStatus", "Ready to Move")
-                prop["propertyStatus"] = prop.get("propertyStatus", "New Project")
-                prop["bhk"] = prop.get("bhk", "N/A")
-                features = prop.get("propertyFeatures", {})
-                prop["amenities"] = {
-                    **{
-                        "parking": "No", "lift": "No", "security": "No", "powerBackup": "No",
-                        "waterSupply": "No", "boundaryWall": "No", "gatedCommunity": "No", "bathrooms": "1"
-                    },
-                    **prop.get("amenities", {}),
-                    **{
-                        "totalFloors": features.get("totalFloors", "N/A"),
-                        "floorNo": features.get("floorNo", "N/A"),
-                        "furnishing": features.get("furnishing", "N/A"),
-                        "builtupArea": features.get("builtupArea", "N/A"),
-                        "carpetArea": features.get("carpetArea", "N/A")
-                    }
-                }
-            elif prop.get("propertyType") in land_types:
-                prop["availabilityStatus"] = prop.get("availabilityStatus", "N/A")
-                prop["propertyStatus"] = prop.get("propertyStatus", "N/A")
-                prop["bhk"] = prop.get("bhk", "N/A")
-                features = prop.get("propertyFeatures", {})
-                prop["amenities"] = {
-                    **{
-                        "parking": "No", "security": "No", "powerBackup": "No",
-                        "waterSupply": "No", "boundaryWall": "No", "gatedCommunity": "No"
-                    },
-                    **prop.get("amenities", {}),
-                }
-                prop["propertyFeatures"] = {
-                    **{
-                        "areaUnit": "N/A",
-                        "areaValue": "N/A",
-                        "anyConstructionDone": "No",
-                        "plotFacing": "N/A",
-                        "transactionType": "N/A",
-                        "roadAccessType": "N/A"
-                    },
-                    **features
-                }
-            else:  # Office
-                prop["availabilityStatus"] = prop.get("availabilityStatus", "N/A")
-                prop["propertyStatus"] = prop.get("propertyStatus", "N/A")
-                prop["bhk"] = prop.get("bhk", "N/A")
-                features = prop.get("propertyFeatures", {})
-                prop["amenities"] = {
-                    **{
-                        "parking": "No", "security": "No", "powerBackup": "No",
-                        "waterSupply": "No", "boundaryWall": "No", "gatedCommunity": "No",
-                        "lift": "No", "internet": "No", "publicTransport": "No",
-                        "pantry": "Not Available", "washroom": "Not Available"
-                    },
-                    **prop.get("amenities", {}),
-                }
-                prop["propertyFeatures"] = {
-                    **{
-                        "carpetArea": "N/A", "floorNo": "N/A", "furnishing": "N/A",
-                        "cabins": "N/A", "workstations": "N/A", "roadAccessType": "N/A"
-                    },
-                    **features
-                }
-                
-            prop["listedBy"] = prop.get("listedBy", "Unknown")
-            properties.append(prop)
-        return properties
+        try:
+            query = apply_cursor({}, cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+        if fields:
+            selected = [f.strip() for f in fields.split(",") if f.strip()]
+            unknown = [f for f in selected if f not in PROJECTABLE_FIELDS and f not in ID_FIELDS]
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+            # The id comes with every item anyway
+            selected = [f for f in selected if f not in ID_FIELDS]
+            # createdAt is always needed to build the next cursor
+            projection = {f: 1 for f in selected}
+            projection["createdAt"] = 1
+        else:
+            selected = []
+            projection = None
+
+        if stream:
+            # The page boundary comes from an index-only probe so the cursor
+            # header can be sent before the body; the page is then streamed up
+            # to that boundary
+            probe = await property_collection.find(query, {"createdAt": 1}).sort(KEYSET_SORT).skip(limit - 1).limit(2).to_list(length=2)
+            headers, page_query = {}, query
+            if len(probe) == 2:
+                headers["X-Next-Cursor"] = encode_cursor(probe[0].get("createdAt"), probe[0]["_id"])
+                page_query = {"$and": [query, through_filter(probe[0])]} if query else through_filter(probe[0])
+            docs = property_collection.find(page_query, projection or listing_projection()).sort(KEYSET_SORT).limit(limit).batch_size(STREAM_BATCH_SIZE)
+            transform = (lambda prop: partial_item(prop, selected)) if projection else listing_item
+            return streaming_listing(docs, transform, stream, headers)
+
+        async def load():
+            docs = await property_collection.find(query, projection or listing_projection()).sort(KEYSET_SORT).to_list(length=limit + 1)
+            docs, next_token = split_page(docs, limit)
+            headers = {"X-Next-Cursor": next_token} if next_token else {}
+            if not projection:
+                return serialize_listing(normalize_many(docs)), headers
+            return jsonable_encoder([partial_item(prop, selected) for prop in docs]), headers
+
+        # fields=id alone selects nothing extra but is still a partial response
+        key = listing_cache.key_for(
+            "all", limit=limit, cursor=cursor, fields=",".join(["id", *sorted(selected)]) if projection else None
+        )
+        return await cached_listing(key, load)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/properties/filtered", response_model=List[PropertyResponse])
 async def get_filtered_properties(
-    location: Optional[str] = None,
-    priceMin: Optional[str] = None,
-    priceMax: Optional[str] = None,
-    bhk: Optional[str] = None,
-    propertyType: Optional[str] = None,
-    availabilityStatus: Optional[str] = None,
-    propertyStatus: Optional[str] = None,
-    parking: Optional[str] = None,
-    lift: Optional[str] = None,
-    security: Optional[str] = None,
-    anyConstructionDone: Optional[str] = None,
-    plotFacing: Optional[str] = None,
-    transactionType: Optional[str] = None,
-    internet: Optional[str] = None,
-    publicTransport: Optional[str] = None,
-    search: Optional[str] = None
+    filters: PropertyFilters = Depends(),
+    stream: Optional[str] = Query(None, regex="^(ndjson|array)$")
 ):
     try:
-        query = {}
-        if location:
-            query["location.city"] = {"$regex": location, "$options": "i"}
-        if priceMin or priceMax:
-            query["price"] = {}
-            try:
-                if priceMin:
-                    query["price"]["$gte"] = float(priceMin)
-                if priceMax:
-                    query["price"]["$lte"] = float(priceMax)
-            except ValueError:
-                raise HTTPException(status_code=400, detail="Invalid price format")
-        if bhk:
-            query["bhk"] = bhk
-        if propertyType:
-            query["propertyType"] = {"$regex": propertyType, "$options": "i"}
-        if availabilityStatus:
-            query["availabilityStatus"] = availabilityStatus
-        if propertyStatus:
-            query["propertyStatus"] = propertyStatus
-        if parking:
-            query["amenities.parking"] = parking
-        if lift:
-            query["amenities.lift"] = lift
-        if security:
-            query["amenities.security"] = security
-        if anyConstructionDone:
-            query["propertyFeatures.anyConstructionDone"] = anyConstructionDone
-        if plotFacing:
-            query["propertyFeatures.plotFacing"] = {"$in": [plotFacing, "N/A"]}
-        if transactionType:
-            query["propertyFeatures.transactionType"] = transactionType
-        if internet:
-            query["amenities.internet"] = internet
-        if publicTransport:
-            query["amenities.publicTransport"] = publicTransport
-        if search:
-            query["$or"] = [
-                {"title": {"$regex": search, "$options": "i"}},
-                {"location.city": {"$regex": search, "$options": "i"}}
-            ]
-
-        properties = []
-        residential_types = ["Flat", "Apartment", "Villa", "House", "Farm House"]
-        land_types = ["Residential Land", "Commercial Land", "Agriculture Land"]
-        for prop in property_collection.find(query):
-            prop["id"] = str(prop["_id"])
-            prop["createdAt"] = prop["createdAt"].isoformat()
-            if isinstance(prop.get("location"), str):
-                prop["location"] = {"city": prop["location"], "state": ""}
-            prop["description"] = prop.get("description", "")
-            prop["images"] = normalize_images_field(prop.get("images", []))
-            prop["negotiable"] = prop.get("negotiable", "No")
-            
-            if prop.get("propertyType") in residential_types:
-                prop["availabilityStatus"] = prop.get("availabilityStatus", "Ready to Move")
-                prop["propertyStatus"] = prop.get("propertyStatus", "New Project")
-                prop["bhk"] = prop.get("bhk", "N/A")
-                features = prop.get("propertyFeatures", {})
-                prop["amenities"] = {
-                    **{
-                        "parking": "No", "lift": "No", "security": "No", "powerBackup": "No",
-                        "waterSupply": "No", "boundaryWall": "No", "gatedCommunity": "No", "bathrooms": "1"
-                    },
-                    **prop.get("amenities", {}),
-                    **{
-                        "totalFloors": features.get("totalFloors", "N/A"),
-                        "floorNo": features.get("floorNo", "N/A"),
-                        "furnishing": features.get("furnishing", "N/A"),
-                        "builtupArea": features.get("builtupArea", "N/A"),
-                        "carpetArea": features.get("carpetArea", "N/A")
-                    }
-                }
-            elif prop.get("propertyType") in land_types:
-                prop["availabilityStatus"] = prop.get("availabilityStatus", "N/A")
-                prop["propertyStatus"] = prop.get("propertyStatus", "N/A")
-                prop["bhk"] = prop.get("bhk", "N/A")
-                features = prop.get("propertyFeatures", {})
-                prop["amenities"] = {
-                    **{
-                        "parking": "No", "security": "No", "powerBackup": "No",
-                        "waterSupply": "No", "boundaryWall": "No", "gatedCommunity": "No"
-                    },
-                    **prop.get("amenities", {}),
-                }
-                prop["propertyFeatures"] = {
-                    **{
-                        "areaUnit": "N/A",
-                        "areaValue": "N/A",
-                        "anyConstructionDone": "No",
-                        "plotFacing": "N/A",
-                        "transactionType": "N/A",
-                        "roadAccessType": "N/A"
-                    },
-                    **features
-                }
-            else:  # Office
-                prop["availabilityStatus"] = prop.get("availabilityStatus", "N/A")
-                prop["propertyStatus"] = prop.get("propertyStatus", "N/A")
-                prop["bhk"] = prop.get("bhk", "N/A")
-                features = prop.get("propertyFeatures", {})
-                prop["amenities"] = {
-                    **{
-                        "parking": "No", "security": "No", "powerBackup": "No",
-                        "waterSupply": "No", "boundaryWall": "No", "gatedCommunity": "No",
-                        "lift": "No", "internet": "No", "publicTransport": "No",
-                        "pantry": "Not Available", "washroom": "Not Available"
-                    },
-                    **prop.get("amenities", {}),
-                }
-                prop["propertyFeatures"] = {
-                    **{
-                        "carpetArea": "N/A", "floorNo": "N/A", "furnishing": "N/A",
-                        "cabins": "N/A", "workstations": "N/A", "roadAccessType": "N/A"
-                    },
-                    **features
-                }
-                
-            prop["listedBy"] = prop.get("listedBy", "Unknown")
-            properties.append(prop)
-        return properties
+        try:
+            query = build_filter_query(filters)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        def matching():
+            if query_terms(filters.search):
+                # Free-text searches come back ranked by relevance
+                pipeline = [{"$match": query}, *relevance_stages(filters.search, exclude=listing_projection())]
+                return property_collection.aggregate(pipeline, batchSize=STREAM_BATCH_SIZE)
+            return property_collection.find(query, listing_projection()).sort(KEYSET_SORT).batch_size(STREAM_BATCH_SIZE)
+
+        if stream:
+            # Unbounded result sets bypass the cache and never sit in memory
+            return streaming_listing(matching(), listing_item, stream)
+
+        async def load():
+            properties = await matching().to_list(length=None)
+            return serialize_listing(normalize_many(properties)), {}
+
+        key = listing_cache.key_for("filtered", **filters.as_dict())
+        return await cached_listing(key, load)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/properties/facets")
+async def get_property_facets(filters: PropertyFilters = Depends()):
+    try:
+        try:
+            pipeline = facet_pipeline(filters)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        async def load():
+            result = await property_collection.aggregate(pipeline).to_list(length=1)
+            return facet_counts(result[0] if result else {}), {}
+
+        return await cached_listing(listing_cache.key_for("facets", **filters.as_dict()), load)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def geo_page(query: dict, cursor: Optional[str], limit: int):
+    try:
+        query = apply_cursor(query, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # The limit lets the server keep only the top limit + 1 while sorting
+    results = property_collection.find(query, listing_projection()).sort(KEYSET_SORT).limit(limit + 1)
+    docs, next_token = split_page(await results.to_list(length=limit + 1), limit)
+    headers = {"X-Next-Cursor": next_token} if next_token else {}
+    return JSONResponse(content=serialize_listing(normalize_many(docs)), headers=headers)
+
+# Closest first; the cursor holds the last distance and _id, which breaks ties
+# between listings geocoded to the same point
+async def nearby_page(lng: float, lat: float, radius_km: float, cursor: Optional[str], limit: int):
+    pipeline = [near(lng, lat, radius_km)]
+    if cursor:
+        try:
+            distance, last_id = decode_cursor(cursor)
+            if not isinstance(distance, float):
+                raise ValueError(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        pipeline = [
+            near(lng, lat, radius_km, min_distance=distance),
+            {"$match": {"$or": [{"distance": {"$gt": distance}}, {"distance": distance, "_id": {"$gt": last_id}}]}},
+        ]
+    pipeline += [
+        {"$sort": {"distance": 1, "_id": 1}},
+        {"$limit": limit + 1},
+        {"$project": listing_projection()},
+    ]
+    docs = await property_collection.aggregate(pipeline).to_list(length=limit + 1)
+    next_token = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_token = encode_cursor(float(docs[-1]["distance"]), docs[-1]["_id"])
+    for prop in docs:
+        prop["distanceKm"] = round(prop.pop("distance") / 1000, 2)
+    headers = {"X-Next-Cursor": next_token} if next_token else {}
+    return JSONResponse(content=serialize_listing(normalize_many(docs)), headers=headers)
+
+# Map views: listings within radiusKm of a point, closest first, or inside the
+# visible viewport, newest first; both are keyset-paginated through
+# X-Next-Cursor. Radii are capped at MAX_RADIUS_KM and viewport sides at
+# MAX_BOX_DEGREES
+@router.get("/properties/nearby", response_model=List[PropertyResponse])
+async def get_nearby_properties(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radiusKm: float = Query(5, gt=0, le=MAX_RADIUS_KM),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    try:
+        return await nearby_page(lng, lat, radiusKm, cursor, limit)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/properties/within", response_model=List[PropertyResponse])
+async def get_properties_within(
+    south: float = Query(..., ge=-90, le=90),
+    west: float = Query(..., ge=-180, le=180),
+    north: float = Query(..., ge=-90, le=90),
+    east: float = Query(..., ge=-180, le=180),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    if south >= north or west >= east:
+        raise HTTPException(status_code=400, detail="Viewport must have south < north and west < east")
+    if north - south > MAX_BOX_DEGREES or east - west > MAX_BOX_DEGREES:
+        raise HTTPException(status_code=400, detail=f"Viewport sides must be at most {MAX_BOX_DEGREES:g} degrees")
+    try:
+        return await geo_page(within_box(south, west, north, east), cursor, limit)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/properties/offices", response_model=List[PropertyResponse])
 async def get_office_properties():
     try:
-        properties = []
-        residential_types = ["Flat", "Apartment", "Villa", "House", "Farm House"]
-        land_types = ["Residential Land", "Commercial Land", "Agriculture Land"]
-        for prop in property_collection.find({"propertyType": "Office"}).sort("createdAt", -1).limit(4):
-            prop["id"] = str(prop["_id"])
-            prop["createdAt"] = prop["createdAt"].isoformat()
-            if isinstance(prop.get("location"), str):
-                prop["location"] = {"city": prop["location"], "state": ""}
-            prop["description"] = prop.get("description", "")
-            prop["images"] = normalize_images_field(prop.get("images", []))
-            prop["negotiable"] = prop.get("negotiable", "No")
-            
-            if prop.get("propertyType") in residential_types:
-                prop["availabilityStatus"] = prop.get("availabilityStatus", "Ready to Move")
-                prop["propertyStatus"] = prop.get("propertyStatus", "New Project")
-                prop["bhk"] = prop.get("bhk", "N/A")
-                features = prop.get("propertyFeatures", {})
-                prop["amenities"] = {
-                    **{
-                        "parking": "No", "lift": "No", "security": "No", "powerBackup": "No",
-                        "waterSupply": "No", "boundaryWall": "No", "gatedCommunity": "No", "bathrooms": "1"
-                    },
-                    **prop.get("amenities", {}),
-                    **{
-                        "totalFloors": features.get("totalFloors", "N/A"),
-                        "floorNo": features.get("floorNo", "N/A"),
-                        "furnishing": features.get("furnishing", "N/A"),
-                        "builtupArea": features.get("builtupArea", "N/A"),
-                        "carpetArea": features.get("carpetArea", "N/A")
-                    }
-                }
-            elif prop.get("propertyType") in land_types:
-                prop["availabilityStatus"] = prop.get("availabilityStatus", "N/A")
-                prop["propertyStatus"] = prop.get("propertyStatus", "N/A")
-                prop["bhk"] = prop.get("bhk", "N/A")
-                features = prop.get("propertyFeatures", {})
-                prop["amenities"] = {
-                    **{
-                        "parking": "No", "security": "No", "powerBackup": "No",
-                        "waterSupply": "No", "boundaryWall": "No", "gatedCommunity": "No"
-                    },
-                    **prop.get("amenities", {}),
-                }
-                prop["propertyFeatures"] = {
-                    **{
-                        "areaUnit": "N/A",
-                        "areaValue": "N/A",
-                        "anyConstructionDone": "No",
-                        "plotFacing": "N/A",
-                        "transactionType": "N/A",
-                        "roadAccessType": "N/A"
-                    },
-                    **features
-                }
-            else:  # Office
-                prop["availabilityStatus"] = prop.get("availabilityStatus", "N/A")
-                prop["propertyStatus"] = prop.get("propertyStatus", "N/A")
-                prop["bhk"] = prop.get("bhk", "N/A")
-                features = prop.get("propertyFeatures", {})
-                prop["amenities"] = {
-                    **{
-                        "parking": "No", "security": "No", "powerBackup": "No",
-                        "waterSupply": "No", "boundaryWall": "No", "gatedCommunity": "No",
-                        "lift": "No", "internet": "No", "publicTransport": "No",
-                        "pantry": "Not Available", "washroom": "Not Available"
-                    },
-                    **prop.get("amenities", {}),
-                }
-                prop["propertyFeatures"] = {
-                    **{
-                        "carpetArea": "N/A", "floorNo": "N/A", "furnishing": "N/A",
-                        "cabins": "N/A", "workstations": "N/A", "roadAccessType": "N/A"
-                    },
-                    **features
-                }
-                
-            prop["listedBy"] = prop.get("listedBy", "Unknown")
-            properties.append(prop)
-        return properties
+        async def load():
+            cursor = property_collection.find({"propertyType": "Office"}, listing_projection()).sort("createdAt", -1).limit(4)
+            return serialize_listing(normalize_many(await cursor.to_list(length=4))), {}
+
+        return await cached_listing(listing_cache.key_for("offices"), load)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/properties/land", response_model=List[PropertyResponse])
 async def get_land_properties():
     try:
-        properties = []
-        residential_types = ["Flat", "Apartment", "Villa", "House", "Farm House"]
-        land_types = ["Residential Land", "Commercial Land", "Agriculture Land"]
-        for prop in property_collection.find({"propertyType": {"$in": land_types}}).sort("createdAt", -1).limit(4):
-            prop["id"] = str(prop["_id"])
-            prop["createdAt"] = prop["createdAt"].isoformat()
-            if isinstance(prop.get("location"), str):
-                prop["location"] = {"city": prop["location"], "state": ""}
-            prop["description"] = prop.get("description", "")
-            prop["images"] = normalize_images_field(prop.get("images", []))
-            prop["negotiable"] = prop.get("negotiable", "No")
-            
-            if prop.get("propertyType") in residential_types:
-                prop["availabilityStatus"] = prop.get("availabilityStatus", "Ready to Move")
-                prop["propertyStatus"] = prop.get("propertyStatus", "New Project")
-                prop["bhk"] = prop.get("bhk", "N/A")
-                features = prop.get("propertyFeatures", {})
-                prop["amenities"] = {
-                    **{
-                        "parking": "No", "lift": "No", "security": "No", "powerBackup": "No",
-                        "waterSupply": "No", "boundaryWall": "No", "gatedCommunity": "No", "bathrooms": "1"
-                    },
-                    **prop.get("amenities", {}),
-                    **{
-                        "totalFloors": features.get("totalFloors", "N/A"),
-                        "floorNo": features.get("floorNo", "N/A"),
-                        "furnishing": features.get("furnishing", "N/A"),
-                        "builtupArea": features.get("builtupArea", "N/A"),
-                        "carpetArea": features.get("carpetArea", "N/A")
-                    }
-                }
-            elif prop.get("propertyType") in land_types:
-                prop["availabilityStatus"] = prop.get("availabilityStatus", "N/A")
-                prop["propertyStatus"] = prop.get("propertyStatus", "N/A")
-                prop["bhk"] = prop.get("bhk", "N/A")
-                features = prop.get("propertyFeatures", {})
-                prop["amenities"] = {
-                    **{
-                        "parking": "No", "security": "No", "powerBackup": "No",
-                        "waterSupply": "No", "boundaryWall": "No", "gatedCommunity": "No"
-                    },
-                    **prop.get("amenities", {}),
-                }
-                prop["propertyFeatures"] = {
-                    **{
-                        "areaUnit": "N/A",
-                        "areaValue": "N/A",
-                        "anyConstructionDone": "No",
-                        "plotFacing": "N/A",
-                        "transactionType": "N/A",
-                        "roadAccessType": "N/A"
-                    },
-                    **features
-                }
-            else:  # Office
-                prop["availabilityStatus"] = prop.get("availabilityStatus", "N/A")
-                prop["propertyStatus"] = prop.get("propertyStatus", "N/A")
-                prop["bhk"] = prop.get("bhk", "N/A")
-                features = prop.get("propertyFeatures", {})
-                prop["amenities"] = {
-                    **{
-                        "parking": "No", "security": "No", "powerBackup": "No",
-                        "waterSupply": "No", "boundaryWall": "No", "gatedCommunity": "No",
-                        "lift": "No", "internet": "No", "publicTransport": "No",
-                        "pantry": "Not Available", "washroom": "Not Available"
-                    },
-                    **prop.get("amenities", {}),
-                }
-                prop["propertyFeatures"] = {
-                    **{
-                        "carpetArea": "N/A", "floorNo": "N/A", "furnishing": "N/A",
-                        "cabins": "N/A", "workstations": "N/A", "roadAccessType": "N/A"
-                    },
-                    **features
-                }
-                
-            prop["listedBy"] = prop.get("listedBy", "Unknown")
-            properties.append(prop)
-        return properties
+        async def load():
+            cursor = property_collection.find({"propertyType": {"$in": LAND_TYPES}}, listing_projection()).sort("createdAt", -1).limit(4)
+            return serialize_listing(normalize_many(await cursor.to_list(length=4))), {}
+
+        return await cached_listing(listing_cache.key_for("land"), load)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,20 @@
+import os
+import sys
+
+# The app reads its configuration at import time, so the test environment is
+# fixed before anything from the repo is imported: in-memory Mongo, and S3
+# calls answered by moto with a small multipart threshold
+os.environ["MONGODB_BACKEND"] = "memory"
+os.environ.pop("S3_ENDPOINT_URL", None)
+os.environ["AWS_ACCESS_KEY"] = "testing"
+os.environ["AWS_SECRET_KEY"] = "testing"
+os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+os.environ["S3_MULTIPART_THRESHOLD"] = str(5 * 1024 * 1024)
+os.environ["WRITE_BEHIND_ENABLED"] = "0"
+
+# moto hooks into botocore when imported, and only clients created after that
+# (such as utils.file_utils.s3_client) can be mocked
+import moto
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
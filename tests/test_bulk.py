@@ -0,0 +1,30 @@
+import asyncio
+import io
+import json
+import threading
+
+from database import owner_stats_collection, property_collection
+from utils.bulk import import_properties, parse_rows
+
+ROW = {"title": "Flat", "location": "Baner, Pune", "price": "45 Lakh", "propertyType": "Flat"}
+
+def test_rows_are_read_off_the_event_loop_in_batches():
+    lines = [json.dumps({**ROW, "title": f"Flat {i}"}) for i in range(5)] + ["{not json", json.dumps({"title": "x"})]
+    reader_threads = set()
+
+    def rows():
+        for row in parse_rows(io.StringIO("\n".join(lines) + "\n"), "ndjson"):
+            reader_threads.add(threading.current_thread())
+            yield row
+
+    async def run():
+        report = await import_properties(property_collection, rows(), "owner-1", batch_size=2)
+        stored = await property_collection.count_documents({"listedBy": "owner-1"})
+        await property_collection.delete_many({})
+        await owner_stats_collection.delete_many({})
+        return report, stored
+
+    report, stored = asyncio.run(run())
+    assert (report["inserted"], report["failed"], stored) == (5, 2, 5)
+    assert [error["row"] for error in report["errors"]] == [6, 7]
+    assert threading.main_thread() not in reader_threads
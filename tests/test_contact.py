@@ -0,0 +1,11 @@
+from fastapi import HTTPException
+import asyncio
+import pytest
+
+from routes.contact import ContactRequest, contact_owner
+
+def test_malformed_property_id_is_a_400():
+    request = ContactRequest(name="a", message="hi", property_id="bad")
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(contact_owner(request))
+    assert (raised.value.status_code, raised.value.detail) == (400, "Invalid property id")
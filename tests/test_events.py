@@ -0,0 +1,79 @@
+from bson import ObjectId
+from datetime import datetime
+import asyncio
+import pytest
+
+from database import owner_stats_collection, property_collection, user_query_collection
+from utils import events
+from utils.events import write_enquiries
+
+OWNER_ID = "owner-1"
+
+@pytest.fixture
+def listing():
+    property_id = ObjectId()
+    asyncio.run(property_collection.insert_one({"_id": property_id, "title": "Flat", "listedBy": OWNER_ID}))
+    yield property_id
+    async def cleanup():
+        await property_collection.delete_many({})
+        await user_query_collection.delete_many({})
+        await owner_stats_collection.delete_many({})
+    asyncio.run(cleanup())
+
+def enquiry(property_id: ObjectId, at: datetime) -> dict:
+    return {
+        "_id": ObjectId(), "name": "a", "message": "hi", "property_id": str(property_id),
+        "ownerId": OWNER_ID, "read": False, "createdAt": at,
+    }
+
+async def counters(property_id: ObjectId) -> tuple:
+    prop = await property_collection.find_one({"_id": property_id})
+    stats = await owner_stats_collection.find_one({"_id": OWNER_ID})
+    return prop.get("enquiryCount"), stats and stats["enquiries"], stats and stats["unread"]
+
+def test_enquiries_are_counted_once_and_flagged(listing):
+    docs = [enquiry(listing, datetime(2024, 1, 1)), enquiry(listing, datetime(2024, 1, 2))]
+
+    async def run():
+        await write_enquiries(docs)
+        # A replay of the same journal
+        await write_enquiries([dict(doc) for doc in docs])
+        return await counters(listing), await user_query_collection.count_documents({"counted": True})
+
+    assert asyncio.run(run()) == ((2, 2, 2), 2)
+
+def test_retry_after_a_failed_count_still_counts(listing, monkeypatch):
+    stored = enquiry(listing, datetime(2024, 1, 1))
+    docs = [stored, enquiry(listing, datetime(2024, 1, 2))]
+    original = events.record_enquiries
+
+    async def fail_after_storing(enquiries):
+        raise RuntimeError("owner_stats unreachable")
+
+    async def run():
+        monkeypatch.setattr(events, "record_enquiries", fail_after_storing)
+        with pytest.raises(RuntimeError):
+            await write_enquiries([stored])
+        monkeypatch.setattr(events, "record_enquiries", original)
+        # The write-behind queue retries the failed event with newer ones
+        await write_enquiries([dict(doc) for doc in docs])
+        return await counters(listing), await user_query_collection.count_documents({"counted": False})
+
+    assert asyncio.run(run()) == ((2, 2, 2), 0)
+
+def test_retry_after_a_failed_flag_update_does_not_count_twice(listing, monkeypatch):
+    docs = [enquiry(listing, datetime(2024, 1, 1))]
+    original = user_query_collection.update_many
+
+    async def fail(*args, **kwargs):
+        raise RuntimeError("connection reset")
+
+    async def run():
+        monkeypatch.setattr(user_query_collection, "update_many", fail)
+        with pytest.raises(RuntimeError):
+            await write_enquiries(docs)
+        monkeypatch.setattr(user_query_collection, "update_many", original)
+        await write_enquiries([dict(doc) for doc in docs])
+        return await counters(listing)
+
+    assert asyncio.run(run()) == (1, 1, 1)
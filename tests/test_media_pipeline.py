@@ -0,0 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+from bson import ObjectId
+import asyncio
+import pytest
+
+from database import property_collection
+from utils import media_pipeline
+from utils.media_pipeline import process_property_media
+
+@pytest.fixture
+def rendered(monkeypatch):
+    calls = []
+
+    def fake_render(bucket_name, file_path):
+        calls.append(file_path)
+        if file_path.endswith("broken.jpg"):
+            raise OSError("cannot identify image file")
+        return {"width": 800, "height": 600, "placeholder": "", "sources": {"jpg": {"320": f"{file_path}-320w.jpg"}}}
+
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(media_pipeline, "render_image", fake_render)
+    monkeypatch.setattr(media_pipeline, "get_process_pool", lambda: pool)
+    yield calls
+    pool.shutdown()
+    asyncio.run(property_collection.delete_many({}))
+
+def test_each_stored_key_is_rendered_once(rendered):
+    property_id = ObjectId()
+    image_paths = {
+        "exterior": ["media/a.jpg", "media/b.jpg", "media/a.jpg"],
+        "interior": ["media/b.jpg", "media/broken.jpg"],
+    }
+
+    async def run():
+        await property_collection.insert_one({"_id": property_id})
+        await process_property_media(property_collection, property_id, "bucket", image_paths)
+        return (await property_collection.find_one({"_id": property_id}))["imageVariants"]
+
+    variants = asyncio.run(run())
+    assert sorted(rendered) == ["media/a.jpg", "media/b.jpg", "media/broken.jpg"]
+    # One entry per image, in the order of images[category]
+    assert [v["original"].rsplit("/", 1)[-1] for v in variants["exterior"]] == ["a.jpg", "b.jpg", "a.jpg"]
+    assert variants["interior"][0]["original"].endswith("media/b.jpg")
+    assert variants["interior"][1] is None
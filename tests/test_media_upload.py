@@ -0,0 +1,124 @@
+from botocore.exceptions import ClientError
+from fastapi import UploadFile
+from moto import mock_aws
+import asyncio
+import io
+import threading
+import time
+import pytest
+
+from database import media_refs_collection
+from utils import file_utils
+from utils.file_utils import UploadError, s3_client
+from utils.media_store import acquire_media, commit_uploads, incoming_prefix, release_media, save_media
+
+BUCKET = "test-media"
+
+@pytest.fixture
+def bucket():
+    with mock_aws():
+        s3_client.create_bucket(Bucket=BUCKET)
+        yield BUCKET
+    asyncio.run(media_refs_collection.delete_many({}))
+
+def upload(data: bytes, filename: str) -> UploadFile:
+    return UploadFile(io.BytesIO(data), size=len(data), filename=filename)
+
+def stored_keys(bucket_name: str) -> set:
+    return {obj["Key"] for obj in s3_client.list_objects_v2(Bucket=bucket_name).get("Contents", [])}
+
+def test_uploads_run_concurrently(bucket, monkeypatch):
+    original = s3_client.upload_fileobj
+    lock = threading.Lock()
+    running = {"now": 0, "peak": 0}
+
+    def slow_upload(*args, **kwargs):
+        with lock:
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+        time.sleep(0.05)
+        try:
+            return original(*args, **kwargs)
+        finally:
+            with lock:
+                running["now"] -= 1
+
+    monkeypatch.setattr(s3_client, "upload_fileobj", slow_upload)
+    uploads = [(upload(f"image {i}".encode(), f"{i}.jpg"), "images") for i in range(6)]
+    keys = asyncio.run(save_media(uploads, bucket))
+
+    assert len(keys) == 6
+    assert all(key.startswith("images/") for key in keys)
+    assert stored_keys(bucket) == set(keys)
+    assert 1 < running["peak"] <= file_utils.S3_UPLOAD_CONCURRENCY
+
+def test_identical_files_are_stored_once(bucket):
+    uploads = [(upload(b"same bytes", "a.jpg"), "images"), (upload(b"same bytes", "b.jpg"), "images")]
+    keys = asyncio.run(save_media(uploads, bucket))
+
+    assert keys[0] == keys[1]
+    assert stored_keys(bucket) == {keys[0]}
+    assert asyncio.run(media_refs_collection.find_one({"_id": keys[0]}))["refs"] == 2
+
+def test_failed_upload_removes_the_others(bucket, monkeypatch):
+    original = s3_client.upload_fileobj
+
+    def failing_upload(fileobj, bucket_name, key, **kwargs):
+        if fileobj.read() == b"broken":
+            raise ClientError({"Error": {"Code": "500", "Message": "boom"}}, "PutObject")
+        fileobj.seek(0)
+        return original(fileobj, bucket_name, key, **kwargs)
+
+    monkeypatch.setattr(s3_client, "upload_fileobj", failing_upload)
+    uploads = [
+        (upload(b"first", "first.jpg"), "images"),
+        (upload(b"broken", "broken.jpg"), "images"),
+        (upload(b"video", "clip.mp4"), "videos"),
+    ]
+    with pytest.raises(UploadError) as error:
+        asyncio.run(save_media(uploads, bucket))
+
+    assert error.value.filenames == ["broken.jpg"]
+    assert stored_keys(bucket) == set()
+    assert asyncio.run(media_refs_collection.count_documents({})) == 0
+
+def test_large_files_use_multipart(bucket):
+    data = bytes(range(256)) * (11 * 1024 * 1024 // 256)
+    keys = asyncio.run(save_media([(upload(data, "tour.mp4"), "videos")], bucket))
+
+    stored = s3_client.get_object(Bucket=bucket, Key=keys[0])
+    assert stored["Body"].read() == data
+    # Multipart ETags end in -<number of parts>
+    assert stored["ETag"].strip('"').endswith("-3")
+
+def test_release_keeps_an_object_reacquired_meanwhile(bucket, monkeypatch):
+    keys = asyncio.run(save_media([(upload(b"shared", "a.jpg"), "images")], bucket))
+    original = media_refs_collection.find_one_and_update
+
+    async def reacquired_after_decrement(*args, **kwargs):
+        ref = await original(*args, **kwargs)
+        # Another listing takes the object between the decrement and the cleanup
+        await acquire_media(keys)
+        return ref
+
+    monkeypatch.setattr(media_refs_collection, "find_one_and_update", reacquired_after_decrement)
+    asyncio.run(release_media(bucket, keys))
+
+    assert stored_keys(bucket) == set(keys)
+    assert asyncio.run(media_refs_collection.find_one({"_id": keys[0]}))["refs"] == 1
+
+def test_direct_uploads_are_committed_under_their_content_hash(bucket):
+    stored = asyncio.run(save_media([(upload(b"same bytes", "a.jpg"), "images")], bucket))
+    incoming = [incoming_prefix("u1", "images") + name for name in ("x.jpg", "y.jpg")]
+    for key in incoming:
+        s3_client.put_object(Bucket=bucket, Key=key, Body=b"same bytes", ContentType="image/jpeg")
+
+    image_paths, video_paths = asyncio.run(
+        commit_uploads("u1", {"images": {"exterior_view": incoming}, "videos": []}, bucket)
+    )
+
+    assert image_paths == {"exterior_view": stored * 2}
+    assert video_paths == []
+    # Stored once, with the incoming copies removed
+    assert stored_keys(bucket) == set(stored)
+    assert asyncio.run(media_refs_collection.find_one({"_id": stored[0]}))["refs"] == 3
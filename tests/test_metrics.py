@@ -0,0 +1,38 @@
+from prometheus_client import REGISTRY
+import asyncio
+
+from utils.metrics import MetricsMiddleware
+
+LABELS = {"method": "GET", "route": "unmatched", "status": "200"}
+
+async def app_with_background_work(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"first", "more_body": True})
+    await asyncio.sleep(0.05)
+    await send({"type": "http.response.body", "body": b"last"})
+    # What a BackgroundTask does after the response is out
+    await asyncio.sleep(0.3)
+
+def observed() -> tuple:
+    return (
+        REGISTRY.get_sample_value("http_request_duration_seconds_count", LABELS) or 0,
+        REGISTRY.get_sample_value("http_request_duration_seconds_sum", LABELS) or 0,
+    )
+
+def test_latency_stops_at_the_last_body_chunk():
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    scope = {"type": "http", "method": "GET", "path": "/slow", "headers": []}
+    count, total = observed()
+    asyncio.run(MetricsMiddleware(app_with_background_work)(scope, receive, send))
+    new_count, new_total = observed()
+
+    assert len(sent) == 3
+    assert new_count == count + 1
+    assert 0.05 <= new_total - total < 0.3
@@ -0,0 +1,46 @@
+from bson import ObjectId
+from datetime import datetime
+import pytest
+
+from utils.pagination import apply_cursor, decode_cursor, encode_cursor, keyset_filter, split_page
+
+def test_cursor_round_trips_datetimes_and_strings():
+    object_id = ObjectId()
+    created_at = datetime(2024, 5, 17, 10, 30, 15, 123000)
+    assert decode_cursor(encode_cursor(created_at, object_id)) == (created_at, object_id)
+    # Legacy listings may store createdAt as a string
+    assert decode_cursor(encode_cursor("2024-05-17", object_id)) == ("2024-05-17", object_id)
+    # /properties/nearby pages by distance in meters
+    assert decode_cursor(encode_cursor(1234.5678901234567, object_id)) == (1234.5678901234567, object_id)
+
+def test_cursor_is_url_safe_without_padding():
+    token = encode_cursor(datetime(2024, 1, 1), ObjectId())
+    assert "=" not in token and "+" not in token and "/" not in token
+
+@pytest.mark.parametrize("token", ["", "not-a-cursor", "eyJjIjoxfQ", encode_cursor(datetime(2024, 1, 1), ObjectId())[:-4]])
+def test_bad_cursors_raise_value_error(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token)
+
+def test_keyset_filter_continues_after_the_cursor():
+    object_id = ObjectId()
+    created_at = datetime(2024, 1, 1)
+    assert keyset_filter(encode_cursor(created_at, object_id)) == {"$or": [
+        {"createdAt": {"$lt": created_at}},
+        {"createdAt": created_at, "_id": {"$lt": object_id}},
+    ]}
+
+def test_apply_cursor_keeps_the_query():
+    token = encode_cursor(datetime(2024, 1, 1), ObjectId())
+    assert apply_cursor({"listedBy": "x"}, None) == {"listedBy": "x"}
+    assert apply_cursor({}, token) == keyset_filter(token)
+    assert apply_cursor({"listedBy": "x"}, token) == {"$and": [{"listedBy": "x"}, keyset_filter(token)]}
+
+def test_split_page_returns_a_cursor_only_when_more_exist():
+    docs = [{"_id": ObjectId(), "createdAt": datetime(2024, 1, day)} for day in (5, 4, 3)]
+    page, token = split_page(docs, 3)
+    assert page == docs and token is None
+
+    page, token = split_page(docs, 2)
+    assert page == docs[:2]
+    assert decode_cursor(token) == (docs[1]["createdAt"], docs[1]["_id"])
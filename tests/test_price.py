@@ -0,0 +1,31 @@
+import pytest
+
+from utils.price import parse_price
+
+@pytest.mark.parametrize("value, expected", [
+    ("45,00,000", 4_500_000),
+    ("4,500,000", 4_500_000),
+    ("1.2 Cr", 12_000_000),
+    ("₹ 85 Lakh", 8_500_000),
+    ("85L", 8_500_000),
+    ("2.5 Mn", 2_500_000),
+    (7500000, 7_500_000),
+    (1.5, 1.5),
+])
+def test_single_prices(value, expected):
+    assert parse_price(value) == pytest.approx(expected)
+
+@pytest.mark.parametrize("value, expected", [
+    ("45-50 Lakh", 4_500_000),
+    ("1.5-2 Cr", 15_000_000),
+    ("45 to 50 lakh", 4_500_000),
+    ("45 lakh - 50 lakh", 4_500_000),
+    ("90 Lakh – 1.2 Cr", 9_000_000),
+    ("45,00,000 - 50,00,000", 4_500_000),
+])
+def test_ranges_store_the_lower_bound_with_the_trailing_unit(value, expected):
+    assert parse_price(value) == pytest.approx(expected)
+
+@pytest.mark.parametrize("value", [None, True, "", "Price on request"])
+def test_values_without_a_price(value):
+    assert parse_price(value) is None
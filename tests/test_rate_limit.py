@@ -0,0 +1,127 @@
+import asyncio
+import pytest
+
+from utils import rate_limit
+from utils.rate_limit import DEFAULT_BUDGET, ConcurrencyLimiter, MemoryRateLimitStore, Overloaded, budget_for
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    return clock
+
+def test_bucket_allows_a_burst_then_reports_the_wait(clock):
+    store = MemoryRateLimitStore()
+
+    async def run():
+        waits = [await store.take("k", rate=0.5, capacity=3) for _ in range(4)]
+        clock.now += 1
+        waits.append(await store.take("k", rate=0.5, capacity=3))
+        clock.now += 1
+        waits.append(await store.take("k", rate=0.5, capacity=3))
+        return waits
+
+    # One token every 2 seconds: the 4th request waits 2s, and after 1s it has half a token
+    assert asyncio.run(run()) == [0, 0, 0, 2.0, 1.0, 0]
+
+def test_bucket_refills_up_to_its_capacity(clock):
+    store = MemoryRateLimitStore()
+
+    async def run():
+        for _ in range(2):
+            await store.take("k", rate=1, capacity=2)
+        clock.now += 60
+        return [await store.take("k", rate=1, capacity=2) for _ in range(3)]
+
+    assert asyncio.run(run()) == [0, 0, 1.0]
+
+def test_buckets_are_per_key_and_evict_the_least_recent(clock):
+    store = MemoryRateLimitStore(max_keys=2)
+
+    async def run():
+        await store.take("a", rate=1, capacity=1)
+        other = await store.take("b", rate=1, capacity=1)
+        await store.take("c", rate=1, capacity=1)
+        # "a" was dropped, so it starts from a full bucket again
+        return other, await store.take("a", rate=1, capacity=1), await store.size()
+
+    assert asyncio.run(run()) == (0, 0, 2)
+
+@pytest.mark.parametrize("method, path, name", [
+    ("POST", "/api/login", "login"),
+    ("GET", "/api/properties", "listing"),
+    ("GET", "/api/properties/nearby", "listing"),
+    ("POST", "/api/properties/uploads", "create"),
+    ("GET", "/api/propertiesx", "default"),
+    ("DELETE", "/api/login", "default"),
+])
+def test_budget_for_matches_method_and_path_prefix(method, path, name):
+    assert budget_for(method, path).name == name
+
+def test_default_budget_is_the_fallback():
+    assert budget_for("GET", "/api/unknown") is DEFAULT_BUDGET
+
+def test_concurrency_limiter_sheds_past_the_queue():
+    limiter = ConcurrencyLimiter(limit=1, max_queue=1, max_wait=1)
+
+    async def run():
+        await limiter.acquire()
+        waiter = asyncio.get_running_loop().create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await limiter.acquire()
+        limiter.release()
+        await waiter
+        limiter.release()
+        return limiter.stats()
+
+    stats = asyncio.run(run())
+    assert (stats["admitted"], stats["rejected"], stats["active"], stats["waiting"]) == (2, 1, 0, 0)
+
+def test_concurrency_limiter_times_out_waiters():
+    limiter = ConcurrencyLimiter(limit=1, max_queue=5, max_wait=0.01)
+
+    async def run():
+        await limiter.acquire()
+        with pytest.raises(Overloaded):
+            await limiter.acquire()
+        limiter.release()
+        return limiter.stats()
+
+    assert asyncio.run(run())["timedOut"] == 1
+
+def test_middleware_frees_the_slot_before_background_work(monkeypatch):
+    limiter = ConcurrencyLimiter(limit=1, max_queue=0, max_wait=1)
+    monkeypatch.setattr(rate_limit, "admission", limiter)
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_ENABLED", True)
+    active = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+        # What a BackgroundTask does after the response is out
+        active.append(limiter.active)
+
+    async def send(message):
+        pass
+
+    async def run():
+        scope = {"type": "http", "method": "GET", "path": "/api/unknown", "headers": [], "client": ("1.2.3.4", 1)}
+        await rate_limit.RateLimitMiddleware(app)(scope, None, send)
+        return limiter.stats()
+
+    stats = asyncio.run(run())
+    assert active == [0]
+    assert (stats["active"], stats["admitted"]) == (0, 1)
+
+def test_fakeredis_url_uses_the_memory_store(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_BACKEND", "redis")
+    monkeypatch.setenv("REDIS_URL", "fakeredis://")
+    assert isinstance(rate_limit.create_rate_limit_store(), MemoryRateLimitStore)
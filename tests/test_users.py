@@ -0,0 +1,46 @@
+from fastapi import HTTPException
+import asyncio
+import pytest
+
+from database import ensure_indexes, user_collection
+from routes import auth as auth_routes
+from routes.auth import UserRegister, register
+from routes.user import UpdateUserRequest, update_user
+
+async def no_user(*args, **kwargs):
+    # Stands in for the check losing a race with a concurrent request
+    return None
+
+async def fast_hash(password):
+    return f"hashed:{password}"
+
+@pytest.fixture(autouse=True)
+def users(monkeypatch):
+    monkeypatch.setattr(auth_routes, "hash_password", fast_hash)
+    asyncio.run(ensure_indexes())
+    yield
+    asyncio.run(user_collection.delete_many({}))
+
+def test_register_race_answers_already_exists(monkeypatch):
+    async def run():
+        await register(UserRegister(name="a", email="a@x.com", password="pw"))
+        monkeypatch.setattr(user_collection, "find_one", no_user)
+        with pytest.raises(HTTPException) as raised:
+            await register(UserRegister(name="b", email="a@x.com", password="pw"))
+        return raised.value
+
+    error = asyncio.run(run())
+    assert (error.status_code, error.detail) == (400, "User already exists")
+
+def test_update_race_answers_email_in_use(monkeypatch):
+    async def run():
+        await user_collection.insert_one({"name": "a", "email": "a@x.com"})
+        result = await user_collection.insert_one({"name": "b", "email": "b@x.com"})
+        monkeypatch.setattr(user_collection, "find_one", no_user)
+        user = {"_id": str(result.inserted_id), "email": "b@x.com"}
+        with pytest.raises(HTTPException) as raised:
+            await update_user(UpdateUserRequest(name="b", email="a@x.com"), user)
+        return raised.value, await user_collection.count_documents({"email": "a@x.com"})
+
+    error, holders = asyncio.run(run())
+    assert (error.status_code, error.detail, holders) == (400, "Email already in use", 1)
@@ -0,0 +1,174 @@
+import asyncio
+import glob
+import os
+import pytest
+
+from utils import write_behind as write_behind_module
+from utils.write_behind import WriteBehindQueue
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setattr(write_behind_module, "WRITE_BEHIND_ENABLED", True)
+
+def make_queue(spill_dir, handler, batch_size: int = 100) -> WriteBehindQueue:
+    # A long interval so only explicit flushes write
+    queue = WriteBehindQueue("test", str(spill_dir), batch_size, 3600, 1000)
+    queue.register("event", handler)
+    return queue
+
+def segments(spill_dir) -> list:
+    return sorted(glob.glob(os.path.join(str(spill_dir), "test-*.jsonl")))
+
+def test_events_are_journaled_until_flushed(tmp_path):
+    written = []
+
+    async def handler(docs):
+        written.extend(docs)
+
+    async def run():
+        queue = make_queue(tmp_path, handler)
+        await queue.start()
+        assert queue.enqueue("event", {"_id": 1}) and queue.enqueue("event", {"_id": 2})
+        with open(segments(tmp_path)[0], encoding="utf-8") as f:
+            journaled = len(f.readlines())
+        await queue.flush()
+        remaining = segments(tmp_path)
+        await queue.stop()
+        return journaled, remaining, queue
+
+    journaled, remaining, queue = asyncio.run(run())
+    assert journaled == 2
+    assert written == [{"_id": 1}, {"_id": 2}]
+    # Only the fresh, empty segment is left, and stop removes it
+    assert len(remaining) == 1 and segments(tmp_path) == []
+    assert queue.stats()["written"] == 2
+
+def test_failed_flush_keeps_events_and_segments(tmp_path):
+    attempts = []
+
+    async def handler(docs):
+        attempts.append(list(docs))
+        if len(attempts) == 1:
+            raise RuntimeError("mongo down")
+
+    async def run():
+        queue = make_queue(tmp_path, handler)
+        await queue.start()
+        queue.enqueue("event", {"_id": 1})
+        await queue.flush()
+        after_failure = (queue.stats()["pending"], queue.stats()["failedFlushes"], len(segments(tmp_path)))
+        queue.enqueue("event", {"_id": 2})
+        await queue.flush()
+        after_retry = (queue.stats()["pending"], len(segments(tmp_path)))
+        await queue.stop()
+        return after_failure, after_retry
+
+    after_failure, after_retry = asyncio.run(run())
+    # The sealed segment holding the event is kept next to the new open one
+    assert after_failure == (1, 1, 2)
+    assert attempts[1] == [{"_id": 1}, {"_id": 2}]
+    assert after_retry == (0, 1)
+
+def test_unwritten_events_are_replayed_on_the_next_start(tmp_path):
+    written = []
+
+    async def failing(docs):
+        raise RuntimeError("mongo down")
+
+    async def handler(docs):
+        written.extend(docs)
+
+    async def run():
+        queue = make_queue(tmp_path, failing)
+        await queue.start()
+        queue.enqueue("event", {"_id": 1})
+        queue.enqueue("event", {"_id": 2})
+        await queue.stop()
+        spilled = segments(tmp_path)
+        # A crash mid-write leaves a torn last line behind
+        with open(spilled[-1], "a", encoding="utf-8") as f:
+            f.write('{"k": "event", "d": {"_id": 3')
+
+        restarted = make_queue(tmp_path, handler)
+        await restarted.start()
+        await restarted.stop()
+        return spilled, restarted
+
+    spilled, restarted = asyncio.run(run())
+    assert spilled
+    assert written == [{"_id": 1}, {"_id": 2}]
+    assert restarted.stats()["replayed"] == 2
+    assert segments(tmp_path) == []
+
+def test_replay_keeps_a_segment_it_could_not_write(tmp_path):
+    async def failing(docs):
+        raise RuntimeError("mongo down")
+
+    async def run():
+        queue = make_queue(tmp_path, failing)
+        await queue.start()
+        queue.enqueue("event", {"_id": 1})
+        await queue.stop()
+        restarted = make_queue(tmp_path, failing)
+        await restarted.start()
+        await restarted.stop()
+        return restarted
+
+    restarted = asyncio.run(run())
+    assert restarted.stats()["replayed"] == 0
+    assert len(segments(tmp_path)) == 1
+
+def test_enqueue_refuses_when_full_or_stopped(tmp_path):
+    async def handler(docs):
+        pass
+
+    async def run():
+        queue = WriteBehindQueue("test", str(tmp_path), 100, 3600, 1)
+        queue.register("event", handler)
+        refused_stopped = not queue.enqueue("event", {"_id": 0})
+        await queue.start()
+        accepted = queue.enqueue("event", {"_id": 1})
+        refused_full = not queue.enqueue("event", {"_id": 2})
+        await queue.stop()
+        return refused_stopped, accepted, refused_full, queue.stats()["refused"]
+
+    assert asyncio.run(run()) == (True, True, True, 2)
+
+def test_stop_during_a_slow_flush_keeps_the_batch(tmp_path):
+    started = None
+    calls = []
+    written = []
+
+    async def stuck_then_down(docs):
+        calls.append(list(docs))
+        if len(calls) == 1:
+            started.set()
+            await asyncio.sleep(3600)
+        raise RuntimeError("mongo down")
+
+    async def handler(docs):
+        written.extend(docs)
+
+    async def run():
+        nonlocal started
+        started = asyncio.Event()
+        queue = WriteBehindQueue("test", str(tmp_path), 100, 0.01, 1000)
+        queue.register("event", stuck_then_down)
+        await queue.start()
+        queue.enqueue("event", {"_id": 1})
+        # The background loop is now inside the handler with the batch
+        await started.wait()
+        await queue.stop()
+        spilled = segments(tmp_path)
+
+        restarted = make_queue(tmp_path, handler)
+        await restarted.start()
+        await restarted.stop()
+        return spilled
+
+    spilled = asyncio.run(run())
+    # stop() retried the cancelled batch, and kept its segment when that failed
+    assert calls == [[{"_id": 1}], [{"_id": 1}]]
+    assert len(spilled) == 1
+    assert written == [{"_id": 1}]
+    assert segments(tmp_path) == []
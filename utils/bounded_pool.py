@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
+import time
+
+class PoolSaturated(Exception):
+    pass
+
+# Runs blocking calls on a dedicated thread pool. At most `workers` calls run at
+# once; up to max_queue more wait their turn and anything beyond that is
+# refused with PoolSaturated instead of piling up behind the pool
+class BoundedPool:
+    def __init__(self, name: str, workers: int, max_queue: int):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._slots = None
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    async def run(self, fn, *args, **kwargs):
+        if self._slots is None:
+            # Created lazily so it binds to the running event loop
+            self._slots = asyncio.Semaphore(self.workers)
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise PoolSaturated(f"{self.name} pool has {self.waiting} calls queued")
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        started_at = time.perf_counter()
+        waited = started_at - queued_at
+        self.wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        self.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, partial(fn, *args, **kwargs))
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self.run_seconds += time.perf_counter() - started_at
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "waiting": self.waiting,
+            "maxQueue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avgWaitMs": round(self.wait_seconds / self.completed * 1000, 2) if self.completed else 0.0,
+            "maxWaitMs": round(self.max_wait_seconds * 1000, 2),
+            "avgRunMs": round(self.run_seconds / self.completed * 1000, 2) if self.completed else 0.0,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,205 @@
+from datetime import datetime
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+from models import Property
+from utils.media_dedupe import media_key
+from utils.media_store import acquire_media
+from utils.normalize import LISTING_EXCLUDED_FIELDS, prepare_for_storage
+from utils.owner_stats import record_listings
+import asyncio
+import csv
+import io
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = 500
+# Row errors beyond this are only counted, so a bad file can't blow up the report
+MAX_REPORTED_ERRORS = 1000
+
+# Flat Property fields and where they live on a stored listing
+FLAT_FEATURE_FIELDS = ("transactionType", "anyConstructionDone", "plotFacing", "cabins", "workstations")
+FLAT_AMENITY_FIELDS = {
+    "pantry": "pantry", "washroom": "washroom",
+    "highSpeedInternet": "internet", "publicTransport": "publicTransport",
+}
+# Separates list entries inside one CSV cell
+CSV_LIST_SEPARATOR = "|"
+
+def _is_url(value: str) -> bool:
+    return value.startswith(("http://", "https://", "/"))
+
+def load_manifest(text: str) -> dict:
+    # Media reference -> URL, as a JSON object or a two-column name,url CSV
+    text = text.strip()
+    if not text:
+        return {}
+    if text.startswith("{"):
+        return json.loads(text)
+    return {row[0].strip(): row[1].strip() for row in csv.reader(io.StringIO(text)) if len(row) >= 2 and row[0] != "name"}
+
+def _csv_row(row: dict) -> dict:
+    # Dotted headers nest ("amenities.parking"); media cells hold lists
+    data = {}
+    for column, value in row.items():
+        if column is None or value is None or value.strip() == "":
+            continue
+        value = value.strip()
+        if column == "videos" or column.startswith("images."):
+            value = [item.strip() for item in value.split(CSV_LIST_SEPARATOR) if item.strip()]
+        target = data
+        *parents, leaf = column.split(".")
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[leaf] = value
+    return data
+
+def parse_rows(lines, fmt: str):
+    # Yields (row number, dict or error message) without reading ahead
+    if fmt == "csv":
+        for number, row in enumerate(csv.DictReader(lines), start=1):
+            yield number, _csv_row(row)
+        return
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield number, f"Invalid JSON: {e.msg}"
+            continue
+        yield number, row if isinstance(row, dict) else "Each line must be a JSON object"
+
+def _resolve_media(urls, manifest: dict) -> list:
+    resolved = []
+    for name in urls:
+        url = manifest.get(name, name)
+        if not _is_url(url):
+            raise ValueError(f"Unknown media reference {name}")
+        resolved.append(url)
+    return resolved
+
+def property_document(prop: Property, listed_by: str, manifest: dict) -> dict:
+    data = prop.dict(exclude_none=True)
+    amenities = dict(data.pop("amenities", {}))
+    features = dict(data.pop("propertyFeatures", {}))
+    for field in FLAT_FEATURE_FIELDS:
+        if field in data:
+            features.setdefault(field, data.pop(field))
+    for field, key in FLAT_AMENITY_FIELDS.items():
+        if field in data:
+            amenities.setdefault(key, data.pop(field))
+
+    doc = {
+        "title": data["title"],
+        "propertyType": data["property_type"],
+        "price": data["price"],
+        "location": data["location"],
+        "images": {
+            category: _resolve_media(urls, manifest) for category, urls in data.get("images", {}).items()
+        },
+        "videos": _resolve_media(data.get("videos", []), manifest),
+        "createdAt": data.get("createdAt") or datetime.utcnow(),
+        "amenities": amenities,
+        "listedBy": listed_by,
+        "propertyFeatures": features,
+    }
+    for field in ("bhk", "description", "negotiable", "availabilityStatus", "propertyStatus"):
+        if field in data:
+            doc[field] = data[field]
+    return prepare_for_storage(doc)
+
+def _media_keys(doc: dict, bucket_url: str) -> list:
+    urls = [url for urls in doc["images"].values() for url in urls] + doc["videos"]
+    return [media_key(url) for url in urls if bucket_url and url.startswith(bucket_url) and media_key(url)]
+
+class ImportReport:
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, row: int, error):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": error})
+
+    def as_dict(self) -> dict:
+        return {"inserted": self.inserted, "failed": self.failed, "errors": self.errors}
+
+async def _flush(collection, batch: list, report: ImportReport, bucket_url: str, dry_run: bool):
+    if dry_run:
+        report.inserted += len(batch)
+        return
+    failed = {}
+    try:
+        await collection.insert_many([doc for _, doc in batch], ordered=False)
+    except BulkWriteError as e:
+        for error in e.details.get("writeErrors", []):
+            failed[error["index"]] = error.get("errmsg", "Write failed")
+    for index, (row, doc) in enumerate(batch):
+        if index in failed:
+            report.add_error(row, failed[index])
+    inserted = [doc for index, (_, doc) in enumerate(batch) if index not in failed]
+    report.inserted += len(inserted)
+    # Imported listings pointing into the media bucket hold references like uploads do
+    await acquire_media([key for doc in inserted for key in _media_keys(doc, bucket_url)])
+
+# Reads and validates rows until a batch is full or the rows run out; returns
+# (batch, whether the rows ran out). Reading the upload and validating both
+# block, so this runs in a worker thread
+def _next_batch(rows, listed_by: str, manifest: dict, report: ImportReport, batch_size: int) -> tuple:
+    batch = []
+    for number, row in rows:
+        if isinstance(row, str):
+            report.add_error(number, row)
+            continue
+        try:
+            doc = property_document(Property(**row), listed_by, manifest)
+        except ValidationError as e:
+            report.add_error(number, [
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+            ])
+            continue
+        except ValueError as e:
+            report.add_error(number, str(e))
+            continue
+        batch.append((number, doc))
+        if len(batch) >= batch_size:
+            return batch, False
+    return batch, True
+
+# Validates, normalizes and inserts rows from parse_rows in batches; only one
+# batch is held at a time. Bad rows are reported by row number and skipped.
+async def import_properties(
+    collection, rows, listed_by: str, manifest: dict = None, bucket_url: str = "",
+    batch_size: int = IMPORT_BATCH_SIZE, dry_run: bool = False
+) -> dict:
+    loop = asyncio.get_running_loop()
+    report = ImportReport()
+    rows = iter(rows)
+    done = False
+    while not done:
+        batch, done = await loop.run_in_executor(None, _next_batch, rows, listed_by, manifest or {}, report, batch_size)
+        if batch:
+            await _flush(collection, batch, report, bucket_url, dry_run)
+    if not dry_run:
+        await record_listings(listed_by, report.inserted)
+    logger.info(f"Imported {report.inserted} properties, {report.failed} rows rejected")
+    return report.as_dict()
+
+def _json_default(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+def export_line(prop: dict) -> str:
+    prop["id"] = str(prop.pop("_id"))
+    for field in LISTING_EXCLUDED_FIELDS:
+        prop.pop(field, None)
+    return json.dumps(prop, default=_json_default) + "\n"
+
+# One NDJSON line per stored listing, read in cursor batches so memory stays
+# flat however many listings match
+async def export_properties(collection, query: dict, batch_size: int = IMPORT_BATCH_SIZE):
+    async for prop in collection.find(query).sort("createdAt", -1).batch_size(batch_size):
+        yield export_line(prop)
@@ -0,0 +1,125 @@
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+class MemoryCacheBackend:
+    # In-process LRU with per-entry expiry; entries are evicted oldest-used first
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    async def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: int):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def clear(self, prefix: str):
+        for key in [k for k in self._entries if k.startswith(prefix)]:
+            del self._entries[key]
+
+    async def size(self, prefix: str) -> int:
+        return sum(1 for k in self._entries if k.startswith(prefix))
+
+class RedisCacheBackend:
+    # Eviction is left to the server: run Redis with maxmemory-policy allkeys-lru
+    def __init__(self, client):
+        self.client = client
+
+    async def get(self, key: str):
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: str, ttl: int):
+        await self.client.set(key, value, ex=ttl)
+
+    async def clear(self, prefix: str):
+        keys = [key async for key in self.client.scan_iter(match=f"{prefix}*")]
+        if keys:
+            await self.client.unlink(*keys)
+
+    async def size(self, prefix: str) -> int:
+        return len([key async for key in self.client.scan_iter(match=f"{prefix}*")])
+
+def create_cache_backend():
+    backend = os.getenv("CACHE_BACKEND", "memory")
+    if backend == "redis":
+        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        if redis_url.startswith("fakeredis://"):
+            # Local stand-in with the same client API, for development and load tests
+            from fakeredis import aioredis as fake_aioredis
+            return RedisCacheBackend(fake_aioredis.FakeRedis(decode_responses=True))
+        from redis import asyncio as aioredis
+        return RedisCacheBackend(aioredis.from_url(redis_url, decode_responses=True))
+    return MemoryCacheBackend(max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "1024")))
+
+class ResponseCache:
+    def __init__(self, namespace: str, backend, ttl: int):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def key_for(self, route: str, **params) -> str:
+        # Unset and blank parameters don't change the result, so they don't change the key
+        normalized = {k: str(v).strip() for k, v in params.items() if v is not None and str(v).strip() != ""}
+        digest = hashlib.sha1(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+        return f"{self.namespace}:{route}:{digest}"
+
+    async def get(self, key: str):
+        try:
+            raw = await self.backend.get(key)
+        except Exception as e:
+            # A broken cache must never take the endpoint down with it
+            self.errors += 1
+            logger.warning(f"Cache read failed for {key}: {str(e)}")
+            raw = None
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    async def set(self, key: str, value, ttl: int = None):
+        try:
+            await self.backend.set(key, json.dumps(value), ttl or self.ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache write failed for {key}: {str(e)}")
+
+    async def invalidate(self, prefix: str = ""):
+        try:
+            await self.backend.clear(f"{self.namespace}:{prefix}")
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache invalidation failed for {self.namespace}: {str(e)}")
+
+    async def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hitRatio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": await self.backend.size(f"{self.namespace}:"),
+            "ttl": self.ttl,
+        }
+
+listing_cache = ResponseCache("listings", create_cache_backend(), ttl=int(os.getenv("LISTING_CACHE_TTL", "60")))
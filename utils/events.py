@@ -0,0 +1,63 @@
+from pymongo.errors import BulkWriteError
+from database import user_activities_collection, user_query_collection
+from utils.owner_stats import recount_enquiries, record_enquiries
+from utils.write_behind import write_behind
+from bson import ObjectId
+
+DUPLICATE_KEY = 11000
+
+# insert_many that treats already-stored _ids as done, so replaying a
+# journal after a crash never double-writes; returns the newly stored docs
+async def insert_new(collection, docs: list) -> list:
+    try:
+        await collection.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(error.get("code") != DUPLICATE_KEY for error in errors):
+            raise
+        duplicates = {error["index"] for error in errors}
+        return [doc for index, doc in enumerate(docs) if index not in duplicates]
+    return docs
+
+# Enquiries are stored with counted False and flipped once their counters are
+# bumped. An enquiry a retried batch finds stored but not counted may have
+# been half counted, so its listing and owner are recounted instead.
+async def write_enquiries(docs: list):
+    for doc in docs:
+        doc.setdefault("counted", False)
+    inserted = await insert_new(user_query_collection, docs)
+    retried = []
+    if len(inserted) < len(docs):
+        new_ids = {doc["_id"] for doc in inserted}
+        retried = await user_query_collection.find(
+            {"_id": {"$in": [doc["_id"] for doc in docs if doc["_id"] not in new_ids]}, "counted": False},
+            {"property_id": 1, "ownerId": 1}
+        ).to_list(length=None)
+    await record_enquiries(inserted)
+    if retried:
+        await recount_enquiries(retried)
+    counted = [doc["_id"] for doc in inserted + retried]
+    if counted:
+        await user_query_collection.update_many({"_id": {"$in": counted}}, {"$set": {"counted": True}})
+
+async def write_activities(docs: list):
+    await insert_new(user_activities_collection, docs)
+
+write_behind.register("enquiry", write_enquiries)
+write_behind.register("activity", write_activities)
+
+# Both return the event id right away; the write happens with the next batch.
+# When the queue isn't running (scripts, WRITE_BEHIND_ENABLED=0) enquiries are
+# written inline.
+async def submit_enquiry(doc: dict) -> ObjectId:
+    doc["_id"] = ObjectId()
+    if not write_behind.enqueue("enquiry", doc):
+        await write_enquiries([doc])
+    return doc["_id"]
+
+async def track_activity(doc: dict) -> ObjectId:
+    doc["_id"] = ObjectId()
+    if not write_behind.enqueue("activity", doc) and not write_behind.running:
+        await write_activities([doc])
+    # A full queue drops tracking events rather than slowing requests down
+    return doc["_id"]
@@ -1,36 +1,194 @@
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import UploadFile
+from functools import partial
+from utils.metrics import record_s3_upload
+import asyncio
+import hashlib
 import logging
 import os
+import time
 import uuid
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Uploads running at once across all requests
+S3_UPLOAD_CONCURRENCY = int(os.getenv("S3_UPLOAD_CONCURRENCY", "8"))
+# Files above this size go up as parallel multipart uploads
+S3_MULTIPART_THRESHOLD = int(os.getenv("S3_MULTIPART_THRESHOLD", str(8 * 1024 * 1024)))
+S3_MULTIPART_CONCURRENCY = 4
+# Point at a moto server or MinIO to run against a local S3 stand-in
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+# Lifetime of presigned upload URLs, in seconds
+S3_PRESIGN_EXPIRES = int(os.getenv("S3_PRESIGN_EXPIRES", "900"))
+
+MAX_IMAGE_SIZE = 10 * 1024 * 1024
+MAX_VIDEO_SIZE = 50 * 1024 * 1024
+IMAGE_CATEGORIES = (
+    "exterior_view", "living_room", "bedrooms", "bathrooms", "kitchen",
+    "floor_plan", "master_plan", "location_map", "others",
+)
+
 # AWS S3 client
 s3_client = boto3.client(
     's3',
     aws_access_key_id=os.getenv('AWS_ACCESS_KEY'),
     aws_secret_access_key=os.getenv('AWS_SECRET_KEY'),
-    region_name='us-east-1'  # Ensure correct region
+    region_name='us-east-1',  # Ensure correct region
+    endpoint_url=S3_ENDPOINT_URL,
+    # Every upload worker may run a full multipart transfer
+    config=Config(max_pool_connections=S3_UPLOAD_CONCURRENCY * S3_MULTIPART_CONCURRENCY),
 )
 
+upload_executor = ThreadPoolExecutor(max_workers=S3_UPLOAD_CONCURRENCY, thread_name_prefix="s3-upload")
+
+transfer_config = TransferConfig(
+    multipart_threshold=S3_MULTIPART_THRESHOLD,
+    multipart_chunksize=S3_MULTIPART_THRESHOLD,
+    max_concurrency=S3_MULTIPART_CONCURRENCY,
+)
+
+class UploadError(Exception):
+    def __init__(self, filenames):
+        self.filenames = filenames
+        super().__init__(f"Failed to upload {', '.join(filenames)} to S3")
+
+def object_url(bucket_name: str, file_path: str) -> str:
+    if S3_ENDPOINT_URL:
+        return f"{S3_ENDPOINT_URL.rstrip('/')}/{bucket_name}/{file_path}"
+    return f"https://{bucket_name}.s3.amazonaws.com/{file_path}"
+
 def secure_filename(filename: str):
     ext = filename.rsplit('.', 1)[-1] if '.' in filename else ''
     return f"{uuid.uuid4()}.{ext}" if ext else f"{uuid.uuid4()}"
 
 async def save_file_to_s3(file: UploadFile, bucket_name: str, file_path: str):
     try:
-        s3_client.upload_fileobj(file.file, bucket_name, file_path)
-        url = f"https://{bucket_name}.s3.amazonaws.com/{file_path}"
+        # upload_fileobj blocks, so it runs on the bounded upload pool
+        upload = partial(s3_client.upload_fileobj, file.file, bucket_name, file_path, Config=transfer_config)
+        started = time.perf_counter()
+        await asyncio.get_running_loop().run_in_executor(upload_executor, upload)
+        record_s3_upload(file.size if file.size is not None else file.file.tell(), time.perf_counter() - started)
+        url = object_url(bucket_name, file_path)
         logger.info(f"Successfully uploaded file to S3: {url}")
         return url
     except ClientError as e:
         logger.error(f"Failed to upload file to S3: {str(e)}")
         return None
 
+async def delete_files_from_s3(bucket_name: str, file_paths: list):
+    if not file_paths:
+        return
+    try:
+        # delete_objects takes at most 1000 keys per call
+        for start in range(0, len(file_paths), 1000):
+            objects = [{"Key": path} for path in file_paths[start:start + 1000]]
+            delete = partial(s3_client.delete_objects, Bucket=bucket_name, Delete={"Objects": objects, "Quiet": True})
+            await asyncio.get_running_loop().run_in_executor(upload_executor, delete)
+        logger.info(f"Removed {len(file_paths)} objects from S3")
+    except ClientError as e:
+        logger.error(f"Failed to remove objects from S3: {str(e)}")
+
+async def object_exists(bucket_name: str, file_path: str) -> bool:
+    head = partial(s3_client.head_object, Bucket=bucket_name, Key=file_path)
+    try:
+        await asyncio.get_running_loop().run_in_executor(upload_executor, head)
+        return True
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
+
+async def head_file(bucket_name: str, file_path: str):
+    head = partial(s3_client.head_object, Bucket=bucket_name, Key=file_path)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(upload_executor, head)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+
+async def copy_file(bucket_name: str, source_path: str, file_path: str):
+    # Server-side copy; the bytes never pass through this process
+    copy = partial(
+        s3_client.copy_object, Bucket=bucket_name, Key=file_path,
+        CopySource={"Bucket": bucket_name, "Key": source_path}
+    )
+    await asyncio.get_running_loop().run_in_executor(upload_executor, copy)
+
+# Browser form upload straight to the bucket. S3 itself enforces the size
+# range and content type, so an oversized file is rejected before it lands
+def presign_post(bucket_name: str, file_path: str, content_type: str, max_size: int) -> dict:
+    return s3_client.generate_presigned_post(
+        bucket_name, file_path,
+        Fields={"Content-Type": content_type},
+        Conditions=[
+            {"Content-Type": content_type},
+            ["content-length-range", 1, max_size],
+        ],
+        ExpiresIn=S3_PRESIGN_EXPIRES,
+    )
+
+# Starts a multipart upload and signs one PUT per part; parts are
+# S3_MULTIPART_THRESHOLD bytes except the last. Unfinished uploads are left to
+# the bucket's AbortIncompleteMultipartUpload lifecycle rule
+async def presign_multipart(bucket_name: str, file_path: str, content_type: str, size: int) -> dict:
+    loop = asyncio.get_running_loop()
+    create = partial(s3_client.create_multipart_upload, Bucket=bucket_name, Key=file_path, ContentType=content_type)
+    upload_id = (await loop.run_in_executor(upload_executor, create))["UploadId"]
+    part_count = -(-size // S3_MULTIPART_THRESHOLD)
+    parts = [
+        {
+            "partNumber": number,
+            "url": s3_client.generate_presigned_url(
+                "upload_part",
+                Params={"Bucket": bucket_name, "Key": file_path, "UploadId": upload_id, "PartNumber": number},
+                ExpiresIn=S3_PRESIGN_EXPIRES,
+            ),
+        }
+        for number in range(1, part_count + 1)
+    ]
+    return {"uploadId": upload_id, "partSize": S3_MULTIPART_THRESHOLD, "parts": parts}
+
+async def complete_multipart(bucket_name: str, file_path: str, upload_id: str, parts: list):
+    complete = partial(
+        s3_client.complete_multipart_upload, Bucket=bucket_name, Key=file_path, UploadId=upload_id,
+        MultipartUpload={"Parts": [
+            {"PartNumber": part["partNumber"], "ETag": part["etag"]}
+            for part in sorted(parts, key=lambda part: part["partNumber"])
+        ]}
+    )
+    await asyncio.get_running_loop().run_in_executor(upload_executor, complete)
+
+# Names a file after the SHA-256 of its bytes, read in chunks so large videos
+# never sit in memory; the file is rewound for the upload that follows
+def content_filename(fileobj, filename: str) -> str:
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    while chunk := fileobj.read(1024 * 1024):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return hashed_filename(digest.hexdigest(), filename)
+
+# The same name for an object already in the bucket, streamed from S3
+async def stored_content_filename(bucket_name: str, file_path: str) -> str:
+    def read_digest():
+        body = s3_client.get_object(Bucket=bucket_name, Key=file_path)["Body"]
+        digest = hashlib.sha256()
+        for chunk in body.iter_chunks(1024 * 1024):
+            digest.update(chunk)
+        return hashed_filename(digest.hexdigest(), file_path.rsplit("/", 1)[-1])
+    return await asyncio.get_running_loop().run_in_executor(upload_executor, read_digest)
+
+def hashed_filename(digest: str, filename: str) -> str:
+    ext = filename.rsplit('.', 1)[-1].lower() if filename and '.' in filename else ''
+    return f"{digest}.{ext}" if ext else digest
+
 async def save_file(file: UploadFile, file_path: str):
     try:
         os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
@@ -45,17 +203,7 @@ async def save_file(file: UploadFile, file_path: str):
         return False
 
 def normalize_images_field(images):
-    default_images = {
-        "exterior_view": [],
-        "living_room": [],
-        "bedrooms": [],
-        "bathrooms": [],
-        "kitchen": [],
-        "floor_plan": [],
-        "master_plan": [],
-        "location_map": [],
-        "others": []
-    }
+    default_images = {category: [] for category in IMAGE_CATEGORIES}
     if isinstance(images, list):
         return {**default_images, "others": images}
     elif isinstance(images, dict):
@@ -0,0 +1,84 @@
+from utils.places import CITIES, CITY_ALIASES, LOCALITIES
+from utils.search import tokenize
+
+# Largest area a map query may cover. Both queries sort their matches in
+# memory (keeping one page), so the area bounds how many are scanned
+MAX_RADIUS_KM = 50
+# Viewport sides, in degrees (about 111 km of latitude)
+MAX_BOX_DEGREES = 1.0
+
+def point(longitude: float, latitude: float) -> dict:
+    # GeoJSON order is longitude first
+    return {"type": "Point", "coordinates": [longitude, latitude]}
+
+def _fold(text) -> str:
+    return " ".join(tokenize(text))
+
+def _city(name: str):
+    city = CITY_ALIASES.get(name, name)
+    return city if city in CITIES else None
+
+def _locality(part: str, localities) -> tuple:
+    # "andheri west" still lands on Andheri
+    for name, coordinates in localities.items():
+        if part == name or part.startswith(name + " "):
+            return coordinates
+    return None
+
+def _explicit_coordinates(location: dict):
+    for lat_key, lng_key in (("lat", "lng"), ("latitude", "longitude")):
+        try:
+            latitude, longitude = float(location[lat_key]), float(location[lng_key])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if -90 <= latitude <= 90 and -180 <= longitude <= 180:
+            return latitude, longitude
+    return None
+
+# Returns (GeoJSON point, precision) for a stored location, where precision
+# is "exact", "locality" or "city", or (None, None) when no part of it is in
+# the bundled table
+def geocode(location):
+    if isinstance(location, dict):
+        exact = _explicit_coordinates(location)
+        if exact:
+            return point(exact[1], exact[0]), "exact"
+        parts = [location.get("locality"), location.get("city")]
+    else:
+        parts = str(location or "").split(",")
+    parts = [_fold(part) for part in parts if part]
+    parts = [part for part in parts if part]
+
+    # The city is usually the last part: "Baner, Pune"
+    city = next((_city(part) for part in reversed(parts) if _city(part)), None)
+    if city:
+        localities = LOCALITIES.get(city, {})
+        for part in parts:
+            coordinates = _locality(part, localities)
+            if coordinates:
+                return point(coordinates[1], coordinates[0]), "locality"
+        return point(CITIES[city][1], CITIES[city][0]), "city"
+
+    # No city given; a locality name that only one city has is still usable
+    matches = [
+        coordinates for part in parts for localities in LOCALITIES.values()
+        for coordinates in [_locality(part, localities)] if coordinates
+    ]
+    if len(matches) == 1:
+        return point(matches[0][1], matches[0][0]), "locality"
+    return None, None
+
+# $geoNear stage for listings within radius_km, closest first, with the
+# distance in meters in "distance"; min_distance skips pages already served
+def near(longitude: float, latitude: float, radius_km: float, min_distance: float = None) -> dict:
+    stage = {
+        "near": point(longitude, latitude), "key": "geo", "distanceField": "distance",
+        "spherical": True, "maxDistance": radius_km * 1000,
+    }
+    if min_distance is not None:
+        stage["minDistance"] = min_distance
+    return {"$geoNear": stage}
+
+def within_box(south: float, west: float, north: float, east: float) -> dict:
+    ring = [[west, south], [east, south], [east, north], [west, north], [west, south]]
+    return {"geo": {"$geoWithin": {"$geometry": {"type": "Polygon", "coordinates": [ring]}}}}
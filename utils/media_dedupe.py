@@ -0,0 +1,146 @@
+from collections import Counter
+from pymongo import UpdateOne
+from utils.file_utils import s3_client, content_filename, hashed_filename
+import hashlib
+import os
+import re
+import shutil
+
+MEDIA_FOLDERS = ("images", "videos")
+_MEDIA_KEY = re.compile(r"(?:^|/)((?:images|videos)/[^/?#]+)$")
+_HASHED_NAME = re.compile(r"^[0-9a-f]{64}(\.[a-z0-9]+)?$")
+
+def media_key(url: str):
+    # "https://bucket.s3.amazonaws.com/images/x.jpg" and "/uploads/images/x.jpg" -> "images/x.jpg"
+    match = _MEDIA_KEY.search(url or "")
+    return match.group(1) if match else None
+
+# Deduping runs in two phases so no stored URL ever points at a missing file:
+# dedupe_directory/dedupe_bucket only add the content-hash copies and return
+# {old key: new key}; once property URLs and media_refs have been rewritten,
+# remove_local_originals/remove_bucket_originals delete the old names. A run
+# that stops in between leaves the originals in place, so rerunning rebuilds
+# the same mapping and picks up where it stopped.
+
+# Stores every file under root/images and root/videos under its content hash
+# as well; returns {old key: new key} for files not yet stored that way
+def dedupe_directory(root: str, dry_run: bool = False) -> dict:
+    mapping = {}
+    for folder in MEDIA_FOLDERS:
+        directory = os.path.join(root, folder)
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if not os.path.isfile(path) or _HASHED_NAME.match(name):
+                continue
+            with open(path, "rb") as f:
+                hashed = content_filename(f, name)
+            mapping[f"{folder}/{name}"] = f"{folder}/{hashed}"
+            if dry_run:
+                continue
+            target = os.path.join(directory, hashed)
+            if not os.path.exists(target):
+                try:
+                    # A hard link costs no space; the original goes away in phase two
+                    os.link(path, target)
+                except OSError:
+                    shutil.copy2(path, target)
+    return mapping
+
+def remove_local_originals(root: str, mapping: dict):
+    for old_key, new_key in mapping.items():
+        path = os.path.join(root, old_key)
+        if old_key != new_key and os.path.exists(os.path.join(root, new_key)) and os.path.exists(path):
+            os.remove(path)
+
+# Same as dedupe_directory for the bucket; renditions are left where they are
+def dedupe_bucket(bucket_name: str, dry_run: bool = False) -> dict:
+    mapping = {}
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for folder in MEDIA_FOLDERS:
+        keys = [
+            obj["Key"]
+            for page in paginator.paginate(Bucket=bucket_name, Prefix=f"{folder}/")
+            for obj in page.get("Contents", [])
+        ]
+        existing = set(keys)
+        for key in keys:
+            name = key[len(folder) + 1:]
+            if "/" in name or _HASHED_NAME.match(name):
+                continue
+            body = s3_client.get_object(Bucket=bucket_name, Key=key)["Body"]
+            hashed_key = f"{folder}/{_hash_stream(body, name)}"
+            mapping[key] = hashed_key
+            if dry_run:
+                continue
+            if hashed_key not in existing:
+                s3_client.copy_object(
+                    Bucket=bucket_name, Key=hashed_key, CopySource={"Bucket": bucket_name, "Key": key}
+                )
+                existing.add(hashed_key)
+    return mapping
+
+def remove_bucket_originals(bucket_name: str, mapping: dict):
+    for old_key, new_key in mapping.items():
+        if old_key != new_key:
+            s3_client.delete_object(Bucket=bucket_name, Key=old_key)
+
+def _hash_stream(body, name: str) -> str:
+    # S3 bodies can't seek, so they are hashed as they stream in
+    digest = hashlib.sha256()
+    for chunk in body.iter_chunks(1024 * 1024):
+        digest.update(chunk)
+    return hashed_filename(digest.hexdigest(), name)
+
+def _rewrite(url, mapping: dict):
+    key = media_key(url)
+    if key is None or key not in mapping:
+        return url
+    return url[: len(url) - len(key)] + mapping[key]
+
+async def rewrite_media_urls(collection, mapping: dict, dry_run: bool = False) -> int:
+    if not mapping:
+        return 0
+    updates = []
+    async for prop in collection.find({}, {"images": 1, "videos": 1, "imageVariants": 1}):
+        images = prop.get("images") or {}
+        if isinstance(images, list):
+            new_images = [_rewrite(url, mapping) for url in images]
+        else:
+            new_images = {category: [_rewrite(url, mapping) for url in urls] for category, urls in images.items()}
+        new_videos = [_rewrite(url, mapping) for url in prop.get("videos") or []]
+        changes = {}
+        if new_images != images:
+            changes["images"] = new_images
+        if new_videos != (prop.get("videos") or []):
+            changes["videos"] = new_videos
+        variants = prop.get("imageVariants") or {}
+        for entries in variants.values():
+            for entry in entries:
+                if entry and _rewrite(entry.get("original"), mapping) != entry.get("original"):
+                    entry["original"] = _rewrite(entry["original"], mapping)
+                    changes["imageVariants"] = variants
+        if changes:
+            updates.append(UpdateOne({"_id": prop["_id"]}, {"$set": changes}))
+    if updates and not dry_run:
+        await collection.bulk_write(updates, ordered=False)
+    return len(updates)
+
+# Recounts media_refs from the URLs stored on properties
+async def rebuild_media_refs(collection, refs_collection) -> int:
+    counts = Counter()
+    async for prop in collection.find({}, {"images": 1, "videos": 1}):
+        images = prop.get("images") or {}
+        urls = images if isinstance(images, list) else [url for urls in images.values() for url in urls]
+        for url in list(urls) + list(prop.get("videos") or []):
+            key = media_key(url)
+            if key:
+                counts[key] += 1
+    await refs_collection.delete_many({"_id": {"$nin": list(counts)}})
+    if counts:
+        await refs_collection.bulk_write(
+            [UpdateOne({"_id": key}, {"$set": {"refs": n}}, upsert=True) for key, n in counts.items()],
+            ordered=False
+        )
+    return len(counts)
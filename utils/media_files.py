@@ -0,0 +1,203 @@
+from collections import OrderedDict
+from email.utils import formatdate
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import Response
+import anyio
+import mimetypes
+import os
+import re
+
+# Content-hash and UUID names never get new bytes, so browsers may keep them forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MEDIA_MAX_AGE = int(os.getenv("MEDIA_MAX_AGE", "3600"))
+# Total bytes and largest single file kept in the hot-file cache; 0 disables it
+MEDIA_CACHE_MAX_BYTES = int(os.getenv("MEDIA_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+MEDIA_CACHE_MAX_FILE = int(os.getenv("MEDIA_CACHE_MAX_FILE", str(2 * 1024 * 1024)))
+CHUNK_SIZE = 256 * 1024
+
+_HASH_STEM = re.compile(r"^[0-9a-f]{64}$")
+_UUID_STEM = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.IGNORECASE)
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def is_immutable(path: str) -> bool:
+    # Renditions live in a folder named after their original
+    stem = os.path.splitext(os.path.basename(path))[0]
+    parent = os.path.basename(os.path.dirname(path))
+    return any(_HASH_STEM.match(name) or _UUID_STEM.match(name) for name in (stem, parent))
+
+def file_etag(path: str, stat_result: os.stat_result) -> str:
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if _HASH_STEM.match(stem):
+        # The name is already the SHA-256 of the bytes
+        return f'"{stem}"'
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+def etag_matches(header: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+def parse_range(header: str, size: int):
+    # Returns (start, end) inclusive for a single byte range, None to serve the
+    # whole file, or raises ValueError when the range can't be satisfied.
+    # Multi-range requests are answered with the full file, which RFC 9110 allows
+    match = _RANGE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+class HotFileCache:
+    # Byte-capped LRU of small file bodies keyed by path, mtime and size, so a
+    # replaced file is never served stale
+    def __init__(self, max_bytes: int, max_file: int):
+        self.max_bytes = max_bytes
+        self.max_file = max_file
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def accepts(self, size: int) -> bool:
+        return self.max_bytes > 0 and size <= min(self.max_file, self.max_bytes)
+
+    def get(self, key):
+        body = self._entries.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def set(self, key, body: bytes):
+        if key in self._entries:
+            return
+        self._entries[key] = body
+        self.bytes += len(body)
+        while self.bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= len(evicted)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "maxBytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+hot_file_cache = HotFileCache(MEDIA_CACHE_MAX_BYTES, MEDIA_CACHE_MAX_FILE)
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+class MediaFileResponse(Response):
+    def __init__(self, path: str, stat_result: os.stat_result, headers: dict, byte_range=None, method: str = "GET"):
+        self.path = path
+        self.stat_result = stat_result
+        self.byte_range = byte_range
+        self.send_header_only = method.upper() == "HEAD"
+        self.background = None
+        size = stat_result.st_size
+        if byte_range is None:
+            self.status_code = 200
+            self.offset, self.count = 0, size
+        else:
+            start, end = byte_range
+            self.status_code = 206
+            self.offset, self.count = start, end - start + 1
+            headers["content-range"] = f"bytes {start}-{end}/{size}"
+        self.media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.init_headers({**headers, "content-length": str(self.count)})
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.send_header_only or self.count == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        key = (self.path, self.stat_result.st_mtime_ns, self.stat_result.st_size)
+        if hot_file_cache.accepts(self.stat_result.st_size):
+            body = hot_file_cache.get(key)
+            if body is None:
+                body = await anyio.to_thread.run_sync(_read_file, self.path)
+                hot_file_cache.set(key, body)
+            chunk = body[self.offset:self.offset + self.count]
+            await send({"type": "http.response.body", "body": chunk, "more_body": False})
+            return
+
+        extensions = scope.get("extensions") or {}
+        if "http.response.pathsend" in extensions and self.byte_range is None:
+            await send({"type": "http.response.pathsend", "path": self.path})
+            return
+        if "http.response.zerocopysend" in extensions:
+            # The server hands the descriptor to sendfile(); no bytes enter Python
+            with open(self.path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend", "file": f,
+                    "offset": self.offset, "count": self.count, "more_body": False,
+                })
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as f:
+            await f.seek(self.offset)
+            remaining = self.count
+            while remaining > 0:
+                chunk = await f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # File shrank under us; close the body so the client doesn't hang
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+# StaticFiles with long-lived caching for content-addressed names, strong
+# ETags with 304 handling, single byte-range requests and a hot-file cache
+class MediaFiles(StaticFiles):
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        if status_code != 200:
+            # The 404.html page of html mode; nothing to cache or range over
+            return super().file_response(full_path, stat_result, scope, status_code)
+        path = os.fspath(full_path)
+        request_headers = Headers(scope=scope)
+        etag = file_etag(path, stat_result)
+        headers = {
+            "etag": etag,
+            "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+            "accept-ranges": "bytes",
+            "cache-control": IMMUTABLE_CACHE_CONTROL if is_immutable(path) else f"public, max-age={MEDIA_MAX_AGE}",
+        }
+
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None and etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        if if_none_match is None and self.is_not_modified(headers, request_headers):
+            return Response(status_code=304, headers=headers)
+
+        byte_range = None
+        range_header = request_headers.get("range")
+        # A stale If-Range means the client's partial copy is outdated; send it all
+        if range_header and request_headers.get("if-range", etag) in (etag, headers["last-modified"]):
+            try:
+                byte_range = parse_range(range_header, stat_result.st_size)
+            except ValueError:
+                return Response(status_code=416, headers={
+                    "content-range": f"bytes */{stat_result.st_size}", "accept-ranges": "bytes"
+                })
+        return MediaFileResponse(path, stat_result, headers, byte_range, scope["method"])
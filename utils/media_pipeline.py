@@ -0,0 +1,136 @@
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps, features
+from utils.file_utils import object_url
+import asyncio
+import base64
+import boto3
+import io
+import logging
+import multiprocessing
+import os
+import posixpath
+
+logger = logging.getLogger(__name__)
+
+# Widths generated for every uploaded image; larger ones are skipped when the
+# original is smaller
+RENDITION_WIDTHS = (320, 640, 1280)
+PLACEHOLDER_WIDTH = 16
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", "2"))
+
+# (format, extension, content type, save options) written per width
+RENDITION_FORMATS = [
+    ("JPEG", "jpg", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+    ("WEBP", "webp", "image/webp", {"quality": 80, "method": 4}),
+]
+if features.check("avif"):
+    RENDITION_FORMATS.append(("AVIF", "avif", "image/avif", {"quality": 60}))
+
+_process_pool = None
+_worker_s3_client = None
+
+def _init_worker():
+    # Each worker process gets its own client; boto3 clients must not cross a fork
+    global _worker_s3_client
+    _worker_s3_client = boto3.client(
+        's3',
+        aws_access_key_id=os.getenv('AWS_ACCESS_KEY'),
+        aws_secret_access_key=os.getenv('AWS_SECRET_KEY'),
+        region_name='us-east-1',
+        endpoint_url=os.getenv("S3_ENDPOINT_URL"),
+    )
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=MEDIA_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+    return _process_pool
+
+def shutdown_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+def _encode(image: Image.Image, fmt: str, options: dict) -> bytes:
+    if fmt == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+def render_image(bucket_name: str, file_path: str) -> dict:
+    # Runs inside a worker process: download, resize, encode and upload.
+    # Returns the object keys it wrote; the caller turns them into URLs
+    source = io.BytesIO()
+    _worker_s3_client.download_fileobj(bucket_name, file_path, source)
+    source.seek(0)
+    with Image.open(source) as opened:
+        image = ImageOps.exif_transpose(opened)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+    stem = posixpath.splitext(posixpath.basename(file_path))[0]
+    folder = f"{posixpath.dirname(file_path)}/renditions/{stem}"
+    sources = {}
+    for width in RENDITION_WIDTHS:
+        if width > image.width and width != RENDITION_WIDTHS[0]:
+            break
+        target = image.copy()
+        target.thumbnail((width, width * 4), Image.LANCZOS)
+        for fmt, ext, content_type, options in RENDITION_FORMATS:
+            key = f"{folder}/{width}w.{ext}"
+            _worker_s3_client.put_object(
+                Bucket=bucket_name, Key=key, Body=_encode(target, fmt, options),
+                ContentType=content_type, CacheControl="public, max-age=31536000, immutable",
+            )
+            sources.setdefault(ext, {})[str(width)] = key
+
+    tiny = image.copy()
+    tiny.thumbnail((PLACEHOLDER_WIDTH, PLACEHOLDER_WIDTH * 4))
+    placeholder = base64.b64encode(_encode(tiny, "WEBP", {"quality": 30})).decode()
+    return {
+        "width": image.width,
+        "height": image.height,
+        "placeholder": f"data:image/webp;base64,{placeholder}",
+        "sources": sources,
+    }
+
+# Background job run after create_property: renders every image of a listing in
+# the process pool and stores the results in imageVariants, one entry per
+# image in the same order as images[category]
+async def process_property_media(collection, property_id, bucket_name: str, image_paths: dict, on_complete=None):
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+    jobs = [(category, file_path) for category, file_paths in image_paths.items() for file_path in file_paths]
+    if not jobs:
+        return
+    # Images are stored under their content hash, so a picture uploaded twice
+    # (or under two categories) is one key and is rendered once
+    unique_paths = list(dict.fromkeys(file_path for _, file_path in jobs))
+    results = await asyncio.gather(
+        *(loop.run_in_executor(pool, render_image, bucket_name, file_path) for file_path in unique_paths),
+        return_exceptions=True
+    )
+    rendered = {}
+    for file_path, result in zip(unique_paths, results):
+        if isinstance(result, Exception):
+            logger.error(f"Failed to render {file_path}: {str(result)}")
+            rendered[file_path] = None
+            continue
+        result["original"] = object_url(bucket_name, file_path)
+        result["sources"] = {
+            ext: {width: object_url(bucket_name, key) for width, key in keys.items()}
+            for ext, keys in result["sources"].items()
+        }
+        rendered[file_path] = result
+    variants = {}
+    for category, file_path in jobs:
+        variants.setdefault(category, []).append(rendered[file_path])
+    await collection.update_one({"_id": property_id}, {"$set": {"imageVariants": variants}})
+    logger.info(f"Stored image renditions for property {property_id}")
+    if on_complete is not None:
+        await on_complete()
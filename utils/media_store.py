@@ -0,0 +1,166 @@
+from collections import Counter
+from pymongo import ReturnDocument, UpdateOne
+from database import media_refs_collection
+from utils.file_utils import (
+    UploadError, upload_executor, content_filename, object_exists, save_file_to_s3, delete_files_from_s3,
+    IMAGE_CATEGORIES, MAX_IMAGE_SIZE, MAX_VIDEO_SIZE, S3_MULTIPART_THRESHOLD,
+    secure_filename, presign_post, presign_multipart, complete_multipart, head_file, copy_file, stored_content_filename
+)
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+async def acquire_media(file_paths: list):
+    counts = Counter(file_paths)
+    if counts:
+        await media_refs_collection.bulk_write(
+            [UpdateOne({"_id": path}, {"$inc": {"refs": n}}, upsert=True) for path, n in counts.items()],
+            ordered=False
+        )
+
+# Drops one reference per occurrence; objects nobody references any more are
+# deleted from the bucket
+async def release_media(bucket_name: str, file_paths: list):
+    orphaned = []
+    for path, n in Counter(file_paths).items():
+        ref = await media_refs_collection.find_one_and_update(
+            {"_id": path}, {"$inc": {"refs": -n}}, return_document=ReturnDocument.AFTER
+        )
+        if ref is None:
+            # Stored before references were counted, so only this listing has it
+            orphaned.append(path)
+        elif ref["refs"] <= 0:
+            # Matches nothing when a concurrent acquire_media took a new reference
+            result = await media_refs_collection.delete_one({"_id": path, "refs": {"$lte": 0}})
+            if result.deleted_count == 1:
+                orphaned.append(path)
+    await delete_files_from_s3(bucket_name, orphaned)
+
+# Stores (UploadFile, folder) pairs under content-hash keys and returns the keys
+# in order. Identical bytes map to one object, which is only uploaded if the
+# bucket doesn't already have it. On failure every reference taken here is
+# released and UploadError is raised.
+async def save_media(uploads: list, bucket_name: str) -> list:
+    loop = asyncio.get_running_loop()
+    names = await asyncio.gather(*(
+        loop.run_in_executor(upload_executor, content_filename, file.file, file.filename)
+        for file, _ in uploads
+    ))
+    file_paths = [f"{folder}/{name}" for (_, folder), name in zip(uploads, names)]
+    # References are taken before uploading so a concurrent rollback of the
+    # same content can't delete the object from under this request
+    await acquire_media(file_paths)
+
+    async def put_if_missing(file, file_path):
+        if await object_exists(bucket_name, file_path):
+            logger.info(f"Reusing stored object {file_path}")
+            return True
+        return await save_file_to_s3(file, bucket_name, file_path) is not None
+
+    first_upload = {}
+    for (file, _), file_path in zip(uploads, file_paths):
+        first_upload.setdefault(file_path, file)
+    results = await asyncio.gather(
+        *(put_if_missing(file, file_path) for file_path, file in first_upload.items()),
+        return_exceptions=True
+    )
+    failed = [file.filename for file, ok in zip(first_upload.values(), results) if ok is not True]
+    if failed:
+        await release_media(bucket_name, file_paths)
+        raise UploadError(failed)
+    return file_paths
+
+# Direct uploads land under incoming/<user>/ and are only moved next to the
+# rest of the media once a property is committed with them, so abandoned
+# uploads can be expired by a lifecycle rule on the incoming/ prefix
+INCOMING_PREFIX = "incoming"
+
+def _media_rules(category: str):
+    # (folder, content type prefix, size limit) for an upload category
+    if category == "videos":
+        return "videos", "video/", MAX_VIDEO_SIZE
+    if category in IMAGE_CATEGORIES:
+        return "images", "image/", MAX_IMAGE_SIZE
+    raise ValueError(f"Unknown media category {category}")
+
+def incoming_prefix(user_id: str, folder: str) -> str:
+    return f"{INCOMING_PREFIX}/{user_id}/{folder}/"
+
+# files is a list of {"category", "filename", "contentType", "size"}; returns
+# one upload target per file, in order
+async def presign_uploads(user_id: str, files: list, bucket_name: str) -> list:
+    targets = []
+    for file in files:
+        folder, content_prefix, max_size = _media_rules(file["category"])
+        if not file["contentType"].startswith(content_prefix):
+            raise ValueError(f"{file['filename']} must be of type {content_prefix}*")
+        if not 0 < file["size"] <= max_size:
+            raise ValueError(f"{file['filename']} exceeds {max_size // (1024 * 1024)}MB limit")
+        file_path = incoming_prefix(user_id, folder) + secure_filename(file["filename"])
+        target = {"category": file["category"], "key": file_path}
+        if folder == "videos" and file["size"] > S3_MULTIPART_THRESHOLD:
+            target["method"] = "MULTIPART"
+            target.update(await presign_multipart(bucket_name, file_path, file["contentType"], file["size"]))
+        else:
+            target["method"] = "POST"
+            target.update(presign_post(bucket_name, file_path, file["contentType"], max_size))
+        targets.append(target)
+    return targets
+
+async def complete_upload(user_id: str, file_path: str, upload_id: str, parts: list, bucket_name: str):
+    if not file_path.startswith(incoming_prefix(user_id, "videos")):
+        raise ValueError(f"Unknown upload {file_path}")
+    await complete_multipart(bucket_name, file_path, upload_id, parts)
+
+# Checks that every key was uploaded by this user within its category's type
+# and size limits, then moves the objects out of incoming/ to content-hash
+# keys like save_media does, so a file already stored is not copied again,
+# and takes a reference on each. media is {"images": {category: [keys]},
+# "videos": [keys]}; returns ({category: [paths]}, [video paths])
+async def commit_uploads(user_id: str, media: dict, bucket_name: str):
+    entries = [
+        (category, file_path)
+        for category, file_paths in (media.get("images") or {}).items()
+        for file_path in file_paths
+    ] + [("videos", file_path) for file_path in media.get("videos") or []]
+
+    async def verify(category, file_path):
+        folder, content_prefix, max_size = _media_rules(category)
+        prefix = incoming_prefix(user_id, folder)
+        if not file_path.startswith(prefix) or "/" in file_path[len(prefix):]:
+            raise ValueError(f"Unknown upload {file_path}")
+        head = await head_file(bucket_name, file_path)
+        if head is None:
+            raise ValueError(f"Upload {file_path} was not found")
+        # Multipart parts aren't size-limited by S3, so the limit is rechecked here
+        if head["ContentLength"] > max_size or not head.get("ContentType", "").startswith(content_prefix):
+            raise ValueError(f"Upload {file_path} is not a valid {folder[:-1]}")
+        return f"{folder}/{await stored_content_filename(bucket_name, file_path)}"
+
+    file_paths = await asyncio.gather(*(verify(category, file_path) for category, file_path in entries))
+    await acquire_media(list(file_paths))
+
+    async def copy_if_missing(source, target):
+        if await object_exists(bucket_name, target):
+            logger.info(f"Reusing stored object {target}")
+            return
+        await copy_file(bucket_name, source, target)
+
+    first_source = {}
+    for (_, source), target in zip(entries, file_paths):
+        first_source.setdefault(target, source)
+    try:
+        await asyncio.gather(*(copy_if_missing(source, target) for target, source in first_source.items()))
+    except Exception:
+        await release_media(bucket_name, list(file_paths))
+        raise
+    await delete_files_from_s3(bucket_name, [source for _, source in entries])
+
+    image_paths, video_paths = {}, []
+    for (category, _), file_path in zip(entries, file_paths):
+        if category == "videos":
+            video_paths.append(file_path)
+        else:
+            image_paths.setdefault(category, []).append(file_path)
+    return image_paths, video_paths
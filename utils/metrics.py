@@ -0,0 +1,171 @@
+from contextvars import ContextVar
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from pymongo import monitoring
+from pyinstrument import Profiler
+from starlette.responses import Response
+import logging
+import os
+import random
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency by route template",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "Requests being served", ["method"])
+MONGO_COMMANDS = Counter("mongo_commands_total", "MongoDB commands sent", ["command", "outcome"])
+MONGO_COMMAND_LATENCY = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command round trip", ["command"], buckets=LATENCY_BUCKETS,
+)
+MONGO_COMMANDS_PER_REQUEST = Histogram(
+    "mongo_commands_per_request", "MongoDB commands issued while serving one request",
+    ["route"], buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50),
+)
+MONGO_TIME_PER_REQUEST = Histogram(
+    "mongo_time_per_request_seconds", "Time spent in MongoDB commands per request", ["route"], buckets=LATENCY_BUCKETS,
+)
+S3_UPLOAD_BYTES = Counter("s3_upload_bytes_total", "Bytes uploaded to S3")
+S3_UPLOAD_LATENCY = Histogram("s3_upload_duration_seconds", "Time per S3 object upload", buckets=LATENCY_BUCKETS)
+NORMALIZE_LATENCY = Histogram(
+    "normalize_duration_seconds", "Time to normalize one batch of listings",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5),
+)
+NORMALIZED_DOCUMENTS = Counter("normalized_documents_total", "Listings passed through normalization")
+REQUESTS_SHED = Counter("http_requests_shed_total", "Requests refused by rate limits or load shedding", ["reason", "rule"])
+
+# Opt-in profiling. A request is profiled when it sends X-Profile with
+# PROFILE_TOKEN, or is picked by PROFILE_SAMPLE_RATE; sampled profiles are
+# only kept when the request took longer than PROFILE_SLOW_MS
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "500"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+class RequestStats:
+    __slots__ = ("mongo_commands", "mongo_seconds")
+
+    def __init__(self):
+        self.mongo_commands = 0
+        self.mongo_seconds = 0.0
+
+# Motor copies the context into its executor threads, so the command
+# listener sees the stats object of the request that issued the command
+current_request = ContextVar("current_request", default=None)
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    def _record(self, event, outcome: str):
+        seconds = event.duration_micros / 1e6
+        MONGO_COMMANDS.labels(event.command_name, outcome).inc()
+        MONGO_COMMAND_LATENCY.labels(event.command_name).observe(seconds)
+        stats = current_request.get()
+        if stats is not None:
+            stats.mongo_commands += 1
+            stats.mongo_seconds += seconds
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event, "ok")
+
+    def failed(self, event):
+        self._record(event, "error")
+
+def record_s3_upload(size: int, seconds: float):
+    if size:
+        S3_UPLOAD_BYTES.inc(size)
+    S3_UPLOAD_LATENCY.observe(seconds)
+
+def record_normalize(count: int, seconds: float):
+    NORMALIZED_DOCUMENTS.inc(count)
+    NORMALIZE_LATENCY.observe(seconds)
+
+def record_shed(reason: str, rule: str):
+    REQUESTS_SHED.labels(reason, rule).inc()
+
+def _route_label(scope) -> str:
+    # Route templates keep the label set bounded; unmatched paths share one label
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if scope.get("root_path", "").endswith("/uploads") or scope["path"].startswith("/uploads/"):
+        return "/uploads"
+    return "unmatched"
+
+def _start_profiler(scope):
+    headers = dict(scope.get("headers") or [])
+    requested = PROFILE_TOKEN and headers.get(b"x-profile", b"").decode() == PROFILE_TOKEN
+    if not requested and not (PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE):
+        return None, False
+    profiler = Profiler(async_mode="enabled")
+    profiler.start()
+    return profiler, bool(requested)
+
+def _save_profile(profiler, route: str, elapsed: float):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+    path = os.path.join(PROFILE_DIR, f"{int(time.time() * 1000)}-{name}.html")
+    with open(path, "w") as f:
+        f.write(profiler.output_html())
+    logger.info(f"Profiled {route} ({elapsed * 1000:.0f} ms): {path}")
+
+# Pure ASGI so streamed bodies pass through untouched; latency runs until the
+# last body chunk has been sent
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = {"code": 500, "finished": None}
+        method = scope["method"]
+        profiler, requested = _start_profiler(scope)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                # Background tasks run after this inside the same app call; the
+                # client already has its response, so they don't count
+                status["finished"] = time.perf_counter()
+
+        REQUESTS_IN_PROGRESS.labels(method).inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = (status["finished"] or time.perf_counter()) - started
+            REQUESTS_IN_PROGRESS.labels(method).dec()
+            current_request.reset(token)
+            route = _route_label(scope)
+            REQUEST_LATENCY.labels(method, route, str(status["code"])).observe(elapsed)
+            MONGO_COMMANDS_PER_REQUEST.labels(route).observe(stats.mongo_commands)
+            MONGO_TIME_PER_REQUEST.labels(route).observe(stats.mongo_seconds)
+            if profiler is not None:
+                profiler.stop()
+                if requested or elapsed * 1000 >= PROFILE_SLOW_MS:
+                    _save_profile(profiler, route, elapsed)
+
+def metrics_registry():
+    # Under several uvicorn/gunicorn workers each process writes to
+    # PROMETHEUS_MULTIPROC_DIR and the scrape aggregates them
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+def metrics_response() -> Response:
+    return Response(generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,161 @@
+from types import MappingProxyType
+from pymongo import ReplaceOne
+from datetime import datetime
+from utils.file_utils import normalize_images_field
+from utils.geo import geocode
+from utils.metrics import record_normalize
+from utils.price import parse_price
+from utils.search import search_terms
+import time
+
+SCHEMA_VERSION = 5
+
+RESIDENTIAL = "residential"
+LAND = "land"
+OFFICE = "office"
+
+# Every spelling the frontend and older listings have used for each category
+RESIDENTIAL_TYPES = (
+    "Flat", "Apartment", "Villa", "House", "Farm House",
+    "Independent House", "Builder Floor", "Studio",
+)
+LAND_TYPES = (
+    "Residential Land", "Commercial Land", "Agriculture Land",
+    "Residential Plot", "Commercial Plot", "Agricultural Land", "Industrial Land",
+)
+
+TYPE_CATEGORY = MappingProxyType({
+    **{t: RESIDENTIAL for t in RESIDENTIAL_TYPES},
+    **{t: LAND for t in LAND_TYPES},
+})
+
+# (availabilityStatus, propertyStatus) used when a listing leaves them out
+STATUS_DEFAULTS = MappingProxyType({
+    RESIDENTIAL: ("Ready to Move", "New Project"),
+    LAND: ("N/A", "N/A"),
+    OFFICE: ("N/A", "N/A"),
+})
+
+AMENITY_DEFAULTS = MappingProxyType({
+    RESIDENTIAL: MappingProxyType({
+        "parking": "No", "lift": "No", "security": "No", "powerBackup": "No",
+        "waterSupply": "No", "boundaryWall": "No", "gatedCommunity": "No", "bathrooms": "1"
+    }),
+    LAND: MappingProxyType({
+        "parking": "No", "security": "No", "powerBackup": "No",
+        "waterSupply": "No", "boundaryWall": "No", "gatedCommunity": "No"
+    }),
+    OFFICE: MappingProxyType({
+        "parking": "No", "security": "No", "powerBackup": "No",
+        "waterSupply": "No", "boundaryWall": "No", "gatedCommunity": "No",
+        "lift": "No", "internet": "No", "publicTransport": "No",
+        "pantry": "Not Available", "washroom": "Not Available"
+    }),
+})
+
+# Residential listings keep their propertyFeatures as-is; these keys are
+# surfaced through amenities instead
+RESIDENTIAL_FEATURE_KEYS = ("totalFloors", "floorNo", "furnishing", "builtupArea", "carpetArea")
+
+FEATURE_DEFAULTS = MappingProxyType({
+    LAND: MappingProxyType({
+        "areaUnit": "N/A", "areaValue": "N/A", "anyConstructionDone": "No",
+        "plotFacing": "N/A", "transactionType": "N/A", "roadAccessType": "N/A"
+    }),
+    OFFICE: MappingProxyType({
+        "carpetArea": "N/A", "floorNo": "N/A", "furnishing": "N/A",
+        "cabins": "N/A", "workstations": "N/A", "roadAccessType": "N/A"
+    }),
+})
+
+def property_category(property_type):
+    return TYPE_CATEGORY.get(property_type, OFFICE)
+
+def apply_defaults(prop: dict) -> dict:
+    location = prop.get("location")
+    if isinstance(location, str):
+        prop["location"] = {"city": location, "state": ""}
+    prop.setdefault("description", "")
+    prop["images"] = normalize_images_field(prop.get("images", []))
+    prop.setdefault("videos", [])
+    prop.setdefault("negotiable", "No")
+
+    category = TYPE_CATEGORY.get(prop.get("propertyType"), OFFICE)
+    availability, status = STATUS_DEFAULTS[category]
+    prop.setdefault("availabilityStatus", availability)
+    prop.setdefault("propertyStatus", status)
+    prop.setdefault("bhk", "N/A")
+
+    features = prop.get("propertyFeatures") or {}
+    amenities = dict(AMENITY_DEFAULTS[category])
+    amenities.update(prop.get("amenities") or {})
+    if category == RESIDENTIAL:
+        for key in RESIDENTIAL_FEATURE_KEYS:
+            amenities[key] = features.get(key, "N/A")
+    else:
+        merged = dict(FEATURE_DEFAULTS[category])
+        merged.update(features)
+        prop["propertyFeatures"] = merged
+    prop["amenities"] = amenities
+
+    prop.setdefault("listedBy", "Unknown")
+    return prop
+
+# Shape written by create_property and the backfill; bump when apply_defaults
+# changes so stored documents get rewritten
+def prepare_for_storage(prop: dict) -> dict:
+    apply_defaults(prop)
+    created_at = prop.get("createdAt")
+    if isinstance(created_at, str):
+        try:
+            prop["createdAt"] = datetime.fromisoformat(created_at)
+        except ValueError:
+            pass
+    # Numeric copy of the display price, used for indexed range filters
+    prop["priceValue"] = parse_price(prop.get("price"))
+    prop["searchTerms"] = search_terms(prop)
+    # GeoJSON point for the 2dsphere index; listings we can't place are left out of it
+    geo, precision = geocode(prop.get("location"))
+    if geo:
+        prop["geo"], prop["geoPrecision"] = geo, precision
+    else:
+        prop.pop("geo", None)
+        prop.pop("geoPrecision", None)
+    prop["schemaVersion"] = SCHEMA_VERSION
+    return prop
+
+# Stored-only fields that listing reads leave on the server
+LISTING_EXCLUDED_FIELDS = ("searchTerms",)
+
+# A fresh dict per query: drivers and mongomock may add keys to a projection
+def listing_projection() -> dict:
+    return dict.fromkeys(LISTING_EXCLUDED_FIELDS, 0)
+
+def normalize_property(prop: dict) -> dict:
+    # Documents already stored in the current shape only need their id
+    if prop.get("schemaVersion") != SCHEMA_VERSION:
+        apply_defaults(prop)
+    prop["id"] = str(prop["_id"])
+    return prop
+
+# Normalizes a whole cursor batch in place, with the lookups bound once
+def normalize_many(docs) -> list:
+    normalize = normalize_property
+    started = time.perf_counter()
+    result = [normalize(prop) for prop in docs]
+    record_normalize(len(result), time.perf_counter() - started)
+    return result
+
+async def backfill_stored_shape(collection, batch_size: int = 500) -> int:
+    updated = 0
+    batch = []
+    async for prop in collection.find({"schemaVersion": {"$ne": SCHEMA_VERSION}}):
+        batch.append(ReplaceOne({"_id": prop["_id"]}, prepare_for_storage(prop)))
+        if len(batch) >= batch_size:
+            await collection.bulk_write(batch, ordered=False)
+            updated += len(batch)
+            batch = []
+    if batch:
+        await collection.bulk_write(batch, ordered=False)
+        updated += len(batch)
+    return updated
@@ -0,0 +1,157 @@
+from pymongo import ReplaceOne, UpdateMany, UpdateOne
+from database import owner_stats_collection, property_collection, user_query_collection
+from bson import ObjectId
+from bson.errors import InvalidId
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Per-owner counters live in owner_stats ({_id: owner id, listings, enquiries,
+# unread, lastEnquiryAt}); per-listing ones on the property itself (enquiryCount,
+# lastEnquiryAt). The write paths keep them current so the dashboard never
+# counts or joins at request time.
+EMPTY_STATS = {"listings": 0, "enquiries": 0, "unread": 0, "lastEnquiryAt": None}
+
+async def record_listings(owner_id: str, count: int = 1):
+    if count:
+        await owner_stats_collection.update_one(
+            {"_id": owner_id},
+            {"$inc": {"listings": count}, "$setOnInsert": {"enquiries": 0}},
+            upsert=True
+        )
+
+# Counts stored enquiries against their properties and owners, one update per
+# property and per owner however many enquiries the batch holds
+async def record_enquiries(enquiries: list):
+    by_property, by_owner = {}, {}
+    for enquiry in enquiries:
+        at = enquiry["createdAt"]
+        for totals, key in ((by_property, ObjectId(enquiry["property_id"])), (by_owner, enquiry.get("ownerId"))):
+            if key is None:
+                continue
+            count, last = totals.get(key, (0, at))
+            totals[key] = (count + 1, max(last, at))
+    if by_property:
+        await property_collection.bulk_write([
+            UpdateOne({"_id": key}, {"$inc": {"enquiryCount": count}, "$max": {"lastEnquiryAt": last}})
+            for key, (count, last) in by_property.items()
+        ], ordered=False)
+    if by_owner:
+        await owner_stats_collection.bulk_write([
+            UpdateOne(
+                {"_id": key},
+                {"$inc": {"enquiries": count, "unread": count}, "$max": {"lastEnquiryAt": last}, "$setOnInsert": {"listings": 0}},
+                upsert=True
+            )
+            for key, (count, last) in by_owner.items()
+        ], ordered=False)
+
+# Sets the counters of these enquiries' properties and owners from what is
+# stored, for enquiries whose increments may or may not have been applied by
+# an earlier attempt. Only runs when a write-behind batch is retried.
+async def recount_enquiries(enquiries: list):
+    property_ids = list({enquiry["property_id"] for enquiry in enquiries})
+    owner_ids = list({enquiry.get("ownerId") for enquiry in enquiries} - {None})
+    rows = user_query_collection.aggregate([
+        {"$match": {"property_id": {"$in": property_ids}}},
+        {"$group": {"_id": "$property_id", "count": {"$sum": 1}, "last": {"$max": "$createdAt"}}},
+    ])
+    updates = [
+        UpdateOne({"_id": property_id}, {"$set": {"enquiryCount": row["count"], "lastEnquiryAt": row["last"]}})
+        async for row in rows for property_id in [_object_id(row["_id"])] if property_id is not None
+    ]
+    if updates:
+        await property_collection.bulk_write(updates, ordered=False)
+    rows = user_query_collection.aggregate([
+        {"$match": {"ownerId": {"$in": owner_ids}}},
+        {"$group": {
+            "_id": "$ownerId",
+            "enquiries": {"$sum": 1},
+            "unread": {"$sum": {"$cond": [{"$eq": ["$read", False]}, 1, 0]}},
+            "lastEnquiryAt": {"$max": "$createdAt"},
+        }},
+    ])
+    updates = [
+        UpdateOne({"_id": row.pop("_id")}, {"$set": row, "$setOnInsert": {"listings": 0}}, upsert=True)
+        async for row in rows
+    ]
+    if updates:
+        await owner_stats_collection.bulk_write(updates, ordered=False)
+
+async def record_read(owner_id: str, count: int):
+    if count:
+        await owner_stats_collection.update_one({"_id": owner_id}, {"$inc": {"unread": -count}})
+
+async def owner_stats(owner_id: str) -> dict:
+    stats = await owner_stats_collection.find_one({"_id": owner_id}, {"_id": 0})
+    return {**EMPTY_STATS, **(stats or {})}
+
+def _object_id(value):
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        return None
+
+async def _apply_enquiry_counts(batch: list, owners: dict):
+    listed_by = {
+        prop["_id"]: prop.get("listedBy")
+        async for prop in property_collection.find({"_id": {"$in": [pid for pid, _ in batch]}}, {"listedBy": 1})
+    }
+    updates, links = [], []
+    for property_id, row in batch:
+        if property_id not in listed_by:
+            continue
+        updates.append(UpdateOne(
+            {"_id": property_id}, {"$set": {"enquiryCount": row["count"], "lastEnquiryAt": row["last"]}}
+        ))
+        # Enquiries stored before they carried their owner
+        links.append(UpdateMany(
+            {"property_id": row["_id"], "ownerId": {"$exists": False}}, {"$set": {"ownerId": listed_by[property_id]}}
+        ))
+        stats = owners.get(listed_by[property_id])
+        if stats is not None:
+            stats["enquiries"] += row["count"]
+            last = stats.get("lastEnquiryAt")
+            if row["last"] and (last is None or row["last"] > last):
+                stats["lastEnquiryAt"] = row["last"]
+    if updates:
+        await property_collection.bulk_write(updates, ordered=False)
+        await user_query_collection.bulk_write(links, ordered=False)
+
+# Recomputes every counter from the listings and stored enquiries, for data
+# written before the counters existed or after a failed write. Returns the
+# number of owners with stats.
+async def rebuild_owner_stats(batch_size: int = 500) -> int:
+    owners = {}
+    async for row in property_collection.aggregate([{"$group": {"_id": "$listedBy", "listings": {"$sum": 1}}}]):
+        if row["_id"]:
+            owners[row["_id"]] = {"listings": row["listings"], "enquiries": 0, "unread": 0}
+    await user_query_collection.update_many({"read": {"$exists": False}}, {"$set": {"read": False}})
+
+    rows = user_query_collection.aggregate([
+        {"$group": {"_id": "$property_id", "count": {"$sum": 1}, "last": {"$max": "$createdAt"}}}
+    ])
+    batch = []
+    async for row in rows:
+        property_id = _object_id(row["_id"])
+        if property_id is not None:
+            batch.append((property_id, row))
+        if len(batch) >= batch_size:
+            await _apply_enquiry_counts(batch, owners)
+            batch = []
+    if batch:
+        await _apply_enquiry_counts(batch, owners)
+
+    unread = user_query_collection.aggregate([
+        {"$match": {"read": False}}, {"$group": {"_id": "$ownerId", "count": {"$sum": 1}}}
+    ])
+    async for row in unread:
+        if row["_id"] in owners:
+            owners[row["_id"]]["unread"] = row["count"]
+
+    replacements = [ReplaceOne({"_id": owner_id}, stats, upsert=True) for owner_id, stats in owners.items()]
+    for start in range(0, len(replacements), batch_size):
+        await owner_stats_collection.bulk_write(replacements[start:start + batch_size], ordered=False)
+    await owner_stats_collection.delete_many({"_id": {"$nin": list(owners)}})
+    logger.info(f"Rebuilt stats for {len(owners)} owners")
+    return len(owners)
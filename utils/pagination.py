@@ -0,0 +1,65 @@
+from bson import ObjectId
+from bson.errors import InvalidId
+from datetime import datetime
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+# Newest first; _id breaks ties between listings created in the same instant
+KEYSET_SORT = [("createdAt", -1), ("_id", -1)]
+
+# The sort value is a createdAt, or a distance for /properties/nearby
+def encode_cursor(created_at, object_id: ObjectId) -> str:
+    if isinstance(created_at, datetime):
+        value = {"t": "d", "v": created_at.isoformat()}
+    elif isinstance(created_at, float):
+        value = {"t": "f", "v": created_at}
+    else:
+        value = {"t": "s", "v": str(created_at)}
+    raw = json.dumps({"c": value, "i": str(object_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(token: str):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value = data["c"]
+        if value["t"] == "d":
+            created_at = datetime.fromisoformat(value["v"])
+        elif value["t"] == "f":
+            created_at = float(value["v"])
+        else:
+            created_at = value["v"]
+        return created_at, ObjectId(data["i"])
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise ValueError(f"Invalid cursor: {token}") from e
+
+def keyset_filter(token: str) -> dict:
+    created_at, object_id = decode_cursor(token)
+    return {"$or": [
+        {"createdAt": {"$lt": created_at}},
+        {"createdAt": created_at, "_id": {"$lt": object_id}},
+    ]}
+
+def apply_cursor(query: dict, token: str) -> dict:
+    if not token:
+        return query
+    page_filter = keyset_filter(token)
+    return {"$and": [query, page_filter]} if query else page_filter
+
+def split_page(docs: list, limit: int):
+    # Callers fetch limit + 1 documents; the extra one only signals another page
+    if len(docs) <= limit:
+        return docs, None
+    page = docs[:limit]
+    last = page[-1]
+    return page, encode_cursor(last.get("createdAt"), last["_id"])
+
+def through_filter(last: dict) -> dict:
+    # Everything up to and including last in KEYSET_SORT order
+    return {"$or": [
+        {"createdAt": {"$gt": last.get("createdAt")}},
+        {"createdAt": last.get("createdAt"), "_id": {"$gte": last["_id"]}},
+    ]}
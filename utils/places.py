@@ -0,0 +1,151 @@
+from types import MappingProxyType
+
+# Offline geocoding table: city and locality centroids as (latitude, longitude).
+# Listings are placed at their locality when it is known here, else their city.
+CITIES = MappingProxyType({
+    "mumbai": (19.0760, 72.8777),
+    "navi mumbai": (19.0330, 73.0297),
+    "thane": (19.2183, 72.9781),
+    "pune": (18.5204, 73.8567),
+    "pimpri chinchwad": (18.6298, 73.7997),
+    "nashik": (19.9975, 73.7898),
+    "nagpur": (21.1458, 79.0882),
+    "aurangabad": (19.8762, 75.3433),
+    "kolhapur": (16.7050, 74.2433),
+    "solapur": (17.6599, 75.9064),
+    "satara": (17.6805, 74.0183),
+    "lonavala": (18.7546, 73.4062),
+    "alibag": (18.6414, 72.8722),
+    "delhi": (28.6139, 77.2090),
+    "new delhi": (28.6139, 77.2090),
+    "noida": (28.5355, 77.3910),
+    "greater noida": (28.4744, 77.5040),
+    "gurugram": (28.4595, 77.0266),
+    "ghaziabad": (28.6692, 77.4538),
+    "faridabad": (28.4089, 77.3178),
+    "bengaluru": (12.9716, 77.5946),
+    "mysuru": (12.2958, 76.6394),
+    "mangaluru": (12.9141, 74.8560),
+    "hyderabad": (17.3850, 78.4867),
+    "chennai": (13.0827, 80.2707),
+    "coimbatore": (11.0168, 76.9558),
+    "madurai": (9.9252, 78.1198),
+    "kochi": (9.9312, 76.2673),
+    "thiruvananthapuram": (8.5241, 76.9366),
+    "kolkata": (22.5726, 88.3639),
+    "ahmedabad": (23.0225, 72.5714),
+    "surat": (21.1702, 72.8311),
+    "vadodara": (22.3072, 73.1812),
+    "rajkot": (22.3039, 70.8022),
+    "jaipur": (26.9124, 75.7873),
+    "jodhpur": (26.2389, 73.0243),
+    "udaipur": (24.5854, 73.7125),
+    "lucknow": (26.8467, 80.9462),
+    "kanpur": (26.4499, 80.3319),
+    "agra": (27.1767, 78.0081),
+    "varanasi": (25.3176, 82.9739),
+    "meerut": (28.9845, 77.7064),
+    "indore": (22.7196, 75.8577),
+    "bhopal": (23.2599, 77.4126),
+    "raipur": (21.2514, 81.6296),
+    "patna": (25.5941, 85.1376),
+    "ranchi": (23.3441, 85.3096),
+    "bhubaneswar": (20.2961, 85.8245),
+    "visakhapatnam": (17.6868, 83.2185),
+    "vijayawada": (16.5062, 80.6480),
+    "guwahati": (26.1445, 91.7362),
+    "chandigarh": (30.7333, 76.7794),
+    "ludhiana": (30.9010, 75.8573),
+    "amritsar": (31.6340, 74.8723),
+    "dehradun": (30.3165, 78.0322),
+    "srinagar": (34.0837, 74.7973),
+    "panaji": (15.4909, 73.8278),
+    "goa": (15.4909, 73.8278),
+})
+
+# Older and alternative names, folded the same way as lookups
+CITY_ALIASES = MappingProxyType({
+    "bombay": "mumbai",
+    "bangalore": "bengaluru",
+    "bengaluru urban": "bengaluru",
+    "gurgaon": "gurugram",
+    "calcutta": "kolkata",
+    "madras": "chennai",
+    "mysore": "mysuru",
+    "mangalore": "mangaluru",
+    "trivandrum": "thiruvananthapuram",
+    "cochin": "kochi",
+    "vizag": "visakhapatnam",
+    "pimpri": "pimpri chinchwad",
+    "chinchwad": "pimpri chinchwad",
+    "panjim": "panaji",
+})
+
+LOCALITIES = MappingProxyType({
+    "pune": MappingProxyType({
+        "baner": (18.5590, 73.7868),
+        "balewadi": (18.5763, 73.7791),
+        "hinjewadi": (18.5912, 73.7389),
+        "wakad": (18.5987, 73.7650),
+        "aundh": (18.5580, 73.8075),
+        "kothrud": (18.5074, 73.8077),
+        "shivaji nagar": (18.5308, 73.8475),
+        "koregaon park": (18.5362, 73.8940),
+        "viman nagar": (18.5679, 73.9143),
+        "kharadi": (18.5515, 73.9348),
+        "wagholi": (18.5808, 73.9787),
+        "hadapsar": (18.5089, 73.9260),
+        "magarpatta": (18.5141, 73.9299),
+        "pimple saudagar": (18.5990, 73.7969),
+    }),
+    "mumbai": MappingProxyType({
+        "colaba": (18.9067, 72.8147),
+        "lower parel": (18.9953, 72.8300),
+        "worli": (19.0176, 72.8172),
+        "dadar": (19.0178, 72.8478),
+        "bandra": (19.0596, 72.8295),
+        "chembur": (19.0522, 72.9005),
+        "ghatkopar": (19.0860, 72.9081),
+        "juhu": (19.1075, 72.8263),
+        "andheri": (19.1136, 72.8697),
+        "powai": (19.1176, 72.9060),
+        "goregaon": (19.1663, 72.8526),
+        "malad": (19.1874, 72.8484),
+        "kandivali": (19.2047, 72.8523),
+        "borivali": (19.2307, 72.8567),
+    }),
+    "bengaluru": MappingProxyType({
+        "koramangala": (12.9352, 77.6245),
+        "indiranagar": (12.9784, 77.6408),
+        "hsr layout": (12.9121, 77.6446),
+        "jayanagar": (12.9250, 77.5938),
+        "whitefield": (12.9698, 77.7500),
+        "marathahalli": (12.9569, 77.7011),
+        "electronic city": (12.8452, 77.6602),
+        "sarjapur road": (12.9100, 77.6870),
+        "hebbal": (13.0358, 77.5970),
+        "yelahanka": (13.1007, 77.5963),
+    }),
+    "hyderabad": MappingProxyType({
+        "gachibowli": (17.4401, 78.3489),
+        "hitec city": (17.4435, 78.3772),
+        "madhapur": (17.4483, 78.3915),
+        "kondapur": (17.4698, 78.3575),
+        "banjara hills": (17.4126, 78.4392),
+        "jubilee hills": (17.4305, 78.4071),
+        "kukatpally": (17.4849, 78.4138),
+    }),
+    "delhi": MappingProxyType({
+        "dwarka": (28.5921, 77.0460),
+        "saket": (28.5245, 77.2066),
+        "rohini": (28.7383, 77.0822),
+        "vasant kunj": (28.5293, 77.1539),
+    }),
+    "chennai": MappingProxyType({
+        "adyar": (13.0012, 80.2565),
+        "velachery": (12.9815, 80.2180),
+        "t nagar": (13.0418, 80.2341),
+        "anna nagar": (13.0850, 80.2101),
+        "sholinganallur": (12.9010, 80.2279),
+    }),
+})
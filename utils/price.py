@@ -0,0 +1,34 @@
+import re
+
+# Multipliers for the unit words used in listing prices
+PRICE_UNITS = {
+    "k": 1_000, "thousand": 1_000,
+    "l": 100_000, "lac": 100_000, "lacs": 100_000, "lakh": 100_000, "lakhs": 100_000,
+    "cr": 10_000_000, "crs": 10_000_000, "crore": 10_000_000, "crores": 10_000_000,
+    "m": 1_000_000, "mn": 1_000_000, "million": 1_000_000,
+}
+
+_PRICE_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*([a-z]+)?")
+# "45-50 lakh", "1.5 to 2 cr", "45 lakh - 50 lakh"
+_RANGE_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*([a-z]+)?\.?\s*(?:-|–|to)\s*(\d+(?:\.\d+)?)\s*([a-z]+)?")
+
+def _unit(word) -> int:
+    return PRICE_UNITS.get((word or "").rstrip("."), 1)
+
+# Reads "45,00,000", "1.2 Cr" or "₹ 85 Lakh" as a number of rupees; None if
+# nothing numeric is in the value. Ranges are stored at their lower bound, with
+# a unit written only after the upper bound applying to both.
+def parse_price(value):
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    # Indian (45,00,000) and western (4,500,000) grouping both collapse to digits
+    text = str(value).lower().replace(",", "")
+    match = _RANGE_PATTERN.search(text)
+    if match and (match.group(2) is None or match.group(2).rstrip(".") in PRICE_UNITS):
+        return float(match.group(1)) * _unit(match.group(2) or match.group(4))
+    match = _PRICE_PATTERN.search(text)
+    if not match:
+        return None
+    return float(match.group(1)) * _unit(match.group(2))
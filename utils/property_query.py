@@ -0,0 +1,136 @@
+from typing import Optional
+from utils.price import parse_price
+from utils.search import place_match, text_match
+
+# Query parameters shared by the filtered listing endpoints; FastAPI reads
+# them from the query string when used as Depends()
+class PropertyFilters:
+    def __init__(
+        self,
+        location: Optional[str] = None,
+        priceMin: Optional[str] = None,
+        priceMax: Optional[str] = None,
+        bhk: Optional[str] = None,
+        propertyType: Optional[str] = None,
+        availabilityStatus: Optional[str] = None,
+        propertyStatus: Optional[str] = None,
+        parking: Optional[str] = None,
+        lift: Optional[str] = None,
+        security: Optional[str] = None,
+        anyConstructionDone: Optional[str] = None,
+        plotFacing: Optional[str] = None,
+        transactionType: Optional[str] = None,
+        internet: Optional[str] = None,
+        publicTransport: Optional[str] = None,
+        search: Optional[str] = None
+    ):
+        self.location = location
+        self.priceMin = priceMin
+        self.priceMax = priceMax
+        self.bhk = bhk
+        self.propertyType = propertyType
+        self.availabilityStatus = availabilityStatus
+        self.propertyStatus = propertyStatus
+        self.parking = parking
+        self.lift = lift
+        self.security = security
+        self.anyConstructionDone = anyConstructionDone
+        self.plotFacing = plotFacing
+        self.transactionType = transactionType
+        self.internet = internet
+        self.publicTransport = publicTransport
+        self.search = search
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+# Exact-match filters and the document field each one reads
+EQUALITY_FILTERS = {
+    "bhk": "bhk",
+    "availabilityStatus": "availabilityStatus",
+    "propertyStatus": "propertyStatus",
+    "parking": "amenities.parking",
+    "lift": "amenities.lift",
+    "security": "amenities.security",
+    "anyConstructionDone": "propertyFeatures.anyConstructionDone",
+    "transactionType": "propertyFeatures.transactionType",
+    "internet": "amenities.internet",
+    "publicTransport": "amenities.publicTransport",
+}
+
+# Filters the facets endpoint counts values for, and the field each one reads
+FACET_FIELDS = {
+    "propertyType": "propertyType",
+    **EQUALITY_FILTERS,
+    "plotFacing": "propertyFeatures.plotFacing",
+}
+# Most values reported per facet
+MAX_FACET_VALUES = 50
+
+def base_filter_query(filters: PropertyFilters) -> dict:
+    # The filters that narrow the result set without being a facet
+    query = {}
+    if filters.location:
+        query.update(place_match(filters.location))
+    if filters.priceMin or filters.priceMax:
+        query["priceValue"] = {}
+        for operator, raw in (("$gte", filters.priceMin), ("$lte", filters.priceMax)):
+            if raw:
+                value = parse_price(raw)
+                if value is None:
+                    raise ValueError("Invalid price format")
+                query["priceValue"][operator] = value
+    if filters.search:
+        query.update(text_match(filters.search))
+    return query
+
+def facet_conditions(filters: PropertyFilters) -> dict:
+    # {facet param: {field: condition}} for every facet filter that is set
+    conditions = {}
+    if filters.propertyType:
+        conditions["propertyType"] = {"propertyType": {"$regex": filters.propertyType, "$options": "i"}}
+    for param, field in EQUALITY_FILTERS.items():
+        value = getattr(filters, param)
+        if value:
+            conditions[param] = {field: value}
+    if filters.plotFacing:
+        conditions["plotFacing"] = {"propertyFeatures.plotFacing": {"$in": [filters.plotFacing, "N/A"]}}
+    return conditions
+
+def build_filter_query(filters: PropertyFilters) -> dict:
+    query = base_filter_query(filters)
+    for condition in facet_conditions(filters).values():
+        query.update(condition)
+    return query
+
+# One aggregation for the filter sidebar. Each facet is counted with every
+# other selected filter applied but not its own, so the counts show what
+# choosing a different value would return; "total" applies them all.
+def facet_pipeline(filters: PropertyFilters) -> list:
+    conditions = facet_conditions(filters)
+    facets = {}
+    for param, field in FACET_FIELDS.items():
+        others = {}
+        for other, condition in conditions.items():
+            if other != param:
+                others.update(condition)
+        facets[param] = ([{"$match": others}] if others else []) + [
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+            {"$limit": MAX_FACET_VALUES},
+        ]
+    selected = {}
+    for condition in conditions.values():
+        selected.update(condition)
+    facets["total"] = ([{"$match": selected}] if selected else []) + [{"$count": "count"}]
+    return [{"$match": base_filter_query(filters)}, {"$facet": facets}]
+
+def facet_counts(result: dict) -> dict:
+    total = result.get("total") or []
+    return {
+        "total": total[0]["count"] if total else 0,
+        "facets": {
+            param: [{"value": bucket["_id"], "count": bucket["count"]} for bucket in result.get(param, []) if bucket["_id"] is not None]
+            for param in FACET_FIELDS
+        },
+    }
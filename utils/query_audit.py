@@ -0,0 +1,74 @@
+from bson import ObjectId
+from datetime import datetime
+from database import property_collection, user_collection, user_query_collection
+from utils.geo import point, within_box
+from utils.normalize import LAND_TYPES
+from utils.pagination import KEYSET_SORT, keyset_filter, encode_cursor
+from utils.property_query import PropertyFilters, build_filter_query
+
+SAMPLE_USER_ID = "000000000000000000000000"
+
+def query_shapes() -> list:
+    # (name, collection, filter, sort, limit) for every query the routes issue,
+    # filled with placeholder values
+    cursor = encode_cursor(datetime(2024, 1, 1), ObjectId(SAMPLE_USER_ID))
+    shapes = [
+        ("properties.list", property_collection, {}, KEYSET_SORT, 25),
+        ("properties.list.cursor", property_collection, keyset_filter(cursor), KEYSET_SORT, 25),
+        ("properties.user", property_collection, {"listedBy": SAMPLE_USER_ID}, [("createdAt", -1)], 0),
+        ("properties.dashboard", property_collection, {"listedBy": SAMPLE_USER_ID}, KEYSET_SORT, 25),
+        ("properties.offices", property_collection, {"propertyType": "Office"}, [("createdAt", -1)], 4),
+        ("properties.land", property_collection, {"propertyType": {"$in": list(LAND_TYPES)}}, [("createdAt", -1)], 4),
+        # /properties/nearby runs $geoNear, which plans like $nearSphere
+        (
+            "properties.nearby", property_collection,
+            {"geo": {"$nearSphere": {"$geometry": point(73.8567, 18.5204), "$maxDistance": 5000}}}, None, 25
+        ),
+        ("properties.within", property_collection, within_box(18.4, 73.7, 18.7, 74.0), KEYSET_SORT, 25),
+        ("properties.by_id", property_collection, {"_id": ObjectId(SAMPLE_USER_ID)}, None, 1),
+        ("enquiries.inbox", user_query_collection, {"ownerId": SAMPLE_USER_ID}, KEYSET_SORT, 25),
+        ("enquiries.inbox.unread", user_query_collection, {"ownerId": SAMPLE_USER_ID, "read": False}, KEYSET_SORT, 25),
+        ("enquiries.by_property", user_query_collection, {"property_id": {"$in": [SAMPLE_USER_ID]}}, None, 0),
+        ("users.by_email", user_collection, {"email": "audit@example.com"}, None, 1),
+        ("users.by_id", user_collection, {"_id": ObjectId(SAMPLE_USER_ID)}, None, 1),
+    ]
+    filtered = {
+        "price": PropertyFilters(priceMin="20 lakh", priceMax="1 cr"),
+        "bhk": PropertyFilters(bhk="2"),
+        "type": PropertyFilters(propertyType="Office"),
+        "amenities": PropertyFilters(parking="Yes", lift="Yes"),
+        "search": PropertyFilters(search="sea view villa"),
+        "location": PropertyFilters(location="pune"),
+    }
+    for name, filters in filtered.items():
+        shapes.append((f"properties.filtered.{name}", property_collection, build_filter_query(filters), KEYSET_SORT, 0))
+    return shapes
+
+def plan_stages(plan: dict) -> list:
+    stages = [plan.get("stage")]
+    for child in ("inputStage", "outerStage", "innerStage"):
+        if child in plan:
+            stages += plan_stages(plan[child])
+    for child in plan.get("inputStages", []):
+        stages += plan_stages(child)
+    return stages
+
+async def audit_queries() -> list:
+    report = []
+    for name, collection, query, sort, limit in query_shapes():
+        cursor = collection.find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        explained = await cursor.explain()
+        winning = explained["queryPlanner"]["winningPlan"]
+        # Newer servers wrap the classic plan under queryPlan
+        stages = plan_stages(winning.get("queryPlan", winning))
+        report.append({
+            "name": name,
+            "collection": collection.name,
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages,
+        })
+    return report
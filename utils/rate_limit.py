@@ -0,0 +1,291 @@
+from collections import OrderedDict
+from starlette.responses import JSONResponse
+from auth import decode_access_token
+from utils.metrics import record_shed
+import asyncio
+import logging
+import math
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+# Scales every budget, e.g. 0.5 to halve them during an incident
+RATE_LIMIT_MULTIPLIER = float(os.getenv("RATE_LIMIT_MULTIPLIER", "1"))
+# Requests served at once, how many may wait for a slot, and for how long
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "64"))
+MAX_QUEUED_REQUESTS = int(os.getenv("MAX_QUEUED_REQUESTS", "128"))
+MAX_QUEUE_WAIT = float(os.getenv("MAX_QUEUE_WAIT", "5"))
+OVERLOAD_RETRY_AFTER = 1
+
+# Never limited: scrapes, the health check and static media
+EXEMPT_PATHS = ("/", "/metrics")
+EXEMPT_PREFIXES = ("/uploads/",)
+
+class Budget:
+    # `requests` per `seconds` on average, with up to `burst` at once. Keyed by
+    # client IP, or by user for "user" budgets when the request has a valid token
+    __slots__ = ("name", "requests", "seconds", "burst", "by")
+
+    def __init__(self, name: str, requests: int, seconds: int, burst: int, by: str = "ip"):
+        self.name = name
+        self.requests = requests
+        self.seconds = seconds
+        self.burst = burst
+        self.by = by
+
+    @property
+    def rate(self) -> float:
+        return self.requests * RATE_LIMIT_MULTIPLIER / self.seconds
+
+    @property
+    def capacity(self) -> float:
+        return max(1.0, self.burst * RATE_LIMIT_MULTIPLIER)
+
+# (method, path, budget), first match wins; a path also covers everything below it
+RATE_LIMITS = (
+    ("POST", "/api/login", Budget("login", 10, 60, burst=5)),
+    ("POST", "/api/register", Budget("register", 10, 3600, burst=5)),
+    ("PUT", "/api/api/user/change-password", Budget("change_password", 5, 60, burst=3, by="user")),
+    ("POST", "/api/api/contact-owner", Budget("contact", 10, 60, burst=5)),
+    ("POST", "/api/activity", Budget("activity", 120, 60, burst=60)),
+    ("POST", "/api/user/properties/import", Budget("import", 10, 3600, burst=2, by="user")),
+    ("GET", "/api/user/properties/export", Budget("export", 30, 3600, burst=5, by="user")),
+    ("POST", "/api/properties", Budget("create", 30, 60, burst=10, by="user")),
+    ("GET", "/api/properties", Budget("listing", 120, 60, burst=40)),
+)
+DEFAULT_BUDGET = Budget("default", 600, 60, burst=100)
+
+class MemoryRateLimitStore:
+    # Token buckets for this process only; the least recently seen keys are
+    # dropped past max_keys, which at worst hands a client a fresh bucket
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    async def take(self, key: str, rate: float, capacity: float) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+    async def size(self) -> int:
+        return len(self._buckets)
+
+# Refill and take in one atomic step, so every worker shares the same buckets.
+# The wait is returned as a string because Lua numbers come back as integers
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+class RedisRateLimitStore:
+    def __init__(self, client):
+        self.client = client
+        self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, key: str, rate: float, capacity: float) -> float:
+        return float(await self._script(keys=[key], args=[rate, capacity, time.time()]))
+
+    async def size(self) -> int:
+        return len([key async for key in self.client.scan_iter(match="ratelimit:*")])
+
+def create_rate_limit_store():
+    backend = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    # fakeredis would need lupa to run the script, and lives in this process
+    # anyway, so it gets the memory buckets, which behave the same
+    if backend == "redis" and not redis_url.startswith("fakeredis://"):
+        from redis import asyncio as aioredis
+        return RedisRateLimitStore(aioredis.from_url(redis_url, decode_responses=True))
+    return MemoryRateLimitStore(max_keys=int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000")))
+
+def budget_for(method: str, path: str) -> Budget:
+    for rule_method, rule_path, budget in RATE_LIMITS:
+        if method == rule_method and (path == rule_path or path.startswith(rule_path + "/")):
+            return budget
+    return DEFAULT_BUDGET
+
+def _bearer_token(scope):
+    for name, value in scope.get("headers") or []:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            return token if scheme.lower() == "bearer" and token else None
+    return None
+
+def client_key(scope, budget: Budget) -> str:
+    if budget.by == "user":
+        token = _bearer_token(scope)
+        payload = decode_access_token(token) if token else None
+        if payload:
+            return f"user:{payload['sub']}"
+    # Behind a proxy run uvicorn with --proxy-headers so this is the real client
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+class RateLimiter:
+    def __init__(self, store):
+        self.store = store
+        self.allowed = 0
+        self.limited = {}
+        self.errors = 0
+
+    # Seconds until the request would be allowed, 0 when it may go ahead
+    async def check(self, method: str, path: str, scope) -> float:
+        budget = budget_for(method, path)
+        key = f"ratelimit:{budget.name}:{client_key(scope, budget)}"
+        try:
+            wait = await self.store.take(key, budget.rate, budget.capacity)
+        except Exception as e:
+            # A broken store lets traffic through rather than refusing all of it
+            self.errors += 1
+            logger.warning(f"Rate limit check failed for {key}: {str(e)}")
+            return 0.0
+        if wait > 0:
+            self.limited[budget.name] = self.limited.get(budget.name, 0) + 1
+            record_shed("rate_limit", budget.name)
+        else:
+            self.allowed += 1
+        return wait
+
+    async def stats(self) -> dict:
+        return {
+            "enabled": RATE_LIMIT_ENABLED,
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "errors": self.errors,
+            "buckets": await self.store.size(),
+        }
+
+class Overloaded(Exception):
+    pass
+
+# Caps requests in flight. Up to max_queue more wait for a slot, for at most
+# max_wait seconds; anything beyond that is shed instead of queueing forever
+class ConcurrencyLimiter:
+    def __init__(self, limit: int, max_queue: int, max_wait: float):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._slots = None
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def acquire(self):
+        if self._slots is None:
+            # Created lazily so it binds to the running event loop
+            self._slots = asyncio.Semaphore(self.limit)
+        if not self._slots.locked():
+            # A free slot is taken without suspending
+            await self._slots.acquire()
+        else:
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise Overloaded(f"{self.waiting} requests queued")
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.max_wait)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                raise Overloaded(f"No slot within {self.max_wait}s")
+            finally:
+                self.waiting -= 1
+        self.active += 1
+        self.admitted += 1
+
+    def release(self):
+        self.active -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "maxQueue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timedOut": self.timed_out,
+        }
+
+rate_limiter = RateLimiter(create_rate_limit_store())
+admission = ConcurrencyLimiter(MAX_CONCURRENT_REQUESTS, MAX_QUEUED_REQUESTS, MAX_QUEUE_WAIT)
+
+def _exempt(path: str) -> bool:
+    return path in EXEMPT_PATHS or path.startswith(EXEMPT_PREFIXES)
+
+# Per-client token buckets first (cheap, answers 429), then the global
+# concurrency limit (answers 503 when the queue is full)
+class RateLimitMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not RATE_LIMIT_ENABLED or scope["method"] == "OPTIONS" or _exempt(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        wait = await rate_limiter.check(scope["method"], scope["path"], scope)
+        if wait > 0:
+            response = JSONResponse(
+                {"detail": "Too many requests"}, status_code=429, headers={"Retry-After": str(math.ceil(wait))}
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await admission.acquire()
+        except Overloaded as e:
+            record_shed("overload", "global")
+            logger.warning(f"Shedding {scope['method']} {scope['path']}: {str(e)}")
+            response = JSONResponse(
+                {"detail": "Server busy, try again"}, status_code=503,
+                headers={"Retry-After": str(OVERLOAD_RETRY_AFTER)},
+            )
+            await response(scope, receive, send)
+            return
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                admission.release()
+
+        async def send_wrapper(message):
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                # Background tasks run after this and don't hold a slot
+                release()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            release()
@@ -0,0 +1,74 @@
+import re
+import unicodedata
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Shortest prefix a query can match on, and the longest one stored
+MIN_PREFIX = 2
+MAX_PREFIX = 15
+# Long descriptions would otherwise dominate the document size
+MAX_BODY_TOKENS = 200
+
+# Relevance weight of a query term matching each indexed field
+FIELD_WEIGHTS = {"title": 5, "place": 3, "body": 1}
+
+def tokenize(text) -> list:
+    if not text:
+        return []
+    folded = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode().lower()
+    return _TOKEN_PATTERN.findall(folded)
+
+def _prefixes(tokens) -> list:
+    terms = set()
+    for token in tokens:
+        terms.add(token)
+        for size in range(MIN_PREFIX, min(len(token), MAX_PREFIX) + 1):
+            terms.add(token[:size])
+    return sorted(terms)
+
+# Edge n-grams of every token, so an indexed equality match on a query term
+# is a prefix match on the original words
+def search_terms(prop: dict) -> dict:
+    location = prop.get("location")
+    if isinstance(location, dict):
+        place = " ".join(str(location.get(key) or "") for key in ("city", "locality", "state"))
+    else:
+        place = location or ""
+    body_tokens = list(dict.fromkeys(tokenize(prop.get("description"))))[:MAX_BODY_TOKENS]
+    return {
+        "title": _prefixes(tokenize(prop.get("title"))),
+        "place": _prefixes(tokenize(place)),
+        "body": _prefixes(body_tokens),
+    }
+
+def query_terms(text) -> list:
+    # Terms longer than the stored prefixes can only match on their stored prefix
+    return list(dict.fromkeys(token[:MAX_PREFIX] for token in tokenize(text)))
+
+def text_match(text) -> dict:
+    terms = query_terms(text)
+    if not terms:
+        return {}
+    return {"$and": [
+        {"$or": [{f"searchTerms.{field}": term} for field in FIELD_WEIGHTS]}
+        for term in terms
+    ]}
+
+def place_match(text) -> dict:
+    terms = query_terms(text)
+    return {"searchTerms.place": {"$all": terms}} if terms else {}
+
+# Aggregation stages that rank already-matched documents by weighted term hits;
+# exclude lists any other fields to drop along with the score
+def relevance_stages(text, exclude=None) -> list:
+    scores = []
+    for term in query_terms(text):
+        for field, weight in FIELD_WEIGHTS.items():
+            scores.append({"$cond": [
+                {"$in": [term, {"$ifNull": [f"$searchTerms.{field}", []]}]}, weight, 0
+            ]})
+    return [
+        {"$addFields": {"_score": {"$add": scores or [0]}}},
+        {"$sort": {"_score": -1, "createdAt": -1, "_id": -1}},
+        {"$project": {"_score": 0, **(exclude or {})}},
+    ]
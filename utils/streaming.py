@@ -0,0 +1,42 @@
+from bson import ObjectId
+from fastapi.responses import StreamingResponse
+import orjson
+
+# Response bodies for ?stream=: one document per line, or a single JSON array
+# written element by element
+STREAM_FORMATS = {"ndjson": "application/x-ndjson", "array": "application/json"}
+# Documents pulled from Mongo per round trip, and bytes buffered per write
+STREAM_BATCH_SIZE = 200
+STREAM_CHUNK_BYTES = 64 * 1024
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def dumps(doc) -> bytes:
+    return orjson.dumps(doc, default=_default)
+
+# Pipes a Motor cursor through transform() and orjson one document at a time;
+# only the current chunk is ever held in memory
+async def stream_documents(cursor, transform, fmt: str):
+    ndjson = fmt == "ndjson"
+    buffer = bytearray() if ndjson else bytearray(b"[")
+    first = True
+    async for doc in cursor:
+        if not ndjson and not first:
+            buffer += b","
+        buffer += dumps(transform(doc))
+        if ndjson:
+            buffer += b"\n"
+        first = False
+        if len(buffer) >= STREAM_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if not ndjson:
+        buffer += b"]"
+    if buffer:
+        yield bytes(buffer)
+
+def streaming_listing(cursor, transform, fmt: str, headers: dict = None) -> StreamingResponse:
+    return StreamingResponse(stream_documents(cursor, transform, fmt), media_type=STREAM_FORMATS[fmt], headers=headers)
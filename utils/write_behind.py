@@ -0,0 +1,208 @@
+from bson import json_util
+from bson.json_util import CANONICAL_JSON_OPTIONS
+import asyncio
+import fcntl
+import glob
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "1") == "1"
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500"))
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "1"))
+# Events held in memory while Mongo is unreachable; past this enqueue refuses
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "50000"))
+WRITE_BEHIND_SPILL_DIR = os.getenv("WRITE_BEHIND_SPILL_DIR", "spill")
+
+# Buffers documents in memory and hands them to a per-kind handler in batches,
+# once batch_size are pending or every flush_interval seconds.
+#
+# Every event is also appended to a journal segment on local disk before
+# enqueue returns, and a segment is only deleted once all of its events have
+# been written. Whatever a crash, a failed flush or a shutdown with Mongo down
+# leaves behind is replayed on the next start. Each process holds an flock on
+# its segments, so workers sharing the directory never replay a live one.
+# Handlers must tolerate seeing a document twice (documents carry their _id).
+class WriteBehindQueue:
+    def __init__(self, name: str, spill_dir: str, batch_size: int, flush_interval: float, max_pending: int):
+        self.name = name
+        self.spill_dir = spill_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.handlers = {}
+        self._buffer = []
+        self._segment = None
+        # Events in the open segment, which only rotates when it holds any
+        self._segment_events = 0
+        # Closed-for-writing segments whose events are still in _buffer
+        self._sealed = []
+        self._lock = None
+        self._task = None
+        self._flushing = None
+        self.enqueued = 0
+        self.written = 0
+        self.refused = 0
+        self.failed_flushes = 0
+        self.replayed = 0
+
+    def register(self, kind: str, handler):
+        self.handlers[kind] = handler
+
+    @property
+    def running(self) -> bool:
+        return self._segment is not None
+
+    def _open_segment(self):
+        path = os.path.join(self.spill_dir, f"{self.name}-{os.getpid()}-{time.time_ns()}.jsonl")
+        f = open(path, "a", encoding="utf-8")
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._segment = (f, path)
+        self._segment_events = 0
+
+    # Returns False when the event was not accepted (queue stopped or full);
+    # the caller should then write it directly
+    def enqueue(self, kind: str, doc: dict) -> bool:
+        if not self.running or len(self._buffer) >= self.max_pending:
+            self.refused += 1
+            return False
+        f, _ = self._segment
+        f.write(json_util.dumps({"k": kind, "d": doc}, json_options=CANONICAL_JSON_OPTIONS) + "\n")
+        # Into the OS page cache, so it survives the process dying
+        f.flush()
+        self._segment_events += 1
+        self._buffer.append((kind, doc))
+        self.enqueued += 1
+        if len(self._buffer) >= self.batch_size and (self._flushing is None or self._flushing.done()):
+            self._flushing = asyncio.get_running_loop().create_task(self.flush())
+        return True
+
+    async def _write(self, events: list):
+        by_kind = {}
+        for kind, doc in events:
+            by_kind.setdefault(kind, []).append(doc)
+        for kind, docs in by_kind.items():
+            for start in range(0, len(docs), self.batch_size):
+                await self.handlers[kind](docs[start:start + self.batch_size])
+
+    async def flush(self):
+        if self._lock is None:
+            # Created lazily so it binds to the running event loop
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self._buffer or not self.running:
+                return
+            batch, self._buffer = self._buffer, []
+            if self._segment_events:
+                self._sealed.append(self._segment)
+                self._open_segment()
+            sealed = list(self._sealed)
+            try:
+                await self._write(batch)
+            except Exception as e:
+                # Keep the events, and the segments holding them, for the next try
+                self.failed_flushes += 1
+                self._buffer = batch + self._buffer
+                logger.error(f"Write-behind flush of {len(batch)} events failed: {str(e)}")
+                return
+            except BaseException:
+                # Cancelled mid-write, e.g. by stop(); the events still need writing
+                self._buffer = batch + self._buffer
+                raise
+            self.written += len(batch)
+            self._sealed = [segment for segment in self._sealed if segment not in sealed]
+            for f, path in sealed:
+                f.close()
+                os.unlink(path)
+
+    async def _replay_segment(self, path: str):
+        with open(path, encoding="utf-8") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another live worker's segment
+                return
+            events = []
+            for line in f:
+                if not line.endswith("\n"):
+                    # Torn last write from a crash; the event never got acknowledged
+                    break
+                event = json_util.loads(line)
+                events.append((event["k"], event["d"]))
+            await self._write(events)
+            os.unlink(path)
+        self.replayed += len(events)
+        logger.info(f"Replayed {len(events)} write-behind events from {path}")
+
+    async def replay(self):
+        for path in sorted(glob.glob(os.path.join(self.spill_dir, f"{self.name}-*.jsonl"))):
+            if self._segment and path == self._segment[1]:
+                continue
+            try:
+                await self._replay_segment(path)
+            except Exception as e:
+                logger.error(f"Could not replay {path}, keeping it: {str(e)}")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                # Journal to stable storage at least once per interval
+                await loop.run_in_executor(None, os.fsync, self._segment[0].fileno())
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Write-behind loop error: {str(e)}")
+
+    async def start(self):
+        if not WRITE_BEHIND_ENABLED:
+            return
+        os.makedirs(self.spill_dir, exist_ok=True)
+        self._open_segment()
+        await self.replay()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            # Wait for a flush it was in the middle of to put its batch back
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if not self.running:
+            return
+        await self.flush()
+        # Sealed segments still listed hold unwritten events and stay for replay;
+        # the open one only when events were journaled to it since the last flush
+        for f, _ in self._sealed:
+            f.close()
+        f, path = self._segment
+        self._segment = None
+        f.close()
+        if not self._segment_events:
+            os.unlink(path)
+        if self._buffer:
+            logger.warning(f"Spilled {len(self._buffer)} unwritten events to {self.spill_dir} for replay")
+        self._sealed = []
+        self._buffer = []
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "pending": len(self._buffer),
+            "maxPending": self.max_pending,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "refused": self.refused,
+            "failedFlushes": self.failed_flushes,
+            "replayed": self.replayed,
+            "spilledSegments": len(self._sealed),
+        }
+
+write_behind = WriteBehindQueue(
+    "events", WRITE_BEHIND_SPILL_DIR, WRITE_BEHIND_BATCH_SIZE, WRITE_BEHIND_FLUSH_INTERVAL, WRITE_BEHIND_MAX_PENDING
+)